@@ -1,50 +1,108 @@
+import codecs
+import hashlib
+import inspect
+import math
+import mmap
 import re
 import sys
 import os
 import traceback
-from PIL import Image, ImageDraw
+from concurrent.futures import ThreadPoolExecutor
+from PIL import Image, ImageDraw, ImageMode, ImageSequence, TiffImagePlugin
 from PyQt5.QtWidgets import (QApplication, QMainWindow, QPushButton,
                              QVBoxLayout, QHBoxLayout, QLabel, QFileDialog,
                              QWidget, QPlainTextEdit,  QStatusBar)
 from PyQt5.QtGui import QPixmap
 from PyQt5.QtCore import Qt
-import easyocr
 import numpy as np
+import tifffile
 from natasha import (
-    Segmenter,
-    MorphVocab,
-    NewsEmbedding,
-    NewsMorphTagger,
-    NewsSyntaxParser,
-    NewsNERTagger,
     PER,
     LOC,
-    ORG,
-    NamesExtractor,
-    Doc
+    ORG
 )
 
+from razdel import sentenize
+
+import model_registry
+from names import NameDictionary
+from matchers import (AddressMatcher, CapitalizedWordsMatcher, CombinedMatcher, EmailMatcher,
+                      LineContext, PatternSet, RegexMatcher)
+from stats import NULL_STATS
+
 os.environ["QT_DEBUG_PLUGINS"] = "1"
 
 
-class Anonymizer:
-    def __init__(self):
-        # Инициализация компонентов Natasha
-        self.segmenter = Segmenter()
-        self.morph_vocab = MorphVocab()
+class OperationCancelled(Exception):
+    """Обработка прервана пользователем"""
+
 
-        # Инициализация эмбеддингов и тегеров
-        self.emb = NewsEmbedding()
-        self.ner_tagger = NewsNERTagger(self.emb)
-        self.names_extractor = NamesExtractor(self.morph_vocab)
+class Anonymizer:
+    # Модели, необходимые для anonymize_text, в порядке загрузки
+    WARM_UP_MODELS = ('name_dictionary', 'embedding', 'ner_tagger')
+
+    # ФИО сначала ищутся по словарю имен (names.NameDictionary), а NER
+    # запускается только для строк, которые словарь объяснить не может
+    USE_NAME_DICTIONARY = True
+
+    # Размер части текста (в символах) при потоковой обработке
+    STREAM_CHUNK_SIZE = 16 * 1024
+    # Хвост части, в котором ищутся границы предложений
+    STREAM_SENTENCE_WINDOW = 4096
+
+    # Строки длиннее этого (в символах) сканируются паттернами частями
+    MAX_LINE_LENGTH = 64 * 1024
+    # Части длинной строки сканируются с таким запасом за разрезом: это больше
+    # любого реального совпадения (email не длиннее 254 символов)
+    LINE_OVERLAP = 1024
+
+    # Файлы от этого размера (в байтах) обрабатываются через mmap
+    # (anonymize_mapped_file) окнами по MMAP_WINDOW байт
+    MMAP_MIN_SIZE = 32 * 1024 * 1024
+    MMAP_WINDOW = 1024 * 1024
+    # Кодировки, в которых байты ASCII всегда означают символы ASCII. Имена -
+    # как их возвращает codecs.lookup(...).name (latin-1 -> iso8859-1)
+    MMAP_ENCODINGS = ('utf-8', 'ascii', 'cp1251', 'cp866', 'koi8-r', 'iso8859-5', 'iso8859-1', 'kz1048')
+    # Строки, которые нужно декодировать: с не-ASCII байтами или заглавными
+    # буквами (ФИО, адреса, NER), а в остальных - с возможными совпадениями
+    # ИИН, IBAN, карты, телефона или email (надмножество паттернов для
+    # ASCII-строк без заглавных букв; разделители - любой символ, кроме цифр)
+    MAPPED_CANDIDATE = re.compile(
+        rb'[A-Z\x80-\xff]|@|[Kk][Zz][a-z0-9]{18}|[0-9]{12}'
+        rb'|[0-9]{4}[^0-9\n]?[0-9]{4}[^0-9\n]?[0-9]{4}[^0-9\n]?[0-9]{4}'
+        rb'|7[^0-9\n]?\(?[0-9]{3}\)?[^0-9\n]?[0-9]{3}[^0-9\n]?[0-9]{2}[^0-9\n]?[0-9]{2}'
+    )
+
+    # Разделитель абзацев для кэширования результатов (пустая строка между ними)
+    PARAGRAPH_SEPARATOR = re.compile(r'(\n\s*\n)')
+
+    # Имена, организации и места Natasha находит только в тексте с заглавными
+    # буквами; строки без них (числа, таблицы, пунктуация) в NER не передаются
+    NER_CANDIDATE = re.compile(r'[A-ZА-ЯЁӘҒҚҢӨҰҮҺІ]')
+
+    def __init__(self, registry=None, cache=None, stats=None, use_name_dictionary=None):
+        # Модели Natasha берутся из общего реестра и загружаются при первом
+        # обращении, а не при создании анонимизатора
+        self.registry = registry or model_registry.registry
+        self.models = model_registry.ModelSet(self.registry)
+
+        # Кэш результатов по абзацам (cache.ParagraphCache), необязательный
+        self.cache = cache
+
+        # Замеры этапов (stats.Stats); по умолчанию отключены
+        self.stats = stats or NULL_STATS
+
+        self.use_name_dictionary = self.USE_NAME_DICTIONARY if use_name_dictionary is None else use_name_dictionary
 
         # Паттерн для ИИН (12 цифр)
         self.IIN_PATTERN = re.compile(r'\b\d{12}\b')
         self.IIN_REPLACEMENT = '[ИИН]'
 
-        # Для случаев, когда Natasha может не распознать
-        self.FIO_PATTERN = re.compile(r'\b[А-ЯЁ][а-яё]+(\s+[А-ЯЁ][а-яё]+){1,2}\b')
-        self.FIO_ENG_PATTERN = re.compile(r'\b[A-Z][a-z]+(\s+[A-Z][a-z]+){1,2}\b')
+        # Для случаев, когда Natasha может не распознать. ФИО, email и адреса
+        # ищутся по словам (matchers), а не регулярными выражениями с возвратами,
+        # чтобы время обработки строки оставалось линейным
+        self.FIO_PATTERN = CapitalizedWordsMatcher('FIO', 'А-ЯЁ', 'а-яё')
+        self.FIO_ENG_PATTERN = CapitalizedWordsMatcher('FIO_ENG', 'A-Z', 'a-z')
 
         # Паттерны для банковских счетов и карт
         self.BANK_ACCOUNT_PATTERN_KZ_IBAN = re.compile(r'\bKZ[A-Z0-9]{18}\b', re.IGNORECASE)
@@ -54,11 +112,11 @@ class Anonymizer:
         self.PHONE_PATTERN = re.compile(r'\+?7[\s\-]?\(?\d{3}\)?[\s\-]?\d{3}[\s\-]?\d{2}[\s\-]?\d{2}')
 
         # Паттерн для email адресов
-        self.EMAIL_PATTERN = re.compile(r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b')
+        self.EMAIL_PATTERN = EmailMatcher('EMAIL', r'[A-Za-z0-9._%+-]', r'[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b')
 
         # Паттерн для адресов
-        self.ADDRESS_PATTERN = re.compile(r'\b(ул|улица|пр|проспект|д|дом|кв|квартира)\.?\s+[А-Яа-яЁё0-9\s\.\,\-\/]+\b',
-                                          re.IGNORECASE)
+        self.ADDRESS_PATTERN = AddressMatcher('ADDRESS', ('ул', 'улица', 'пр', 'проспект', 'д', 'дом', 'кв', 'квартира'),
+                                              r'[А-Яа-яЁё0-9\s\.\,\-\/]')
 
         # Замены
         self.FIO_REPLACEMENT = '[ФИО]'
@@ -69,146 +127,1240 @@ class Anonymizer:
         self.ORG_REPLACEMENT = '[ОРГАНИЗАЦИЯ]'
         self.LOC_REPLACEMENT = '[МЕСТО]'
 
+        # Замены для сущностей, найденных Natasha
+        self._ner_replacements = {
+            PER: self.FIO_REPLACEMENT,
+            ORG: self.ORG_REPLACEMENT,
+            LOC: self.LOC_REPLACEMENT,
+        }
+
+        # Порядок приоритета при пересечении совпадений - порядок, в котором
+        # паттерны раньше заменялись по очереди: более ранний паттерн побеждает.
+        # Последний элемент - класс символов, с которых может начинаться совпадение
+        self.PATTERN_PRIORITY = [
+            ('IIN', self.IIN_PATTERN, self.IIN_REPLACEMENT, r'0-9'),
+            ('FIO', self.FIO_PATTERN, self.FIO_REPLACEMENT, r'А-ЯЁ'),
+            ('FIO_ENG', self.FIO_ENG_PATTERN, self.FIO_REPLACEMENT, r'A-Z'),
+            ('KZ_IBAN', self.BANK_ACCOUNT_PATTERN_KZ_IBAN, self.BANK_ACCOUNT_REPLACEMENT, r'Kk'),
+            ('CARD', self.BANK_CARD_PATTERN, self.BANK_ACCOUNT_REPLACEMENT, r'0-9'),
+            ('PHONE', self.PHONE_PATTERN, self.PHONE_REPLACEMENT, r'+7'),
+            ('EMAIL', self.EMAIL_PATTERN, self.EMAIL_REPLACEMENT, r'A-Za-z0-9._%+\-'),
+            ('ADDRESS', self.ADDRESS_PATTERN, self.ADDRESS_REPLACEMENT, r'уУпПдДкК'),
+        ]
+        self._compile_scanners()
+
+        # Результаты в кэше действительны только для того же набора паттернов и замен
+        fingerprint = repr([(name, pattern.pattern, pattern.flags, replacement)
+                            for name, pattern, replacement, _ in self.PATTERN_PRIORITY])
+        fingerprint += repr(sorted(self._ner_replacements.items()))
+        if self.use_name_dictionary:
+            fingerprint += f'names:{NameDictionary.VERSION}'
+        self._cache_salt = hashlib.blake2b(fingerprint.encode('utf-8'), digest_size=16).hexdigest()
+
+    @property
+    def segmenter(self):
+        return self.models.get('segmenter')
+
+    @property
+    def morph_vocab(self):
+        return self.models.get('morph_vocab')
+
+    @property
+    def emb(self):
+        return self.models.get('embedding')
+
+    @property
+    def ner_tagger(self):
+        return self.models.get('ner_tagger')
+
+    @property
+    def names_extractor(self):
+        return self.models.get('names_extractor')
+
+    @property
+    def name_dictionary(self):
+        return self.models.get('name_dictionary')
+
+    def load_models(self, progress_callback=None):
+        """Предварительная загрузка моделей (например, в фоновом потоке)"""
+        total = len(self.WARM_UP_MODELS)
+        for index, name in enumerate(self.WARM_UP_MODELS, 1):
+            self.models.get(name)
+            if progress_callback:
+                progress_callback(name, index, total)
+
+    def close(self):
+        """Возврат моделей в общий реестр"""
+        self.models.close()
+
+    def _compile_scanners(self):
+        """Сборка всех паттернов в один сканер для прохода по строке за один раз"""
+        self._replacements = {name: replacement for name, _, replacement, _ in self.PATTERN_PRIORITY}
+        self._matchers = {
+            name: RegexMatcher(name, pattern) if isinstance(pattern, re.Pattern) else pattern
+            for name, pattern, _, _ in self.PATTERN_PRIORITY
+        }
+        ranks = {name: index for index, (name, _, _, _) in enumerate(self.PATTERN_PRIORITY)}
+
+        # Одинаковые сканеры разных наборов общие, чтобы результаты поиска
+        # по строке переиспользовались
+        combined = {}
+
+        def combine(entries):
+            members = []
+            scanned = tuple((self._matchers[name], first) for name, _, _, first in entries
+                            if self._matchers[name].trigger is not None)
+            if scanned:
+                key = tuple(matcher.name for matcher, _ in scanned)
+                if key not in combined:
+                    combined[key] = CombinedMatcher(scanned)
+                members.append(combined[key])
+            members.extend(self._matchers[name] for name, _, _, _ in entries
+                           if self._matchers[name].trigger is None)
+            return PatternSet(members, ranks)
+
+        # Альтернативы перечислены в порядке приоритета: при совпадениях,
+        # начинающихся в одной позиции, побеждает более приоритетная
+        self._scanner = combine(self.PATTERN_PRIORITY)
+
+        # Для каждого паттерна - сканер более приоритетных паттернов, совпадение
+        # которых может оказаться внутри его совпадения (например, ИИН после адреса)
+        self._priority_scanners = {
+            name: combine(self.PATTERN_PRIORITY[:index])
+            for index, (name, _, _, _) in enumerate(self.PATTERN_PRIORITY)
+            if index > 0
+        }
+
+        # Для каждого паттерна - менее приоритетные: раньше они заменялись
+        # позже и видели перед собой скобку его замены
+        self._later_names = {
+            name: frozenset(later for later, _, _, _ in self.PATTERN_PRIORITY[index + 1:])
+            for index, (name, _, _, _) in enumerate(self.PATTERN_PRIORITY)
+        }
+
+    def _find_priority_match(self, scanner, context, start, stop):
+        """Поиск более приоритетного совпадения, начинающегося внутри (start, stop]"""
+        pos = start + 1
+        while pos <= stop:
+            candidate = scanner.search(context, pos)
+            if not candidate or candidate[0] > stop:
+                return None
+            # Найденное совпадение само может быть полностью вытеснено
+            # ещё более приоритетным - тогда обрезать нужно по тому
+            name = candidate[2]
+            deeper_scanner = self._priority_scanners.get(name)
+            deeper = deeper_scanner and self._find_priority_match(
+                deeper_scanner, context, candidate[0], candidate[1])
+            if not deeper or self._matchers[name].match(context, candidate[0], deeper[0]):
+                return candidate
+            if deeper[0] <= stop:
+                return deeper
+            pos = candidate[0] + 1
+        return None
+
+    def _scan_line(self, line, pos=0, endpos=None):
+        """Поиск всех совпадений паттернов в строке за один проход слева направо.
+
+        Строкой может быть срез line[pos:endpos] большого текста - так текст не
+        приходится копировать по строкам. Возвращает неперекрывающиеся тройки
+        (start, stop, имя паттерна) с позициями относительно line. Время линейно
+        по длине строки; строки длиннее MAX_LINE_LENGTH сканируются частями.
+        """
+        if endpos is None:
+            endpos = len(line)
+        # Конец последнего совпадения: при замене за ним окажется скобка, то есть
+        # граница слова для менее приоритетных паттернов - как при прежней
+        # последовательной замене паттернов
+        boundary, boundary_names = None, ()
+        while True:
+            segment_end = endpos
+            if endpos - pos > self.MAX_LINE_LENGTH:
+                # Разрез по границе предложения или слова, как при потоковой обработке
+                segment_end = pos + self._find_stream_cut(line[pos:pos + self.MAX_LINE_LENGTH],
+                                                          self.MAX_LINE_LENGTH)
+            # Совпадение, начавшееся до разреза, может продолжаться за ним: часть
+            # видит еще LINE_OVERLAP символов, а совпадения, начавшиеся после
+            # разреза, остаются следующей части
+            context = LineContext(line, pos, min(endpos, segment_end + self.LINE_OVERLAP))
+            context.boundary, context.boundary_names = boundary, boundary_names
+
+            while True:
+                match = self._scanner.search(context, pos)
+                if not match or match[0] >= segment_end:
+                    break
+                start, stop, name = match
+
+                priority_scanner = self._priority_scanners.get(name)
+                if priority_scanner:
+                    # Совпадение не должно поглощать более приоритетное совпадение
+                    # (и цепляться за границу слова перед ним): обрезаем его там,
+                    # где оно начинается, и продолжаем с этого места
+                    inner = self._find_priority_match(priority_scanner, context, start, stop)
+                    if inner:
+                        truncated = self._matchers[name].match(context, start, inner[0])
+                        if truncated:
+                            yield truncated
+                        pos = inner[0]
+                        continue
+
+                yield match
+                pos = boundary = stop
+                boundary_names = self._later_names[name]
+                context.boundary, context.boundary_names = boundary, boundary_names
+
+            if segment_end == endpos:
+                return
+            pos = max(pos, segment_end)
+
     def anonymize_text(self, input_text):
         if not input_text:
             return ""
 
-        # Обработка паттернами для отдельных строк
-        lines = input_text.split('\n')
-        anonymized_lines = [self.anonymize_line(line) for line in lines]
-        preprocessed_text = '\n'.join(anonymized_lines)
-
-        # Обработка текста с помощью Natasha для лучшего распознавания сущностей
-        doc = Doc(preprocessed_text)
-        doc.segment(self.segmenter)
-        doc.tag_ner(self.ner_tagger)
-
-        # Замена найденных именованных сущностей
-        anonymized_text = preprocessed_text
+        if self.cache is None:
+            return self._anonymize_batch([input_text])[0]
+
+        # Абзацы, уже встречавшиеся раньше, берутся из кэша без обработки;
+        # остальные обрабатываются одним пакетом
+        parts = self.PARAGRAPH_SEPARATOR.split(input_text)
+        parts[::2] = self.anonymize_texts(parts[::2], self.cache)
+        self.cache.flush()
+        return ''.join(parts)
+
+    def anonymize_texts(self, texts, cache=None):
+        """Анонимизация нескольких независимых текстов с одним пакетным прогоном NER.
+
+        Если передан cache (cache.ParagraphCache), готовые результаты берутся
+        из него, а обрабатываются только новые тексты.
+        """
+        if cache is None:
+            return self._anonymize_batch(texts)
+
+        results = {}
+        missing = []
+        for text in texts:
+            if text in results:
+                continue
+            results[text] = cache.get(text, self._cache_salt) if text.strip() else text
+            if results[text] is None:
+                missing.append(text)
+
+        for text, result in zip(missing, self._anonymize_batch(missing)):
+            results[text] = result
+            cache.put(text, result, self._cache_salt)
+
+        return [results[text] for text in texts]
+
+    def _anonymize_batch(self, texts):
+        stats = self.stats
+        if stats.enabled:
+            stats.count('texts', len(texts))
+            stats.count('chars', sum(map(len, texts)))
+
+        # Все совпадения ищутся по исходному тексту: сначала паттерны и словарь
+        # имен, затем Natasha - только там, где их оказалось недостаточно
+        known_spans = []
+        for text in texts:
+            with stats.stage('regex'):
+                spans = self._pattern_spans(text)
+            spans.extend(self._name_spans(text))
+            known_spans.append(spans)
+
+        results = []
+        for text, spans, ner_spans in zip(texts, known_spans, self._ner_spans_batch(texts, known_spans)):
+            spans.extend(ner_spans)
+            with stats.stage('replace'):
+                results.append(self._apply_spans(text, spans))
+        return results
+
+    def anonymize_stream(self, source, chunk_size=None):
+        """Потоковая анонимизация текста произвольного размера.
+
+        source - файловый объект или итерируемый набор строк. Текст
+        накапливается до chunk_size символов, режется по границе абзаца или
+        предложения (razdel) и анонимизируется по частям; неполное последнее
+        предложение переносится в следующую часть, поэтому сущности на стыке
+        частей не разрываются. Генератор отдает результат частями, память
+        ограничена размером части.
+        """
+        chunk_size = chunk_size or self.STREAM_CHUNK_SIZE
+        pieces = source
+        if hasattr(source, 'read'):
+            pieces = iter(lambda: source.read(chunk_size), '')
+
+        pending = []
+        pending_size = 0
+        for piece in pieces:
+            if not piece:
+                continue
+            pending.append(piece)
+            pending_size += len(piece)
+            if pending_size < chunk_size:
+                continue
+
+            buffer = ''.join(pending)
+            while len(buffer) >= chunk_size:
+                cut = self._find_stream_cut(buffer, chunk_size)
+                yield self.anonymize_text(buffer[:cut])
+                buffer = buffer[cut:]
+            pending = [buffer] if buffer else []
+            pending_size = len(buffer)
+
+        if pending:
+            yield self.anonymize_text(''.join(pending))
+
+    def _find_stream_cut(self, text, limit):
+        """Позиция разреза не дальше limit: граница абзаца, предложения, строки или слова"""
+        paragraph = text.rfind('\n\n', 0, limit)
+        if paragraph > 0:
+            return paragraph + 2
+
+        # Предложения ищутся только в хвосте, чтобы не сегментировать всю часть
+        window_start = max(0, limit - self.STREAM_SENTENCE_WINDOW)
+        with self.stats.stage('segmentation'):
+            boundaries = [window_start + sentence.start
+                          for sentence in list(sentenize(text[window_start:limit]))[1:]]
+        if boundaries:
+            # Граница предложения в начале строки не разрывает и совпадения паттернов
+            line_starts = [boundary for boundary in boundaries if text[boundary - 1] == '\n']
+            return (line_starts or boundaries)[-1]
+
+        line = text.rfind('\n', 0, limit)
+        if line > 0:
+            return line + 1
+
+        space = max(text.rfind(' ', 0, limit), text.rfind('\t', 0, limit))
+        if space > 0:
+            return space + 1
+
+        return limit
+
+    def anonymize_file(self, input_path, output_path, encoding='utf-8', chunk_size=None, regex_only=False):
+        """Потоковая анонимизация текстового файла без загрузки его целиком в память.
+
+        Файлы от MMAP_MIN_SIZE байт в поддерживаемых кодировках обрабатываются
+        через mmap (anonymize_mapped_file). regex_only - только паттерны, без
+        словаря имен и NER. Символы замен, которых нет в кодировке (кириллица
+        в latin-1 или ascii), записываются как '?'.
+        """
+        if os.path.getsize(input_path) >= self.MMAP_MIN_SIZE and self.supports_mapped_file(encoding):
+            return self.anonymize_mapped_file(input_path, output_path, encoding, regex_only)
+
+        with open(input_path, 'r', encoding=encoding) as source, \
+                open(output_path, 'w', encoding=encoding, errors='replace') as target:
+            if regex_only:
+                for line in source:
+                    target.write(self.anonymize_line(line))
+                return
+            for part in self.anonymize_stream(source, chunk_size):
+                target.write(part)
+
+    def supports_mapped_file(self, encoding):
+        try:
+            return codecs.lookup(encoding).name in self.MMAP_ENCODINGS
+        except LookupError:
+            return False
 
+    def anonymize_mapped_file(self, input_path, output_path, encoding='utf-8', regex_only=False, window=None):
+        """Анонимизация большого файла через mmap за один последовательный проход.
+
+        Файл не читается в память и не декодируется целиком: строки, которые
+        нужно обработать, находятся одним поиском по байтам (MAPPED_CANDIDATE),
+        декодируются и анонимизируются группами соседних строк, а остальные
+        записываются в результат прямо из отображения. Кодировка должна быть
+        совместимой с ASCII (MMAP_ENCODINGS). Переводы строк сохраняются как в
+        исходном файле.
+        """
+        if not self.supports_mapped_file(encoding):
+            raise ValueError(f"Кодировка не поддерживается для mmap: {encoding}")
+        window = window or self.MMAP_WINDOW
+        stats = self.stats
+
+        with open(input_path, 'rb') as source, open(output_path, 'wb') as target:
+            size = os.fstat(source.fileno()).st_size
+            if not size:
+                return
+            with mmap.mmap(source.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                view = memoryview(mapped)
+                try:
+                    pos = 0
+                    while pos < size:
+                        # Окно заканчивается на границе строки
+                        end = min(pos + window, size)
+                        if end < size:
+                            newline = mapped.rfind(b'\n', pos, end)
+                            if newline == -1:
+                                newline = mapped.find(b'\n', end)
+                            end = size if newline == -1 else newline + 1
+
+                        regions = self._mapped_regions(mapped, pos, end)
+                        with stats.stage('decode'):
+                            texts = [str(view[start:stop], encoding) for start, stop in regions]
+                        last = pos
+                        for (start, stop), result in zip(regions, self._anonymize_regions(texts, regex_only)):
+                            target.write(view[last:start])
+                            # Исходные символы кодируются обратно; '?' - только для замен
+                            target.write(result.encode(encoding, 'replace'))
+                            last = stop
+                        target.write(view[last:end])
+                        if stats.enabled:
+                            stats.count('mmap.decoded_bytes', sum(stop - start for start, stop in regions))
+                        pos = end
+                finally:
+                    view.release()
+        if stats.enabled:
+            stats.count('mmap.bytes', size)
+
+    def _mapped_regions(self, mapped, pos, end):
+        """Участки (start, stop) из целых соседних строк mapped[pos:end], которые нужно декодировать"""
+        regions = []
+        search = pos
+        with self.stats.stage('regex'):
+            while search < end:
+                candidate = self.MAPPED_CANDIDATE.search(mapped, search, end)
+                if candidate is None:
+                    break
+                line_start = mapped.rfind(b'\n', pos, candidate.start()) + 1 or pos
+                line_end = mapped.find(b'\n', candidate.end(), end)
+                line_end = end if line_end == -1 else line_end + 1
+                if regions and regions[-1][1] >= line_start:
+                    regions[-1] = (regions[-1][0], line_end)
+                else:
+                    regions.append((line_start, line_end))
+                search = line_end
+        return regions
+
+    def _anonymize_regions(self, texts, regex_only):
+        """Анонимизация участков одного окна; небольшие - одним пакетным прогоном NER"""
+        # Переводы строк \r\n обрабатываются как \n, как при чтении в текстовом режиме
+        normalized = [text.replace('\r\n', '\n') for text in texts]
+        if regex_only:
+            results = ['\n'.join(map(self.anonymize_line, text.split('\n'))) for text in normalized]
+        else:
+            small = [text for text in normalized if len(text) <= self.STREAM_CHUNK_SIZE]
+            done = dict(zip(small, self.anonymize_texts(small, self.cache)))
+            if self.cache is not None:
+                self.cache.flush()
+            results = [done[text] if text in done else ''.join(self.anonymize_stream([text]))
+                       for text in normalized]
+        return [result.replace('\n', '\r\n') if len(text) != len(original) else result
+                for original, text, result in zip(texts, normalized, results)]
+
+    def _pattern_spans(self, text):
+        """Совпадения регулярных выражений по всему тексту (построчно, без копирования строк)"""
         spans = []
-        for span in doc.spans:
-            if span.type == PER:  # Персоны (ФИО)
-                spans.append((span.start, span.stop, self.FIO_REPLACEMENT))
-            elif span.type == ORG:  # Организации
-                spans.append((span.start, span.stop, self.ORG_REPLACEMENT))
-            elif span.type == LOC:  # Локации
-                spans.append((span.start, span.stop, self.LOC_REPLACEMENT))
-
-        # Сортируем span'ы в обратном порядке, чтобы не сбивать индексы при замене
-        spans.sort(key=lambda x: x[0], reverse=True)
-
-        # Применяем замены
-        result = anonymized_text
-        for start, stop, replacement in spans:
-            result = result[:start] + replacement + result[stop:]
-
-        return result
+        counts = {} if self.stats.enabled else None
+        pos = 0
+        length = len(text)
+        while pos <= length:
+            endpos = text.find('\n', pos)
+            if endpos == -1:
+                endpos = length
+            for start, stop, name in self._scan_line(text, pos, endpos):
+                spans.append((start, stop, self._replacements[name]))
+                if counts is not None:
+                    counts[name] = counts.get(name, 0) + 1
+            pos = endpos + 1
+
+        if counts:
+            for name, value in counts.items():
+                self.stats.count(f'matches.{name}', value)
+        return spans
+
+    def _name_spans(self, text):
+        """ФИО, найденные словарем имен без NER"""
+        if not self.use_name_dictionary or not self.NER_CANDIDATE.search(text):
+            return []
+        with self.stats.stage('names'):
+            spans = [(start, stop, self.FIO_REPLACEMENT)
+                     for start, stop in self.name_dictionary.find_names(text)]
+        if spans and self.stats.enabled:
+            self.stats.count('names', len(spans))
+        return spans
+
+    def _ner_regions(self, text, known_spans=()):
+        """Участки текста (start, stop), которые нужно передать в NER.
+
+        Без словаря имен - весь текст, если в нем есть заглавные буквы. Со
+        словарем - группы соседних строк, где есть слова с заглавной буквы
+        вне known_spans, которые словарь не объясняет (организации, топонимы,
+        неизвестные слова).
+        """
+        if not text or not self.NER_CANDIDATE.search(text):
+            return []
+        if not self.use_name_dictionary:
+            return [(0, len(text))]
+
+        covered = []
+        for start, stop, _ in sorted(known_spans):
+            if covered and start <= covered[-1][1]:
+                covered[-1] = (covered[-1][0], max(covered[-1][1], stop))
+            else:
+                covered.append((start, stop))
+
+        names = self.name_dictionary
+        regions = []
+        pos = 0
+        length = len(text)
+        while pos <= length:
+            endpos = text.find('\n', pos)
+            if endpos == -1:
+                endpos = length
+            if names.needs_ner(text, pos, endpos, covered):
+                if regions and regions[-1][1] == pos - 1:
+                    regions[-1] = (regions[-1][0], endpos)
+                else:
+                    regions.append((pos, endpos))
+            pos = endpos + 1
+        return regions
+
+    def _ner_spans_batch(self, texts, known_spans=None):
+        """Именованные сущности для набора текстов за один пакетный прогон NER.
+
+        Участки текстов (см. _ner_regions) передаются тегеру списком и
+        обрабатываются пакетами, а результаты возвращаются в том же порядке -
+        отдельно для каждого текста. Сегментация не нужна: тегер работает с
+        исходным текстом и сам возвращает позиции сущностей в нем.
+        known_spans - уже найденные для каждого текста замены.
+        """
+        results = [[] for _ in texts]
+        regions = []
+        for index, text in enumerate(texts):
+            regions.extend((index, start, stop)
+                           for start, stop in self._ner_regions(text, known_spans[index] if known_spans else ()))
+
+        stats = self.stats
+        if stats.enabled:
+            processed = len({index for index, _, _ in regions})
+            stats.count('ner.texts', processed)
+            stats.count('ner.skipped', len(texts) - processed)
+            stats.count('ner.chars', sum(stop - start for _, start, stop in regions))
+        if not regions:
+            return results
+
+        ner_tagger = self.ner_tagger
+        with stats.stage('ner'):
+            markups = ner_tagger.map([texts[index][start:stop] for index, start, stop in regions])
+            for (index, offset, _), markup in zip(regions, markups):
+                spans = results[index]
+                for span in markup.spans:
+                    replacement = self._ner_replacements.get(span.type)
+                    if replacement:
+                        spans.append((offset + span.start, offset + span.stop, replacement))
+                        if stats.enabled:
+                            stats.count(f'entities.{span.type}')
+        return results
+
+    def _apply_spans(self, text, spans):
+        """Слияние пересекающихся замен за один проход и сборка результата одним join"""
+        if not spans:
+            return text
+
+        # Сортировка устойчивая: при одинаковых границах остается первая замена
+        # (совпадения паттернов добавляются раньше сущностей Natasha)
+        spans.sort(key=lambda span: (span[0], -span[1]))
+
+        parts = []
+        last = 0
+        current_start, current_stop, current_replacement = spans[0]
+        for start, stop, replacement in spans[1:]:
+            if start < current_stop:
+                # Пересекающиеся замены объединяются, чтобы не оставить части данных
+                current_stop = max(current_stop, stop)
+                continue
+            parts.append(text[last:current_start])
+            parts.append(current_replacement)
+            last = current_stop
+            current_start, current_stop, current_replacement = start, stop, replacement
+
+        parts.append(text[last:current_start])
+        parts.append(current_replacement)
+        parts.append(text[current_stop:])
+        return ''.join(parts)
 
     def contains_personal_data(self, text):
-        if not text:
-            return False
+        return self.find_personal_data([text])[0]
+
+    def find_personal_data(self, texts):
+        """Пакетная проверка текстов (например, блоков OCR) на персональные данные.
+
+        Возвращает список флагов в порядке текстов. Тексты, не пойманные
+        паттернами и словарем имен, проверяются Natasha одним пакетным
+        прогоном NER.
+        """
+        flags = [False] * len(texts)
+        pending = []
+        with self.stats.stage('regex'):
+            for index, text in enumerate(texts):
+                if not text:
+                    continue
+                # Проверяем паттернами за один проход
+                if self._scanner.search(LineContext(text), 0):
+                    flags[index] = True
+                else:
+                    pending.append(index)
 
-        # Проверяем паттернами
-        if (self.FIO_PATTERN.search(text) or
-                self.FIO_ENG_PATTERN.search(text) or
-                self.IIN_PATTERN.search(text) or
-                self.BANK_ACCOUNT_PATTERN_KZ_IBAN.search(text) or
-                self.BANK_CARD_PATTERN.search(text) or
-                self.PHONE_PATTERN.search(text) or
-                self.EMAIL_PATTERN.search(text) or
-                self.ADDRESS_PATTERN.search(text)):
-            return True
-
-        # Проверяем с помощью Natasha
-        doc = Doc(text)
-        doc.segment(self.segmenter)
-        doc.tag_ner(self.ner_tagger)
+        remaining = []
+        for index in pending:
+            if self._name_spans(texts[index]):
+                flags[index] = True
+            else:
+                remaining.append(index)
 
         # Если найдена хотя бы одна сущность PER, LOC или ORG
-        for span in doc.spans:
-            if span.type in (PER, LOC, ORG):
-                return True
+        ner_spans = self._ner_spans_batch([texts[index] for index in remaining])
+        for index, spans in zip(remaining, ner_spans):
+            flags[index] = bool(spans)
 
-        return False
+        return flags
 
     def anonymize_line(self, line):
         """Обработка строки с помощью регулярных выражений"""
-        result = line
+        parts = []
+        last = 0
+        for start, stop, name in self._scan_line(line):
+            parts.append(line[last:start])
+            parts.append(self._replacements[name])
+            last = stop
 
-        # Обработка ИИН
-        result = self.IIN_PATTERN.sub(self.IIN_REPLACEMENT, result)
+        if not parts:
+            return line
 
-        # Обработка русскоязычных ФИО через регулярные выражения (базовый уровень)
-        result = self.FIO_PATTERN.sub(self.FIO_REPLACEMENT, result)
+        parts.append(line[last:])
+        return ''.join(parts)
 
-        # Обработка англоязычных ФИО
-        result = self.FIO_ENG_PATTERN.sub(self.FIO_REPLACEMENT, result)
 
-        # Обработка банковских счетов
-        result = self.BANK_ACCOUNT_PATTERN_KZ_IBAN.sub(self.BANK_ACCOUNT_REPLACEMENT, result)
+class ImageAnonymizer:
+    OCR_LANGUAGES = ('ru', 'en')  # Поддержка русского и английского
+    OCR_OPTIONS = {}  # Дополнительные параметры reader.readtext
+
+    # Режим CPU для серверов без GPU: распознаватель квантуется в int8, число
+    # потоков torch задается явно (None - по числу ядер). Настройки потоков
+    # действуют на весь процесс
+    CPU_MODE = False
+    OCR_QUANTIZE = True
+    OCR_THREADS = None
+    OCR_INTEROP_THREADS = 1
+    # Параметры batch_size и workers EasyOCR (размер пакета распознавания и
+    # число процессов загрузки вырезок)
+    OCR_BATCH_SIZE = 1
+    OCR_WORKERS = 0
+
+    # Пакетный режим (anonymize_images): вырезки строк текста всех изображений
+    # группы распознаются вместе пакетами по OCR_POOL_BATCH_SIZE вырезок
+    OCR_POOL_IMAGES = 16
+    OCR_POOL_BATCH_SIZE = 32
+    # Параметры recognize, которые поддерживает общее распознавание вырезок;
+    # с остальными (paragraph, rotation_info...) изображения читаются по одному
+    POOLED_RECOGNIZE_OPTIONS = frozenset({'decoder', 'beamWidth', 'batch_size', 'workers', 'allowlist',
+                                          'blocklist', 'contrast_ths', 'adjust_contrast', 'filter_ths'})
+
+    # Режим больших сканов: поиск текста на уменьшенной копии, распознавание
+    # по полосам исходного изображения высотой около OCR_TILE_SIZE пикселей
+    TILED_OCR_PIXELS = 16 * 1024 * 1024
+    OCR_DETECT_MAX_SIDE = 2560
+    OCR_TILE_SIZE = 2048
+
+    TIFF_EXTENSIONS = ('.tif', '.tiff')
+    # Сжатие страниц TIFF, которое сохраняется как есть; остальное (JPEG и т.п.)
+    # заменяется на deflate, двухцветные страницы сжимаются в CCITT G4
+    TIFF_COMPRESSIONS = ('raw', 'tiff_lzw', 'tiff_adobe_deflate', 'packbits')
+    # Число страниц многостраничного изображения, обрабатываемых одновременно
+    PAGE_WORKERS = min(4, os.cpu_count() or 1)
+
+    def __init__(self, anonymizer=None, registry=None, ocr_cache=None, tiled_ocr=None, stats=None,
+                 cpu_mode=None, ocr_threads=None):
+        self.registry = registry or model_registry.registry
+
+        # Модель OCR общая для всех экземпляров в процессе и загружается при первом обращении
+        self.models = model_registry.ModelSet(self.registry)
+
+        # Переиспользуем текстовый анонимизатор, если он передан
+        self._owns_anonymizer = anonymizer is None
+        self.anonymizer = anonymizer or Anonymizer(self.registry, stats=stats)
+
+        # По умолчанию замеры общие с текстовым анонимизатором
+        self.stats = stats or self.anonymizer.stats
+
+        # Дисковый кэш результатов OCR (cache.OcrCache), необязательный
+        self.ocr_cache = ocr_cache
+
+        # None - режим по размеру изображения, True/False - всегда/никогда
+        self.tiled_ocr = tiled_ocr
+        self.page_workers = self.PAGE_WORKERS
+
+        self.cpu_mode = self.CPU_MODE if cpu_mode is None else cpu_mode
+        self.ocr_quantize = self.OCR_QUANTIZE
+        self.ocr_threads = ocr_threads or self.OCR_THREADS
+        self.ocr_interop_threads = self.OCR_INTEROP_THREADS
+        self.ocr_batch_size = self.OCR_BATCH_SIZE
+        self.ocr_workers = self.OCR_WORKERS
+        self.ocr_pool_images = self.OCR_POOL_IMAGES
+        self.ocr_pool_batch_size = self.OCR_POOL_BATCH_SIZE
+
+    def _reader_options(self):
+        """Параметры модели OCR в реестре: читатели с разными параметрами - разные модели"""
+        options = {'languages': self.OCR_LANGUAGES}
+        if self.cpu_mode:
+            options.update(cpu_mode=True, quantize=self.ocr_quantize, threads=self.ocr_threads,
+                           interop_threads=self.ocr_interop_threads)
+        return options
+
+    def _ocr_options(self):
+        return dict(self.OCR_OPTIONS, batch_size=self.ocr_batch_size, workers=self.ocr_workers)
+
+    @property
+    def reader(self):
+        return self.models.get('ocr_reader', **self._reader_options())
+
+    @property
+    def is_ready(self):
+        """Загружена ли уже модель OCR"""
+        return self.models.is_loaded('ocr_reader', **self._reader_options())
+
+    def load_models(self, progress_callback=None):
+        """Предварительная загрузка модели OCR (например, в фоновом потоке)"""
+        self.models.get('ocr_reader', **self._reader_options())
+        if progress_callback:
+            progress_callback('ocr_reader', 1, 1)
+
+    def close(self):
+        """Возврат моделей в общий реестр"""
+        self.models.close()
+        if self._owns_anonymizer:
+            self.anonymizer.close()
+
+    def use_tiled_ocr(self, image):
+        if self.tiled_ocr is not None:
+            return self.tiled_ocr
+        return image.width * image.height > self.TILED_OCR_PIXELS
+
+    def _ocr_cache_key(self, image_path, tiled, page):
+        config = repr((self.OCR_LANGUAGES, sorted(self.OCR_OPTIONS.items()), tiled, page))
+        # Квантованный распознаватель может прочитать текст иначе, чем исходный
+        if self.cpu_mode and self.ocr_quantize:
+            config += ':int8'
+        return self.ocr_cache.key(image_path, config)
+
+    def _cached_text(self, key):
+        results = self.ocr_cache.get(key)
+        if results is not None and self.stats.enabled:
+            self.stats.count('ocr.cache_hits')
+        return results
+
+    def read_text(self, image_path, image, page=0, array=None):
+        """Результаты OCR для изображения; при наличии кэша повторно не распознаются.
+
+        array - уже готовый массив пикселей image (тогда он не копируется).
+        """
+        tiled = self.use_tiled_ocr(image)
+        if self.ocr_cache is None:
+            return self._read_text(image, tiled, array)
+
+        key = self._ocr_cache_key(image_path, tiled, page)
+        results = self._cached_text(key)
+        if results is None:
+            results = self._read_text(image, tiled, array)
+            self.ocr_cache.put(key, results)
+        return results
+
+    def read_texts(self, images):
+        """Результаты OCR для нескольких изображений - пар (путь, PIL.Image).
+
+        Текст ищется на каждом изображении отдельно, а вырезки строк всех
+        изображений распознаются вместе (см. _recognize_pooled). Большие
+        изображения (режим полос) и изображения из кэша обрабатываются как
+        в read_text. Возвращает списки результатов в порядке изображений.
+        """
+        results = [None] * len(images)
+        keys = [None] * len(images)
+        pooled = []
+        for index, (image_path, image) in enumerate(images):
+            tiled = self.use_tiled_ocr(image)
+            if self.ocr_cache is not None:
+                keys[index] = self._ocr_cache_key(image_path, tiled, 0)
+                results[index] = self._cached_text(keys[index])
+                if results[index] is not None:
+                    continue
+            if tiled:
+                results[index] = self._read_text(image, tiled)
+                if self.ocr_cache is not None:
+                    self.ocr_cache.put(keys[index], results[index])
+            else:
+                pooled.append(index)
+
+        if pooled:
+            options = self._ocr_options()
+            reader = self.reader
+            detect_parameters = inspect.signature(reader.detect).parameters
+            detect_options = {k: v for k, v in options.items() if k in detect_parameters}
+            recognize_options = {k: v for k, v in options.items() if k not in detect_parameters}
+            if set(recognize_options) <= self.POOLED_RECOGNIZE_OPTIONS:
+                with self.stats.stage('ocr'):
+                    recognized = self._recognize_pooled(
+                        reader, [images[index][1] for index in pooled], detect_options, recognize_options)
+                for index, image_results in zip(pooled, recognized):
+                    results[index] = image_results
+            else:
+                for index in pooled:
+                    results[index] = self._read_text(images[index][1], False)
+
+            if self.ocr_cache is not None:
+                for index in pooled:
+                    self.ocr_cache.put(keys[index], results[index])
+        return results
+
+    def _recognize_pooled(self, reader, images, detect_options, recognize_options):
+        """Поиск текста на каждом изображении и общее распознавание всех вырезок.
+
+        Вырезки строк сортируются по ширине и распознаются пакетами по
+        ocr_pool_batch_size, поэтому дополнение до общей ширины пакета
+        невелико. Каждая вырезка масштабируется так же, как в reader.readtext,
+        а результаты каждого изображения идут в том же порядке.
+        """
+        from easyocr import easyocr as easyocr_module
+        from easyocr.recognition import get_text
+        from easyocr.utils import get_image_list, reformat_input
+
+        model_height = easyocr_module.imgH
+        crops = []
+        for image_index, image in enumerate(images):
+            img, img_cv_grey = reformat_input(np.array(image))
+            horizontal_list, free_list = reader.detect(img, reformat=False, **detect_options)
+            boxes = [([box], []) for box in horizontal_list[0]] + [([], [box]) for box in free_list[0]]
+            for horizontal, free in boxes:
+                for box, crop in get_image_list(horizontal, free, img_cv_grey, model_height=model_height)[0]:
+                    crops.append((image_index, len(crops), box, crop))
+
+        allowlist = recognize_options.get('allowlist')
+        if allowlist:
+            ignore_char = ''.join(set(reader.character) - set(allowlist))
+        elif recognize_options.get('blocklist'):
+            ignore_char = ''.join(set(recognize_options['blocklist']))
+        else:
+            ignore_char = ''.join(set(reader.character) - set(reader.lang_char))
+
+        results = [[] for _ in images]
+        recognized = [None] * len(crops)
+        batch_size = self.ocr_pool_batch_size
+        ordered = sorted(crops, key=lambda item: item[3].shape[1])
+        for start in range(0, len(ordered), batch_size):
+            batch = ordered[start:start + batch_size]
+            # Ширина входа - как у самой широкой вырезки пакета, кратно высоте
+            width = max(1, math.ceil(batch[-1][3].shape[1] / model_height)) * model_height
+            texts = get_text(
+                reader.character, model_height, width, reader.recognizer, reader.converter,
+                [(box, crop) for _, _, box, crop in batch], ignore_char,
+                recognize_options.get('decoder', 'greedy'), recognize_options.get('beamWidth', 5),
+                len(batch), recognize_options.get('contrast_ths', 0.1),
+                recognize_options.get('adjust_contrast', 0.5), recognize_options.get('filter_ths', 0.003),
+                recognize_options.get('workers', 0), reader.device)
+            for (_, order, _, _), result in zip(batch, texts):
+                recognized[order] = result
+
+        for (image_index, _, _, _), result in zip(crops, recognized):
+            results[image_index].append(result)
+        if self.stats.enabled:
+            self.stats.count('ocr.pooled_images', len(images))
+            self.stats.count('ocr.pooled_crops', len(crops))
+        return results
+
+    def _read_text(self, image, tiled, array=None):
+        reader = self.reader
+        with self.stats.stage('ocr'):
+            if not tiled:
+                if array is None:
+                    array = np.array(self._ocr_image(image))
+                return reader.readtext(array, **self._ocr_options())
+            return self._read_text_tiled(image)
+
+    @staticmethod
+    def _ocr_image(image):
+        """Изображение в режиме L или RGB для EasyOCR.
+
+        Двухцветные, серые и палитровые изображения с серой палитрой
+        переводятся в L (в три раза меньше памяти, чем RGB), в RGB - только
+        цветные: с цветной палитрой, RGBA, CMYK и т.п.
+        """
+        if image.mode in ('L', 'RGB'):
+            return image
+        mode = ImageMode.getmode(image.mode).basemode
+        if mode == 'P':
+            palette = image.getpalette() or []
+            gray = all(red == green == blue for red, green, blue in zip(*[iter(palette)] * 3))
+            mode = 'L' if gray else 'RGB'
+        return image.convert(mode)
+
+    def _read_text_tiled(self, image):
+        """OCR большого изображения без полной копии в numpy.
+
+        Рамки текста ищутся на уменьшенной копии и переводятся в координаты
+        исходного изображения. Распознавание идет по горизонтальным полосам:
+        каждая рамка относится к полосе по верхнему краю, а вырезка полосы
+        расширяется до всех ее рамок, поэтому текст не разрезается и не
+        распознается дважды.
+        """
+        reader = self.reader
+        detect_parameters = inspect.signature(reader.detect).parameters
+        options = self._ocr_options()
+        detect_options = {k: v for k, v in options.items() if k in detect_parameters}
+        recognize_options = {k: v for k, v in options.items() if k not in detect_parameters}
+
+        image = self._ocr_image(image)
+        width, height = image.size
+
+        # Поиск текста на уменьшенной копии
+        factor = max(1, math.ceil(max(width, height) / self.OCR_DETECT_MAX_SIDE))
+        small = image.reduce(factor) if factor > 1 else image
+        horizontal_list, free_list = reader.detect(np.asarray(small), **detect_options)
+        del small
+
+        # Рамки в координатах исходного изображения: (x_min, x_max, y_min, y_max) и 4 точки
+        boxes = []
+        for x_min, x_max, y_min, y_max in horizontal_list[0]:
+            box = [max(0, int(x_min * factor)), min(width, int(x_max * factor)),
+                   max(0, int(y_min * factor)), min(height, int(y_max * factor))]
+            boxes.append(('horizontal', box, box))
+        for points in free_list[0]:
+            points = [[x * factor, y * factor] for x, y in points]
+            xs = [x for x, _ in points]
+            ys = [y for _, y in points]
+            bounds = [max(0, int(min(xs))), min(width, math.ceil(max(xs))),
+                      max(0, int(min(ys))), min(height, math.ceil(max(ys)))]
+            boxes.append(('free', points, bounds))
+
+        bands = {}
+        for kind, box, bounds in boxes:
+            if bounds[0] < bounds[1] and bounds[2] < bounds[3]:
+                bands.setdefault(bounds[2] // self.OCR_TILE_SIZE, []).append((kind, box, bounds))
+
+        results = []
+        for band in sorted(bands):
+            items = bands[band]
+            left = min(bounds[0] for _, _, bounds in items)
+            right = max(bounds[1] for _, _, bounds in items)
+            top = min(bounds[2] for _, _, bounds in items)
+            bottom = max(bounds[3] for _, _, bounds in items)
+
+            horizontal = []
+            free = []
+            for kind, box, _ in items:
+                if kind == 'horizontal':
+                    horizontal.append([box[0] - left, box[1] - left, box[2] - top, box[3] - top])
+                else:
+                    free.append([[x - left, y - top] for x, y in box])
 
-        # Обработка номеров карт
-        result = self.BANK_CARD_PATTERN.sub(self.BANK_ACCOUNT_REPLACEMENT, result)
+            tile = np.asarray(image.crop((left, top, right, bottom)).convert('L'))
+            for bbox, text, confidence in reader.recognize(tile, horizontal, free, reformat=False,
+                                                           **recognize_options):
+                bbox = [[x + left, y + top] for x, y in bbox]
+                results.append((bbox, text, confidence))
 
-        # Обработка телефонов
-        result = self.PHONE_PATTERN.sub(self.PHONE_REPLACEMENT, result)
+        return results
 
-        # Обработка email
-        result = self.EMAIL_PATTERN.sub(self.EMAIL_REPLACEMENT, result)
+    def process_image(self, image_path, progress_callback=None):
+        """Анонимизация изображения; возвращает путь к сохраненному результату.
 
-        # Обработка адресов
-        result = self.ADDRESS_PATTERN.sub(self.ADDRESS_REPLACEMENT, result)
+        progress_callback(done, total, message) вызывается между этапами и может
+        прервать обработку исключением OperationCancelled.
+        """
+        try:
+            # Сохраняем анонимизированное изображение с префиксом 'anon_'
+            base_name = os.path.basename(image_path)
+            dir_path = os.path.dirname(image_path)
+            anon_path = os.path.join(dir_path, f"anon_{base_name}")
 
-        return result
+            return self.anonymize_image(image_path, anon_path, progress_callback)
 
+        except OperationCancelled:
+            raise
+        except Exception as e:
+            print(f"Ошибка при обработке изображения: {str(e)}")
+            traceback.print_exc()
+            return None
 
-class ImageAnonymizer:
-    def __init__(self):
-        # Инициализация модели OCR один раз при создании класса
-        self.reader = easyocr.Reader(['ru', 'en'])  # Поддержка русского и английского
-        self.anonymizer = Anonymizer()  # Переиспользуем текстовый анонимизатор
+    def anonymize_image(self, image_path, output_path, progress_callback=None):
+        """Анонимизация изображения с сохранением в output_path.
 
-    def process_image(self, image_path):
-        try:
-            # Загрузка изображения
+        Возвращает output_path или None, если текст на изображении не найден
+        (тогда ничего не сохраняется). Ошибки не перехватываются.
+        """
+        if self.page_count(image_path) > 1:
+            return self.anonymize_pages(image_path, output_path, progress_callback)
+
+        def report(done, message):
+            if progress_callback:
+                progress_callback(done, 4, message)
+
+        image = self._redact(image_path, report)
+        if image is None:
+            return None
+
+        report(3, "Сохранение результата")
+        with self.stats.stage('image.encode'):
+            image.save(output_path)
+
+        return output_path
+
+    def anonymize_images(self, jobs, progress_callback=None):
+        """Пакетная анонимизация изображений - пар (путь, путь результата).
+
+        Изображения обрабатываются группами по ocr_pool_images: OCR группы
+        выполняется одним вызовом read_texts, затем каждое изображение
+        закрашивается и сохраняется. Многостраничные изображения обрабатываются
+        по одному (anonymize_image). Возвращает для каждой пары путь результата
+        или None, если текст не найден. Ошибки не перехватываются.
+        progress_callback(done, total, message) вызывается после каждой группы.
+        """
+        outputs = [None] * len(jobs)
+        total = len(jobs)
+        for start in range(0, total, self.ocr_pool_images):
+            group = []
+            for index in range(start, min(start + self.ocr_pool_images, total)):
+                image_path, output_path = jobs[index]
+                if self.page_count(image_path) > 1:
+                    outputs[index] = self.anonymize_image(image_path, output_path)
+                    continue
+                with self.stats.stage('image.load'):
+                    image = Image.open(image_path)
+                    image.load()
+                group.append((index, image_path, image))
+
+            results = self.read_texts([(image_path, image) for _, image_path, image in group])
+            for (index, _, image), image_results in zip(group, results):
+                if not image_results:
+                    continue
+                self._draw_redactions(image, image_results)
+                with self.stats.stage('image.encode'):
+                    image.save(jobs[index][1])
+                outputs[index] = jobs[index][1]
+            del group, results
+
+            if progress_callback:
+                done = min(start + self.ocr_pool_images, total)
+                progress_callback(done, total, f"Обработано изображений: {done} из {total}")
+        return outputs
+
+    def redact_image(self, image_path, progress_callback=None):
+        """Анонимизация изображения в памяти, без записи на диск.
+
+        Возвращает PIL.Image с закрашенными персональными данными или None,
+        если текст на изображении не найден. Ошибки не перехватываются.
+        """
+        def report(done, message):
+            if progress_callback:
+                progress_callback(done, 3, message)
+
+        return self._redact(image_path, report)
+
+    def _redact(self, image_path, report):
+        # Загрузка изображения
+        report(0, "Загрузка изображения")
+        with self.stats.stage('image.load'):
             image = Image.open(image_path)
-            image_np = np.array(image)
+            image.load()
 
-            # Распознавание текста на изображении
-            results = self.reader.readtext(image_np)
+        # Распознавание текста на изображении
+        report(1, "Распознавание текста")
+        results = self.read_text(image_path, image)
 
-            # Если текст найден, обрабатываем его
-            if results:
-                # Создаем объект для рисования на изображении
-                draw = ImageDraw.Draw(image)
+        # Если текст не найден
+        if not results:
+            return None
 
-                for (bbox, text, prob) in results:
-                    # Проверяем, содержит ли текст персональные данные
-                    if self.anonymizer.contains_personal_data(text):
-                        # Координаты рамки текста
-                        (top_left, top_right, bottom_right, bottom_left) = bbox
+        report(2, "Поиск персональных данных")
+        self._draw_redactions(image, results)
+        return image
 
-                        # Рисуем закрашенный прямоугольник поверх персональных данных
-                        draw.rectangle([
-                            (int(top_left[0]), int(top_left[1])),
-                            (int(bottom_right[0]), int(bottom_right[1]))
-                        ], fill="black")
+    def redact_pixels(self, image, array, image_path=None):
+        """Анонимизация изображения на месте, без копий пикселей.
 
-                # Сохраняем анонимизированное изображение с префиксом 'anon_'
-                base_name = os.path.basename(image_path)
-                dir_path = os.path.dirname(image_path)
-                anon_path = os.path.join(dir_path, f"anon_{base_name}")
-                image.save(anon_path)
+        image - PIL.Image, разделяющий пиксели с array (например, созданный
+        Image.frombuffer над общей памятью); персональные данные закрашиваются
+        прямо в array. Возвращает False, если текст на изображении не найден.
+        """
+        results = self.read_text(image_path, image, array=array)
+        if not results:
+            return False
 
-                return anon_path
+        boxes = self._redaction_boxes(results)
+        with self.stats.stage('draw'):
+            for x0, y0, x1, y1 in boxes:
+                region = array[max(0, y0):y1 + 1, max(0, x0):x1 + 1]
+                region[...] = 0
+                if image.mode == 'RGBA':
+                    region[..., 3] = 255
+        return True
+
+    def _redaction_boxes(self, results):
+        """Рамки (x0, y0, x1, y1) блоков текста с персональными данными"""
+        # Проверяем все блоки текста на персональные данные одним пакетом
+        flags = self.anonymizer.find_personal_data([text for _, text, _ in results])
+
+        boxes = []
+        for (bbox, text, prob), flagged in zip(results, flags):
+            if flagged:
+                # Координаты рамки текста
+                (top_left, top_right, bottom_right, bottom_left) = bbox
+                boxes.append((int(top_left[0]), int(top_left[1]), int(bottom_right[0]), int(bottom_right[1])))
+
+        if self.stats.enabled:
+            self.stats.count('images')
+            self.stats.count('ocr.boxes', len(results))
+            self.stats.count('ocr.boxes_redacted', sum(flags))
+        return boxes
+
+    def _draw_redactions(self, image, results):
+        boxes = self._redaction_boxes(results)
+
+        # Создаем объект для рисования на изображении
+        draw = ImageDraw.Draw(image)
+
+        with self.stats.stage('draw'):
+            for x0, y0, x1, y1 in boxes:
+                # Рисуем закрашенный прямоугольник поверх персональных данных
+                draw.rectangle([(x0, y0), (x1, y1)], fill="black")
+
+    def page_count(self, image_path):
+        """Число страниц (кадров) изображения"""
+        with Image.open(image_path) as image:
+            return getattr(image, 'n_frames', 1)
+
+    def _is_tiff(self, path):
+        return os.path.splitext(path)[1].lower() in self.TIFF_EXTENSIONS
+
+    def anonymize_pages(self, image_path, output_path, progress_callback=None):
+        """Анонимизация многостраничного изображения (TIFF, GIF и т.п.) с сохранением в output_path.
+
+        Страницы читаются по одной и обрабатываются параллельно в page_workers
+        потоках; в обработке одновременно не больше 2 * page_workers страниц.
+        TIFF записывается постранично в исходном порядке, остальные форматы
+        сохраняются средствами PIL после обработки всех кадров.
+
+        Возвращает output_path или None, если ни на одной странице нет текста.
+        """
+        total = self.page_count(image_path)
+        found = []
+
+        def redact(page_index, array):
+            image = Image.fromarray(array)
+            results = self.read_text(image_path, image, page_index)
+            if results:
+                found.append(page_index)
+                self._draw_redactions(image, results)
+            return np.asarray(image)
 
-            return None  # Если текст не найден
+        def report(done):
+            if progress_callback:
+                progress_callback(done, total, f"Обработка страницы {min(done + 1, total)} из {total}")
 
-        except Exception as e:
-            print(f"Ошибка при обработке изображения: {str(e)}")
-            traceback.print_exc()
+        try:
+            if self._is_tiff(image_path):
+                self._anonymize_tiff_pages(image_path, output_path, redact, report)
+            else:
+                self._anonymize_frames(image_path, output_path, redact, report)
+        except BaseException:
+            if os.path.exists(output_path):
+                os.remove(output_path)
+            raise
+
+        if not found:
+            os.remove(output_path)
             return None
+        return output_path
+
+    def _map_pages(self, pages, redact, report):
+        """Параллельная обработка страниц (индекс, массив, данные) в исходном порядке.
+
+        Следующая страница читается только когда в обработке меньше
+        2 * page_workers страниц, поэтому память не зависит от их числа.
+        """
+        window = 2 * self.page_workers
+        pending = []
+        done = 0
+        report(done)
+        with ThreadPoolExecutor(max_workers=self.page_workers) as executor:
+            try:
+                for page_index, array, data in pages:
+                    pending.append((executor.submit(redact, page_index, array), data))
+                    del array
+                    while len(pending) >= window:
+                        future, data = pending.pop(0)
+                        yield future.result(), data
+                        done += 1
+                        report(done)
+                while pending:
+                    future, data = pending.pop(0)
+                    yield future.result(), data
+                    done += 1
+                    report(done)
+            finally:
+                for future, _ in pending:
+                    future.cancel()
+
+    def _anonymize_tiff_pages(self, image_path, output_path, redact, report):
+        # Страницы декодирует и кодирует PIL (libtiff): он работает со сжатием
+        # сканеров (LZW, CCITT G4, JPEG) без imagecodecs и отдает раздельные
+        # плоскости (planar) уже чередующимися. Страницы дописываются по одной
+        with tifffile.TiffFile(image_path) as tif:
+            # Заголовок tifffile разбирает и без кодеков
+            bigtiff = tif.is_bigtiff
+        with Image.open(image_path) as source, TiffImagePlugin.AppendingTiffWriter(output_path, new=True) as writer:
+            pages = (
+                (index, np.asarray(page.convert(self._tiff_page_mode(page))), dict(page.info))
+                for index, page in enumerate(ImageSequence.Iterator(source))
+            )
+            for array, info in self._map_pages(pages, redact, report):
+                with self.stats.stage('image.encode'):
+                    self._write_tiff_page(writer, array, info, bigtiff)
+
+    @staticmethod
+    def _tiff_page_mode(page):
+        if page.mode in ('1', 'L'):
+            return page.mode
+        return 'RGBA' if page.mode == 'RGBA' else 'RGB'
+
+    def _write_tiff_page(self, writer, array, info, bigtiff=False):
+        page = Image.fromarray(array)
+        compression = info.get('compression', 'raw')
+        if page.mode == '1':
+            # Двухцветные страницы остаются двухцветными, как у сканера
+            compression = 'raw' if compression == 'raw' else 'group4'
+        elif compression not in self.TIFF_COMPRESSIONS:
+            compression = 'tiff_adobe_deflate'
+        options = {'compression': compression, 'big_tiff': bigtiff}
+        if info.get('dpi'):
+            options['dpi'] = info['dpi']
+        page.save(writer, format='TIFF', **options)
+        writer.newFrame()
+
+    def _anonymize_frames(self, image_path, output_path, redact, report):
+        with Image.open(image_path) as source:
+            info = dict(source.info)
+            # Данные кадра копируются: ImageSequence отдает один и тот же объект,
+            # и его info меняется при переходе к следующему кадру
+            frames = (
+                (index, np.asarray(frame.convert('RGBA' if frame.mode == 'RGBA' else 'RGB')), self._frame_info(frame))
+                for index, frame in enumerate(ImageSequence.Iterator(source))
+            )
+            # Форматы кадров, кроме TIFF, PIL записывает только целиком
+            images = []
+            durations = []
+            disposals = []
+            for array, frame_info in self._map_pages(frames, redact, report):
+                images.append(Image.fromarray(array))
+                durations.append(frame_info.get('duration', info.get('duration', 0)))
+                disposals.append(frame_info.get('disposal', 0))
+
+        images[0].save(output_path, save_all=True, append_images=images[1:],
+                       duration=durations, disposal=disposals, loop=info.get('loop', 0))
+
+    @staticmethod
+    def _frame_info(frame):
+        info = dict(frame.info)
+        # Способ очистки кадра GIF хранится не в info, а в атрибуте кадра
+        if hasattr(frame, 'disposal_method'):
+            info.setdefault('disposal', frame.disposal_method)
+        return info
 
 
 class AnonymizerApp(QMainWindow):
@@ -216,7 +1368,7 @@ class AnonymizerApp(QMainWindow):
         super().__init__()
 
         self.anonymizer = Anonymizer()
-        self.image_anonymizer = ImageAnonymizer()
+        self.image_anonymizer = ImageAnonymizer(self.anonymizer)
 
         self.initUI()
 
@@ -0,0 +1,210 @@
+import asyncio
+import queue
+import threading
+import time
+from itertools import islice
+
+# Сигнал остановки фонового потока
+_STOP = object()
+
+
+class AsyncAnonymizer:
+    """Асинхронный интерфейс Anonymizer для asyncio с объединением запросов.
+
+    Запросы корутин складываются в очередь; фоновый поток забирает первый
+    запрос и все, что накопилось в очереди (не больше max_batch текстов и
+    max_batch_chars символов), и обрабатывает их одним вызовом
+    anonymize_texts - с одним пакетным прогоном NER. Пока поток занят
+    пакетом, новые запросы копятся и уходят следующим, поэтому под
+    нагрузкой вместо множества мелких вызовов NER получается несколько
+    крупных. Под сильной нагрузкой (предыдущий пакет не меньше
+    window_min_batch запросов) поток еще до window секунд ждет новых
+    запросов: пакеты становятся ровнее, а задержка растет не больше чем на
+    window. Результат каждого запроса возвращается его корутине; ошибка
+    пакета перепроверяется по запросам, чтобы неудачный текст не ломал чужие.
+    """
+    WINDOW = 0.002
+    # Окно выдерживается, только если предыдущий пакет был не меньше
+    WINDOW_MIN_BATCH = 8
+    MAX_BATCH = 256
+    MAX_BATCH_CHARS = 1024 * 1024
+
+    def __init__(self, anonymizer=None, window=None, max_batch=None, max_batch_chars=None, window_min_batch=None):
+        if anonymizer is None:
+            from anonymizer import Anonymizer
+            anonymizer = Anonymizer()
+            self._owns_anonymizer = True
+        else:
+            self._owns_anonymizer = False
+        # Анонимизатор используется только фоновым потоком
+        self.anonymizer = anonymizer
+
+        self.window = self.WINDOW if window is None else window
+        self.window_min_batch = self.WINDOW_MIN_BATCH if window_min_batch is None else window_min_batch
+        self.max_batch = max_batch or self.MAX_BATCH
+        self.max_batch_chars = max_batch_chars or self.MAX_BATCH_CHARS
+
+        self._queue = queue.SimpleQueue()
+        self._lock = threading.Lock()
+        self._thread = None
+        self._closed = False
+
+    def start(self):
+        """Запуск фонового потока (происходит и сам при первом запросе)"""
+        with self._lock:
+            self._start()
+
+    def _start(self):
+        if self._closed:
+            raise RuntimeError("AsyncAnonymizer закрыт")
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name='async-anonymizer', daemon=True)
+            self._thread.start()
+
+    async def load_models(self):
+        """Загрузка моделей без блокировки цикла событий"""
+        await asyncio.get_running_loop().run_in_executor(None, self.anonymizer.load_models)
+
+    async def anonymize_text(self, text):
+        """То же, что Anonymizer.anonymize_text, но в общем пакете с другими запросами"""
+        if not text:
+            return ""
+        return (await self._submit([text]))[0]
+
+    async def anonymize_texts(self, texts):
+        """Анонимизация нескольких текстов; все они попадают в один пакет"""
+        texts = list(texts)
+        if not texts:
+            return []
+        return await self._submit(texts)
+
+    def _submit(self, texts):
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        # Под блокировкой: после close в очередь ничего не попадает
+        with self._lock:
+            self._start()
+            self._queue.put((texts, loop, future))
+        return future
+
+    def _run(self):
+        stop = False
+        previous = 0
+        while not stop:
+            request = self._queue.get()
+            if request is _STOP:
+                break
+            batch = [request]
+            size = len(request[0])
+            chars = sum(map(len, request[0]))
+
+            # Окно отсчитывается от первого запроса пакета: задержка ограничена
+            # window. При слабой нагрузке ждать некого - пакет составляется из
+            # того, что накопилось в очереди, пока обрабатывался предыдущий
+            wait = self.window if previous >= self.window_min_batch else 0.0
+            deadline = time.monotonic() + wait
+            while size < self.max_batch and chars < self.max_batch_chars:
+                try:
+                    request = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+                if request is _STOP:
+                    stop = True
+                    break
+                batch.append(request)
+                size += len(request[0])
+                chars += sum(map(len, request[0]))
+
+            previous = len(batch)
+            self._process(batch)
+
+    def _process(self, batch):
+        # Отмененные корутины в пакет не попадают
+        batch = [request for request in batch if not request[2].cancelled()]
+        if not batch:
+            return
+
+        stats = self.anonymizer.stats
+        if stats.enabled:
+            stats.count('async.batches')
+            stats.count('async.requests', len(batch))
+
+        try:
+            results = self._anonymize([text for texts, _, _ in batch for text in texts])
+        except Exception as e:
+            if len(batch) == 1:
+                self._resolve(batch[0], exception=e)
+                return
+            # Ошибка одного текста не должна доставаться остальным запросам
+            for request in batch:
+                self._process([request])
+            return
+
+        results = iter(results)
+        for request in batch:
+            self._resolve(request, list(islice(results, len(request[0]))))
+
+    def _anonymize(self, texts):
+        """Результаты Anonymizer.anonymize_text для всех текстов одним вызовом anonymize_texts"""
+        anonymizer = self.anonymizer
+        cache = anonymizer.cache
+        if cache is None:
+            results = iter(anonymizer.anonymize_texts([text for text in texts if text]))
+            return [next(results) if text else "" for text in texts]
+
+        # С кэшем тексты, как и в anonymize_text, делятся на абзацы
+        documents = [anonymizer.PARAGRAPH_SEPARATOR.split(text) if text else None for text in texts]
+        paragraphs = [paragraph for parts in documents if parts for paragraph in parts[::2]]
+        results = iter(anonymizer.anonymize_texts(paragraphs, cache))
+        cache.flush()
+
+        output = []
+        for parts in documents:
+            if parts is None:
+                output.append("")
+                continue
+            parts[::2] = islice(results, (len(parts) + 1) // 2)
+            output.append(''.join(parts))
+        return output
+
+    @staticmethod
+    def _resolve(request, result=None, exception=None):
+        _, loop, future = request
+
+        def deliver():
+            if future.done():
+                return
+            if exception is not None:
+                future.set_exception(exception)
+            else:
+                future.set_result(result)
+
+        try:
+            loop.call_soon_threadsafe(deliver)
+        except RuntimeError:
+            # Цикл событий уже закрыт: результат некому получать
+            pass
+
+    def close(self):
+        """Остановка фонового потока после обработки уже поданных запросов"""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            thread = self._thread
+        if thread is not None:
+            self._queue.put(_STOP)
+            thread.join()
+        if self._owns_anonymizer:
+            self.anonymizer.close()
+
+    async def aclose(self):
+        await asyncio.get_running_loop().run_in_executor(None, self.close)
+
+    async def __aenter__(self):
+        self.start()
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.aclose()
+        return False
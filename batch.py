@@ -0,0 +1,263 @@
+import argparse
+import json
+import os
+import shutil
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from multiprocessing import freeze_support
+
+TEXT_EXTENSIONS = ('.txt',)
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.bmp', '.gif', '.tif', '.tiff')
+
+# Модели рабочего процесса: создаются один раз в initializer пула
+_anonymizer = None
+_image_anonymizer = None
+
+
+def _init_worker(load_ocr, cache_size, collect_stats=False, ocr_settings=None, regex_only=False):
+    global _anonymizer, _image_anonymizer
+    from anonymizer import Anonymizer, ImageAnonymizer
+    from cache import ParagraphCache
+    from stats import Stats
+
+    # Повторяющиеся абзацы (шапки, реквизиты) обрабатываются один раз на процесс
+    _anonymizer = Anonymizer(cache=ParagraphCache(cache_size) if cache_size else None,
+                             stats=Stats() if collect_stats else None)
+    # Тексты только паттернами: словарь имен и NER нужны лишь для изображений
+    if load_ocr or not regex_only:
+        _anonymizer.load_models()
+    _image_anonymizer = ImageAnonymizer(_anonymizer)
+    for name, value in (ocr_settings or {}).items():
+        setattr(_image_anonymizer, name, value)
+    # Параллельность уже обеспечивает пул процессов, страницы внутри процесса - по одной
+    _image_anonymizer.page_workers = 1
+    if load_ocr:
+        _image_anonymizer.load_models()
+
+
+def _process_file(kind, source_path, output_path, encoding, regex_only=False):
+    """Обработка одного файла в рабочем процессе.
+
+    Возвращает размер входа в байтах и замеры этапов (или None, если они отключены).
+    """
+    os.makedirs(os.path.dirname(output_path), exist_ok=True)
+
+    if kind == 'text':
+        _anonymizer.anonymize_file(source_path, output_path, encoding, regex_only=regex_only)
+    else:
+        # Если текста на изображении нет, копируем его без изменений
+        if _image_anonymizer.anonymize_image(source_path, output_path) is None:
+            shutil.copyfile(source_path, output_path)
+
+    return os.path.getsize(source_path), _take_profile()
+
+
+def _process_images(items):
+    """Обработка группы изображений (исходный путь, путь результата) в рабочем процессе.
+
+    OCR группы выполняется вместе (ImageAnonymizer.anonymize_images). Если
+    группа не обработалась, файлы обрабатываются по одному, чтобы ошибка
+    одного файла не затронула остальные. Возвращает тройки (исходный путь,
+    размер входа или None, ошибка или None) и замеры этапов.
+    """
+    for _, output_path in items:
+        os.makedirs(os.path.dirname(output_path), exist_ok=True)
+
+    try:
+        outputs = _image_anonymizer.anonymize_images(items)
+    except Exception:
+        results = []
+        for source_path, output_path in items:
+            try:
+                size, _ = _process_file('image', source_path, output_path, None)
+                results.append((source_path, size, None))
+            except Exception as e:
+                results.append((source_path, None, str(e)))
+        return results, _take_profile()
+
+    results = []
+    for (source_path, output_path), output in zip(items, outputs):
+        # Если текста на изображении нет, копируем его без изменений
+        if output is None:
+            shutil.copyfile(source_path, output_path)
+        results.append((source_path, os.path.getsize(source_path), None))
+    return results, _take_profile()
+
+
+def _take_profile():
+    profile = None
+    if _anonymizer.stats.enabled:
+        profile = _anonymizer.stats.snapshot()
+        _anonymizer.stats.reset()
+    return profile
+
+
+def collect_jobs(input_dirs, output_dir, include_images=True):
+    """Список задач (вид, исходный путь, путь результата) с зеркальной структурой каталогов.
+
+    При нескольких входных каталогах каждый отображается в подкаталог
+    output_dir со своим именем.
+    """
+    jobs = []
+    skipped = 0
+    for input_dir in input_dirs:
+        input_dir = os.path.abspath(input_dir)
+        target_root = output_dir
+        if len(input_dirs) > 1:
+            target_root = os.path.join(output_dir, os.path.basename(input_dir.rstrip(os.sep)))
+
+        for dir_path, dir_names, file_names in os.walk(input_dir):
+            dir_names.sort()
+            # Не обрабатываем результаты повторно, если выходной каталог внутри входного
+            dir_names[:] = [
+                name for name in dir_names
+                if os.path.abspath(os.path.join(dir_path, name)) != os.path.abspath(output_dir)
+            ]
+            for file_name in sorted(file_names):
+                extension = os.path.splitext(file_name)[1].lower()
+                if extension in TEXT_EXTENSIONS:
+                    kind = 'text'
+                elif include_images and extension in IMAGE_EXTENSIONS:
+                    kind = 'image'
+                else:
+                    skipped += 1
+                    continue
+
+                source_path = os.path.join(dir_path, file_name)
+                relative_path = os.path.relpath(source_path, input_dir)
+                jobs.append((kind, source_path, os.path.join(target_root, relative_path)))
+
+    return jobs, skipped
+
+
+def run_batch(input_dirs, output_dir, workers=None, include_images=True, encoding='utf-8',
+              cache_size=10000, collect_stats=False, logger=None, ocr_settings=None, image_batch=8,
+              regex_only=False):
+    """Анонимизация всех файлов входных каталогов в пуле процессов; возвращает статистику.
+
+    При collect_stats в статистику добавляются замеры этапов всех процессов ('profile').
+    ocr_settings - атрибуты ImageAnonymizer в рабочих процессах (cpu_mode,
+    ocr_threads, ocr_batch_size, ocr_workers). В режиме CPU без явного числа
+    потоков ядра делятся между процессами поровну. Изображения передаются
+    процессам группами по image_batch для общего распознавания. regex_only -
+    тексты только паттернами, без словаря имен и NER.
+    """
+    from stats import Stats
+
+    jobs, skipped = collect_jobs(input_dirs, output_dir, include_images)
+    profile = Stats()
+    load_ocr = any(kind == 'image' for kind, _, _ in jobs)
+    workers = workers or os.cpu_count() or 1
+    ocr_settings = dict(ocr_settings or {})
+    if ocr_settings.get('cpu_mode') and not ocr_settings.get('ocr_threads'):
+        ocr_settings['ocr_threads'] = max(1, (os.cpu_count() or 1) // min(workers, len(jobs) or 1))
+
+    stats = {'files': 0, 'failed': 0, 'skipped': skipped, 'bytes': 0}
+    start_time = time.perf_counter()
+
+    if jobs:
+        initargs = (load_ocr, cache_size, collect_stats, ocr_settings, regex_only)
+        with ProcessPoolExecutor(max_workers=min(workers, len(jobs)),
+                                 initializer=_init_worker, initargs=initargs) as executor:
+            futures = {
+                executor.submit(_process_file, kind, source_path, output_path, encoding, regex_only): source_path
+                for kind, source_path, output_path in jobs if kind == 'text'
+            }
+            images = [(source_path, output_path) for kind, source_path, output_path in jobs if kind == 'image']
+            image_batch = max(1, image_batch)
+            for start in range(0, len(images), image_batch):
+                items = images[start:start + image_batch]
+                futures[executor.submit(_process_images, items)] = [source_path for source_path, _ in items]
+
+            for future in as_completed(futures):
+                sources = futures[future]
+                try:
+                    if isinstance(sources, list):
+                        results, file_profile = future.result()
+                    else:
+                        size, file_profile = future.result()
+                        results = [(sources, size, None)]
+                except Exception as e:
+                    sources = sources if isinstance(sources, list) else [sources]
+                    results = [(source_path, None, str(e)) for source_path in sources]
+                    file_profile = None
+
+                for source_path, size, error in results:
+                    if error is None:
+                        stats['bytes'] += size
+                        stats['files'] += 1
+                    else:
+                        stats['failed'] += 1
+                        if logger:
+                            logger.error(f"Ошибка при обработке {source_path}: {error}")
+                if file_profile:
+                    profile.merge(file_profile)
+
+    stats['elapsed'] = time.perf_counter() - start_time
+    stats['files_per_second'] = stats['files'] / stats['elapsed'] if stats['elapsed'] else 0.0
+    if collect_stats:
+        stats['profile'] = profile.snapshot()
+    return stats
+
+
+def ocr_settings(args):
+    settings = {}
+    if args.cpu:
+        settings['cpu_mode'] = True
+    for name in ('ocr_threads', 'ocr_batch_size', 'ocr_workers'):
+        value = getattr(args, name)
+        if value is not None:
+            settings[name] = value
+    return settings
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Пакетная анонимизация текстов (.txt) и изображений")
+    parser.add_argument('input_dirs', nargs='+', help="Входные каталоги")
+    parser.add_argument('-o', '--output', required=True, help="Каталог для результатов (зеркальная структура)")
+    parser.add_argument('-w', '--workers', type=int, default=None,
+                        help="Число рабочих процессов (по умолчанию - число ядер)")
+    parser.add_argument('--no-images', action='store_true', help="Обрабатывать только текстовые файлы")
+    parser.add_argument('--encoding', default='utf-8', help="Кодировка текстовых файлов")
+    parser.add_argument('--regex-only', action='store_true',
+                        help="Тексты только паттернами (ИИН, счета, телефоны...), без словаря имен и NER")
+    parser.add_argument('--cache-size', type=int, default=10000,
+                        help="Размер кэша абзацев в каждом процессе (0 - без кэша)")
+    parser.add_argument('--stats', action='store_true', help="Записать в лог время по этапам обработки")
+    parser.add_argument('--cpu', action='store_true',
+                        help="Режим OCR для CPU: квантованный распознаватель и заданное число потоков")
+    parser.add_argument('--ocr-threads', type=int, default=None,
+                        help="Потоков torch на процесс в режиме CPU (по умолчанию - ядра поровну между процессами)")
+    parser.add_argument('--ocr-batch-size', type=int, default=None, help="Параметр batch_size EasyOCR")
+    parser.add_argument('--ocr-workers', type=int, default=None, help="Параметр workers EasyOCR")
+    parser.add_argument('--image-batch', type=int, default=8,
+                        help="Изображений в группе с общим распознаванием строк текста (1 - по одному)")
+    args = parser.parse_args(argv)
+
+    from main import setup_logging
+    logger = setup_logging()
+
+    for input_dir in args.input_dirs:
+        if not os.path.isdir(input_dir):
+            parser.error(f"Каталог не найден: {input_dir}")
+
+    logger.info(f"Пакетная обработка: {args.input_dirs} -> {args.output}")
+    stats = run_batch(args.input_dirs, args.output, args.workers,
+                      include_images=not args.no_images, encoding=args.encoding,
+                      cache_size=args.cache_size, collect_stats=args.stats, logger=logger,
+                      ocr_settings=ocr_settings(args), image_batch=args.image_batch,
+                      regex_only=args.regex_only)
+
+    logger.info(
+        f"Обработано файлов: {stats['files']}, ошибок: {stats['failed']}, пропущено: {stats['skipped']}, "
+        f"время: {stats['elapsed']:.2f} с, скорость: {stats['files_per_second']:.2f} файлов/с"
+    )
+    if 'profile' in stats:
+        logger.info(f"Время по этапам: {json.dumps(stats['profile'], ensure_ascii=False)}")
+    return 1 if stats['failed'] else 0
+
+
+if __name__ == "__main__":
+    freeze_support()
+    sys.exit(main())
@@ -0,0 +1,95 @@
+"""Объединение запросов AsyncAnonymizer против вызова anonymize_text через executor.
+
+    python benchmarks/async_coalescing.py --requests 2000 --concurrency 1 16 64
+    python benchmarks/async_coalescing.py --window 0 0.002 0.01
+
+Корутины (concurrency штук одновременно) анонимизируют короткие строки
+корпуса. Для каждого режима считаются пропускная способность, перцентили
+задержки одного запроса и число вызовов NER (по замерам stats).
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.bench import percentile  # noqa: E402
+from benchmarks.corpus import CorpusGenerator  # noqa: E402
+
+
+async def run_requests(call, texts, concurrency):
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def one(text):
+        async with semaphore:
+            start = time.perf_counter()
+            await call(text)
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(text) for text in texts))
+    return time.perf_counter() - start, sorted(latencies)
+
+
+def measure(mode, texts, concurrency, window):
+    from anonymizer import Anonymizer
+    from async_anonymizer import AsyncAnonymizer
+    from stats import Stats
+
+    anonymizer = Anonymizer(stats=Stats())
+    anonymizer.load_models()
+    # Прогрев: первые вызовы NER заметно медленнее
+    anonymizer.anonymize_texts(texts[:50])
+    anonymizer.stats.reset()
+
+    async def main():
+        if mode == 'executor':
+            loop = asyncio.get_running_loop()
+            return await run_requests(lambda text: loop.run_in_executor(None, anonymizer.anonymize_text, text),
+                                      texts, concurrency)
+        async with AsyncAnonymizer(anonymizer, window=window) as async_anonymizer:
+            return await run_requests(async_anonymizer.anonymize_text, texts, concurrency)
+
+    elapsed, latencies = asyncio.run(main())
+    snapshot = anonymizer.stats.snapshot()
+    return {
+        'mode': mode if mode == 'executor' else f'async {window * 1000:g} мс',
+        'concurrency': concurrency,
+        'requests_per_second': len(texts) / elapsed if elapsed else 0.0,
+        'p50_ms': percentile(latencies, 0.50) * 1000,
+        'p95_ms': percentile(latencies, 0.95) * 1000,
+        'ner_calls': snapshot['stages'].get('ner', {}).get('calls', 0),
+        'batches': snapshot['counters'].get('async.batches'),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Объединение запросов AsyncAnonymizer")
+    parser.add_argument('--requests', type=int, default=1000)
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 16, 64])
+    parser.add_argument('--window', type=float, nargs='+', default=[0.002], help="Окна объединения в секундах")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--density', type=float, default=0.3, help="Доля предложений с персональными данными")
+    args = parser.parse_args(argv)
+
+    generator = CorpusGenerator(seed=args.seed, density=args.density)
+    texts = [generator.line() for _ in range(args.requests)]
+
+    for concurrency in args.concurrency:
+        results = [measure('executor', texts, concurrency, None)]
+        results.extend(measure('async', texts, concurrency, window) for window in args.window)
+        for result in results:
+            line = (f"{result['mode']:12} параллельно {result['concurrency']:4}  "
+                    f"{result['requests_per_second']:8.1f} запр/с  p50 {result['p50_ms']:7.2f} мс  "
+                    f"p95 {result['p95_ms']:7.2f} мс  вызовов NER {result['ner_calls']:5}")
+            if result['batches']:
+                line += f"  пакетов {result['batches']}"
+            print(line)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
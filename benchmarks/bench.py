@@ -0,0 +1,196 @@
+"""Замеры скорости анонимизатора на синтетическом корпусе.
+
+    python benchmarks/bench.py                                # все замеры
+    python benchmarks/bench.py --only anonymize_line anonymize_text
+    python benchmarks/bench.py --save-baseline benchmarks/baseline.json
+    python benchmarks/bench.py --compare benchmarks/baseline.json --threshold 0.2
+
+Для каждой функции считаются пропускная способность (вызовов и символов
+в секунду) и перцентили задержки одного вызова. Сравнение с базовой линией
+завершается с кодом 1, если медиана или p95 выросли, а пропускная способность
+упала больше чем на threshold.
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.corpus import CorpusGenerator  # noqa: E402
+
+BENCHMARKS = ('anonymize_line', 'anonymize_text', 'contains_personal_data', 'process_image')
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def measure(fn, inputs, size=len, repeat=1):
+    """Задержки вызовов fn на каждом входе; size(item) - объем входа в символах"""
+    latencies = []
+    volume = 0
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for item in inputs:
+            call_start = time.perf_counter()
+            fn(item)
+            latencies.append(time.perf_counter() - call_start)
+            volume += size(item)
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        'calls': len(latencies),
+        'elapsed': elapsed,
+        'calls_per_second': len(latencies) / elapsed if elapsed else 0.0,
+        'chars_per_second': volume / elapsed if elapsed else 0.0,
+        'p50_ms': percentile(latencies, 0.50) * 1000,
+        'p90_ms': percentile(latencies, 0.90) * 1000,
+        'p95_ms': percentile(latencies, 0.95) * 1000,
+        'p99_ms': percentile(latencies, 0.99) * 1000,
+        'max_ms': latencies[-1] * 1000 if latencies else 0.0,
+    }
+
+
+def run(args):
+    from anonymizer import Anonymizer, ImageAnonymizer
+
+    generator = CorpusGenerator(seed=args.seed, density=args.density)
+    anonymizer = Anonymizer()
+    selected = args.only or BENCHMARKS
+    results = {}
+
+    load_start = time.perf_counter()
+    anonymizer.load_models()
+    results['load_text_models'] = {'elapsed': time.perf_counter() - load_start}
+
+    if 'anonymize_line' in selected:
+        lines = [generator.line() for _ in range(args.lines)]
+        results['anonymize_line'] = measure(anonymizer.anonymize_line, lines, repeat=args.repeat)
+
+    if 'anonymize_text' in selected:
+        documents = [generator.document(args.document_size) for _ in range(args.documents)]
+        anonymizer.anonymize_text(documents[0])  # первый вызов NER заметно медленнее
+        results['anonymize_text'] = measure(anonymizer.anonymize_text, documents, repeat=args.repeat)
+
+    if 'contains_personal_data' in selected:
+        snippets = generator.ocr_snippets(args.snippets)
+        results['contains_personal_data'] = measure(
+            anonymizer.contains_personal_data, snippets, repeat=args.repeat)
+
+    if 'process_image' in selected:
+        image_anonymizer = ImageAnonymizer(anonymizer)
+        try:
+            load_start = time.perf_counter()
+            image_anonymizer.load_models()
+            results['load_ocr_model'] = {'elapsed': time.perf_counter() - load_start}
+        except Exception as e:
+            # Без весов EasyOCR (например, без доступа к сети) замер изображений пропускается
+            results['process_image'] = {'skipped': str(e)}
+        else:
+            with tempfile.TemporaryDirectory() as temp_dir:
+                paths = []
+                for index in range(args.images):
+                    path = os.path.join(temp_dir, f"page_{index}.png")
+                    generator.image(args.image_width, args.image_height).save(path)
+                    paths.append(path)
+                results['process_image'] = measure(
+                    image_anonymizer.process_image, paths,
+                    size=lambda path: args.image_width * args.image_height)
+                # Для изображений объем - в пикселях
+                results['process_image']['pixels_per_second'] = \
+                    results['process_image'].pop('chars_per_second')
+
+    return {
+        'meta': {
+            'date': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'processor': platform.processor(),
+            'cpu_count': os.cpu_count(),
+            'config': {key: value for key, value in vars(args).items()
+                       if key not in ('save_baseline', 'compare', 'output')},
+        },
+        'results': results,
+    }
+
+
+def compare(report, baseline, threshold):
+    """Список регрессий относительно базовой линии"""
+    regressions = []
+    for name, current in report['results'].items():
+        previous = baseline.get('results', {}).get(name)
+        if not previous or 'calls' not in current or 'calls' not in previous:
+            continue
+        for metric in ('p50_ms', 'p95_ms'):
+            if previous[metric] and current[metric] > previous[metric] * (1 + threshold):
+                regressions.append(f"{name}.{metric}: {previous[metric]:.3f} -> {current[metric]:.3f}")
+        if current['calls_per_second'] < previous['calls_per_second'] * (1 - threshold):
+            regressions.append(
+                f"{name}.calls_per_second: {previous['calls_per_second']:.1f} -> {current['calls_per_second']:.1f}")
+    return regressions
+
+
+def print_report(report):
+    for name, result in report['results'].items():
+        if 'skipped' in result:
+            print(f"{name:<24} пропущен: {result['skipped']}")
+        elif 'calls' not in result:
+            print(f"{name:<24} {result['elapsed']:.2f} с")
+        else:
+            print(
+                f"{name:<24} {result['calls_per_second']:>10.1f} выз/с  "
+                f"p50 {result['p50_ms']:.3f} мс  p95 {result['p95_ms']:.3f} мс  "
+                f"p99 {result['p99_ms']:.3f} мс  max {result['max_ms']:.3f} мс"
+            )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Замеры скорости анонимизации")
+    parser.add_argument('--only', nargs='+', choices=BENCHMARKS, help="Запустить только указанные замеры")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--density', type=float, default=0.3, help="Доля предложений с персональными данными")
+    parser.add_argument('--lines', type=int, default=2000)
+    parser.add_argument('--documents', type=int, default=50)
+    parser.add_argument('--document-size', type=int, default=4000, help="Размер документа в символах")
+    parser.add_argument('--snippets', type=int, default=2000)
+    parser.add_argument('--images', type=int, default=3)
+    parser.add_argument('--image-width', type=int, default=1240)
+    parser.add_argument('--image-height', type=int, default=1754)
+    parser.add_argument('--repeat', type=int, default=1)
+    parser.add_argument('--output', help="Сохранить отчет в JSON")
+    parser.add_argument('--save-baseline', help="Сохранить отчет как базовую линию")
+    parser.add_argument('--compare', help="Сравнить с базовой линией из JSON")
+    parser.add_argument('--threshold', type=float, default=0.2, help="Допустимое ухудшение (доля)")
+    args = parser.parse_args(argv)
+
+    report = run(args)
+    print_report(report)
+
+    for path in (args.output, args.save_baseline):
+        if path:
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump(report, f, ensure_ascii=False, indent=2)
+
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        regressions = compare(report, baseline, args.threshold)
+        for regression in regressions:
+            print(f"Регрессия: {regression}")
+        if regressions:
+            return 1
+        print("Регрессий нет")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,204 @@
+"""Генератор синтетических документов и изображений с персональными данными.
+
+Документы собираются из шаблонных предложений на русском языке с казахскими
+и русскими ФИО, ИИН, IBAN, номерами карт, телефонами +7, email и адресами.
+Плотность персональных данных задается долей предложений, которые их содержат.
+Генерация детерминирована при одинаковом seed.
+"""
+import os
+import random
+
+from PIL import Image, ImageDraw, ImageFont
+
+SURNAMES = [
+    'Иванов', 'Петров', 'Смирнов', 'Кузнецов', 'Попов', 'Соколов', 'Лебедев',
+    'Ахметов', 'Нурланов', 'Сейтказиев', 'Жумабаев', 'Омаров', 'Касымов', 'Бекова',
+    'Абдрахманова', 'Тулегенов', 'Сулейменов', 'Исмаилова', 'Кенжебаев', 'Муканов',
+]
+FIRST_NAMES = [
+    'Иван', 'Сергей', 'Алексей', 'Дмитрий', 'Андрей', 'Мария', 'Анна', 'Елена',
+    'Нурлан', 'Айгерим', 'Ержан', 'Асель', 'Данияр', 'Динара', 'Бауыржан', 'Жанна',
+    'Арман', 'Гульнара', 'Айдос', 'Мадина',
+]
+PATRONYMICS = [
+    'Иванович', 'Сергеевич', 'Петрович', 'Алексеевна', 'Викторовна', 'Нурланович',
+    'Серикович', 'Ержановна', 'Маратович', 'Болатовна', 'Каиратович', 'Асланович',
+]
+CITIES = ['Алматы', 'Астана', 'Шымкент', 'Караганда', 'Актобе', 'Павлодар', 'Атырау', 'Костанай']
+STREETS = ['Абая', 'Толе би', 'Достык', 'Сейфуллина', 'Жандосова', 'Кабанбай батыра', 'Мангилик Ел']
+COMPANIES = ['ТОО "Казахтелеком"', 'АО "Халык Банк"', 'ТОО "Рога и Копыта"', 'АО "КазМунайГаз"']
+EMAIL_DOMAINS = ['mail.ru', 'gmail.com', 'inbox.kz', 'yandex.kz']
+
+FILLER = [
+    'Настоящий договор вступает в силу с момента подписания.',
+    'Стороны обязуются соблюдать условия конфиденциальности.',
+    'Оплата производится в течение десяти рабочих дней.',
+    'Все споры решаются путем переговоров.',
+    'акт выполненных работ подписан без замечаний',
+    'Итого к оплате: 125 000 тенге, включая НДС 12%.',
+    'Документ составлен в двух экземплярах.',
+    'срок действия договора - один год с правом пролонгации',
+]
+
+# Шаблоны предложений с персональными данными по видам
+PII_TEMPLATES = {
+    'iin': ['ИИН {iin}.', 'Индивидуальный идентификационный номер: {iin}'],
+    'iban': ['Счет получателя {iban} в {company}.', 'IBAN: {iban}'],
+    'card': ['Оплата картой {card}.', 'Номер карты {card}, срок действия 12/27'],
+    'phone': ['Телефон для связи: {phone}.', 'Контактный номер {phone}'],
+    'email': ['Электронная почта: {email}', 'Письмо направлено на {email}.'],
+    'name': ['Заказчик: {name}.', 'Договор подписан {name}, действующим на основании доверенности.'],
+    'address': ['Адрес: г. {city}, ул. {street}, д. {house}, кв. {flat}.',
+                'Проживает по адресу г. {city}, пр. {street} {house}'],
+}
+PII_KINDS = tuple(PII_TEMPLATES)
+
+
+class CorpusGenerator:
+    """Генератор синтетического корпуса с заданной плотностью персональных данных"""
+
+    def __init__(self, seed=0, density=0.3, kinds=PII_KINDS):
+        self.random = random.Random(seed)
+        self.density = density
+        self.kinds = tuple(kinds)
+
+    def digits(self, count):
+        return ''.join(self.random.choice('0123456789') for _ in range(count))
+
+    def iin(self):
+        """ИИН: дата рождения, век и пол, порядковый номер и контрольная цифра"""
+        while True:
+            digits = [
+                *map(int, f"{self.random.randint(50, 99):02d}{self.random.randint(1, 12):02d}"
+                          f"{self.random.randint(1, 28):02d}"),
+                self.random.choice((3, 4)),
+                *map(int, self.digits(4)),
+            ]
+            check = sum(d * w for d, w in zip(digits, range(1, 12))) % 11
+            if check == 10:
+                check = sum(d * w for d, w in zip(digits, [3, 4, 5, 6, 7, 8, 9, 10, 11, 1, 2])) % 11
+            if check < 10:
+                return ''.join(map(str, digits)) + str(check)
+
+    def iban(self):
+        return 'KZ' + self.digits(2) + self.random.choice(['722', '601', '998']) + 'C' + self.digits(12)
+
+    def card(self):
+        """Номер карты с верной контрольной суммой Луна"""
+        digits = [int(d) for d in self.random.choice(['4400', '5169', '4405']) + self.digits(11)]
+        total = 0
+        for index, digit in enumerate(reversed(digits)):
+            if index % 2 == 0:
+                digit *= 2
+                if digit > 9:
+                    digit -= 9
+            total += digit
+        number = ''.join(map(str, digits)) + str((10 - total % 10) % 10)
+        separator = self.random.choice(['', ' ', '-'])
+        return separator.join(number[i:i + 4] for i in range(0, 16, 4))
+
+    def phone(self):
+        code = self.random.choice(['701', '702', '705', '707', '747', '771', '777'])
+        number = self.digits(7)
+        return self.random.choice([
+            f"+7 {code} {number[:3]} {number[3:5]} {number[5:]}",
+            f"+7({code}){number[:3]}-{number[3:5]}-{number[5:]}",
+            f"8{code}{number}",
+            f"+7{code}{number}",
+        ])
+
+    def email(self):
+        login = self.random.choice(['ivanov', 'a.nurlanova', 'info', 'client', 'erzhan.k'])
+        return f"{login}{self.random.randint(1, 999)}@{self.random.choice(EMAIL_DOMAINS)}"
+
+    def name(self):
+        surname = self.random.choice(SURNAMES)
+        first_name = self.random.choice(FIRST_NAMES)
+        if self.random.random() < 0.5:
+            return f"{surname} {first_name} {self.random.choice(PATRONYMICS)}"
+        return f"{surname} {first_name}"
+
+    def pii_sentence(self, kind=None):
+        kind = kind or self.random.choice(self.kinds)
+        template = self.random.choice(PII_TEMPLATES[kind])
+        return template.format(
+            iin=self.iin(), iban=self.iban(), card=self.card(), phone=self.phone(),
+            email=self.email(), name=self.name(), company=self.random.choice(COMPANIES),
+            city=self.random.choice(CITIES), street=self.random.choice(STREETS),
+            house=self.random.randint(1, 200), flat=self.random.randint(1, 300),
+        )
+
+    def sentence(self):
+        if self.random.random() < self.density:
+            return self.pii_sentence()
+        return self.random.choice(FILLER)
+
+    def line(self, sentences=2):
+        return ' '.join(self.sentence() for _ in range(sentences))
+
+    def document(self, size=4000, paragraph_sentences=4):
+        """Документ примерно из size символов, абзацы разделены пустой строкой"""
+        paragraphs = []
+        length = 0
+        while length < size:
+            paragraph = ' '.join(self.sentence() for _ in range(paragraph_sentences))
+            paragraphs.append(paragraph)
+            length += len(paragraph) + 2
+        return '\n\n'.join(paragraphs)
+
+    def ocr_snippets(self, count):
+        """Короткие фрагменты, похожие на блоки текста из OCR (ячейки таблиц, подписи)"""
+        snippets = []
+        for _ in range(count):
+            roll = self.random.random()
+            if roll < self.density:
+                snippets.append(self.pii_sentence().rstrip('.'))
+            elif roll < self.density + 0.3:
+                snippets.append(self.random.choice([self.digits(4), '12 500,00', '№ 17', '2024-05-01', '%']))
+            else:
+                snippets.append(self.random.choice(FILLER).split(',')[0])
+        return snippets
+
+    def image(self, width=1240, height=1754, font_size=28, font_path=None):
+        """Изображение страницы (по умолчанию A4 при 150 dpi) с текстом документа"""
+        return self.page(width, height, font_size, font_path)[0]
+
+    def page(self, width=1240, height=1754, font_size=28, font_path=None):
+        """Изображение страницы и список напечатанных на ней строк (эталон для OCR)"""
+        font = load_font(font_size, font_path)
+        image = Image.new('RGB', (width, height), 'white')
+        draw = ImageDraw.Draw(image)
+        margin = font_size * 2
+        y = margin
+        lines = []
+        while y + font_size < height - margin:
+            words = self.line(1).split()
+            text = ''
+            for word in words:
+                candidate = f"{text} {word}".strip()
+                if draw.textlength(candidate, font=font) > width - 2 * margin:
+                    break
+                text = candidate
+            draw.text((margin, y), text, fill='black', font=font)
+            lines.append(text)
+            y += int(font_size * 1.6)
+        return image, lines
+
+
+# Шрифты с кириллицей: Linux, Windows, macOS
+FONT_CANDIDATES = [
+    '/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf',
+    '/usr/share/fonts/dejavu/DejaVuSans.ttf',
+    'C:/Windows/Fonts/arial.ttf',
+    '/Library/Fonts/Arial.ttf',
+    '/System/Library/Fonts/Supplemental/Arial.ttf',
+]
+
+
+def load_font(size, font_path=None):
+    for path in ([font_path] if font_path else FONT_CANDIDATES):
+        if path and os.path.exists(path):
+            return ImageFont.truetype(path, size)
+    # Встроенный шрифт Pillow может не содержать кириллицу, но позволяет
+    # измерить скорость обработки и без системных шрифтов
+    return ImageFont.load_default(size)
@@ -0,0 +1,93 @@
+"""Поиск входов, на которых время обработки строки растет быстрее линейного.
+
+    python benchmarks/fuzz_latency.py --iterations 300 --size 2000
+
+Строки собираются из фрагментов, характерных для паттернов (ключевые слова
+адресов, слова с заглавной буквы, цифры, разделители, '@', '+7', 'KZ').
+Каждая строка повторяется до size и до size * scale символов; если время
+выросло больше чем в scale * tolerance раз, вход считается сверхлинейным.
+Завершается с кодом 1, если такие входы найдены.
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+FRAGMENTS = [
+    'ул', 'ул.', 'улица', 'пр', 'д', 'д.', 'кв', 'дом', 'Абай', 'Иванов', 'Ан', 'б', 'ааа', 'Ё',
+    ' ', '  ', '\t', '.', ',', '-', '/', '@', 'a', 'Ab', 'A', 'x.', '1', '12', '1234', '+7',
+    '(777)', 'KZ', 'kz', '_', '%', '+', '[',
+]
+
+
+def measure(fn, text, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(text)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def periodic(unit, size):
+    return (unit * (size // len(unit) + 1))[:size]
+
+
+def fuzz(fn, iterations, size, scale, tolerance, seed, repeat):
+    rng = random.Random(seed)
+    failures = []
+    worst = (0.0, '')
+    for iteration in range(iterations):
+        # Периодические строки - худший случай для возвратов регулярных выражений,
+        # случайные смеси - для логики приоритетов
+        if iteration % 2 == 0:
+            unit = ''.join(rng.choice(FRAGMENTS) for _ in range(rng.randint(1, 4)))
+            small, large = periodic(unit, size), periodic(unit, size * scale)
+        else:
+            pieces = [rng.choice(FRAGMENTS) for _ in range(size * scale)]
+            large = ''.join(pieces)[:size * scale]
+            small = large[:size]
+            unit = large[:40]
+
+        small_time = measure(fn, small, repeat)
+        large_time = measure(fn, large, repeat)
+        # Для очень быстрых строк отношение определяется шумом таймера
+        ratio = large_time / max(small_time, 50e-6)
+        if ratio > worst[0]:
+            worst = (ratio, unit)
+        if ratio > scale * tolerance and large_time > 0.005:
+            failures.append((ratio, large_time, unit))
+    return failures, worst
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Проверка линейности времени обработки строки")
+    parser.add_argument('--iterations', type=int, default=300)
+    parser.add_argument('--size', type=int, default=2000, help="Длина короткой строки")
+    parser.add_argument('--scale', type=int, default=4, help="Во сколько раз длиннее вторая строка")
+    parser.add_argument('--tolerance', type=float, default=2.0, help="Допустимое отклонение от линейного роста")
+    parser.add_argument('--repeat', type=int, default=3, help="Повторов замера (берется лучший)")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+
+    from anonymizer import Anonymizer
+    anonymizer = Anonymizer()
+
+    failures, worst = fuzz(anonymizer.anonymize_line, args.iterations, args.size, args.scale,
+                           args.tolerance, args.seed, args.repeat)
+    print(f"Наибольший рост времени: x{worst[0]:.1f} при увеличении длины в {args.scale} раз "
+          f"(фрагмент {worst[1]!r})")
+    for ratio, large_time, unit in sorted(failures, reverse=True)[:20]:
+        print(f"Сверхлинейный рост x{ratio:.1f} ({large_time * 1000:.1f} мс): {unit!r}")
+    if failures:
+        print(f"Найдено сверхлинейных входов: {len(failures)}")
+        return 1
+    print("Сверхлинейных входов не найдено")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
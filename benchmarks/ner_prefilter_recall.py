@@ -0,0 +1,104 @@
+"""Полнота сущностей NER при отборе строк словарем имен.
+
+    python benchmarks/ner_prefilter_recall.py --lines 2000 --density 0.5
+
+Эталон - сущности Natasha по всему тексту (без словаря имен). Сущность
+считается найденной и со словарем, если ее целиком покрывают замены,
+найденные паттернами, словарем имен и NER по отобранным строкам. Кроме
+строк корпуса проверяются предложения с организациями и частями имен в
+середине предложения.
+"""
+import argparse
+import os
+import sys
+import time
+from collections import Counter
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.corpus import CorpusGenerator  # noqa: E402
+
+# Слова с заглавной буквы, известные словарю как обычные, в середине предложения
+HARD_SENTENCES = [
+    'Деньги перевели через Сбербанк вчера.',
+    'Менеджер Лев Толстой позвонил в Сбербанк.',
+    'Гражданин Ким Ен Су получил паспорт.',
+    'Договор с Газпромом продлен до конца года.',
+    'Заявление принял сотрудник Цой Виктор.',
+    'Счет открыт в банке Восток по заявлению клиента.',
+    'Перевод выполнен через Каспи вечером.',
+    'Посылку доставил Пак Ен Хо из Алматы.',
+]
+
+
+def covered(spans):
+    merged = []
+    for start, stop in sorted(spans):
+        if merged and start <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], stop))
+        else:
+            merged.append((start, stop))
+    return merged
+
+
+def is_covered(merged, start, stop):
+    return any(begin <= start and stop <= end for begin, end in merged)
+
+
+def measure(texts):
+    from anonymizer import Anonymizer
+
+    full = Anonymizer(use_name_dictionary=False)
+    full.load_models()
+    start = time.perf_counter()
+    reference = full._ner_spans_batch(texts)
+    full_elapsed = time.perf_counter() - start
+
+    prefiltered = Anonymizer()
+    prefiltered.load_models()
+    start = time.perf_counter()
+    known_spans = [prefiltered._pattern_spans(text) + prefiltered._name_spans(text) for text in texts]
+    ner_spans = prefiltered._ner_spans_batch(texts, known_spans)
+    prefiltered_elapsed = time.perf_counter() - start
+
+    total, found = Counter(), Counter()
+    sent = 0
+    for text, entities, known, ner in zip(texts, reference, known_spans, ner_spans):
+        sent += bool(prefiltered._ner_regions(text, known))
+        merged = covered((span_start, span_stop) for span_start, span_stop, _ in known + ner)
+        for span_start, span_stop, replacement in entities:
+            total[replacement] += 1
+            found[replacement] += is_covered(merged, span_start, span_stop)
+    return {
+        'total': total,
+        'found': found,
+        'sent_to_ner': sent,
+        'full_elapsed': full_elapsed,
+        'prefiltered_elapsed': prefiltered_elapsed,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Полнота NER при отборе строк словарем имен")
+    parser.add_argument('--lines', type=int, default=2000)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--density', type=float, default=0.5, help="Доля предложений с персональными данными")
+    args = parser.parse_args(argv)
+
+    generator = CorpusGenerator(seed=args.seed, density=args.density)
+    groups = {
+        'корпус': [generator.line() for _ in range(args.lines)],
+        'трудные': HARD_SENTENCES,
+    }
+    for group, texts in groups.items():
+        result = measure(texts)
+        print(f"{group}: строк {len(texts)}, в NER {result['sent_to_ner']}, "
+              f"NER {result['full_elapsed']:.2f} с, со словарем {result['prefiltered_elapsed']:.2f} с")
+        for replacement, count in sorted(result['total'].items()):
+            found = result['found'][replacement]
+            print(f"    {replacement:14} {found:5}/{count:<5} полнота {found / count:.3f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,182 @@
+"""Точность и скорость OCR в режиме CPU: исходный распознаватель (fp32) против квантованного (int8).
+
+    python benchmarks/ocr_cpu_report.py --images 5 --threads 1 2 4
+    python benchmarks/ocr_cpu_report.py --images-dir reference/ --batch-sizes 1 8
+
+Эталонный набор - каталог изображений, рядом с каждым лежит файл .txt с
+напечатанным на нем текстом (image.png и image.txt), либо синтетические
+страницы корпуса. Для каждой конфигурации (точность весов, потоки torch,
+batch_size EasyOCR) считаются время на изображение, доля слов эталона,
+распознанных без ошибок, и совпадение с fp32 при тех же потоках: доля
+блоков с тем же текстом и с тем же решением о закрашивании.
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+from collections import Counter
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.corpus import CorpusGenerator  # noqa: E402
+
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.bmp', '.tif', '.tiff')
+
+
+def reference_set(args, temp_dir):
+    """Пары (путь к изображению, эталонный текст или None)"""
+    if args.images_dir:
+        pairs = []
+        for name in sorted(os.listdir(args.images_dir)):
+            if os.path.splitext(name)[1].lower() not in IMAGE_EXTENSIONS:
+                continue
+            path = os.path.join(args.images_dir, name)
+            text_path = os.path.splitext(path)[0] + '.txt'
+            text = None
+            if os.path.exists(text_path):
+                with open(text_path, 'r', encoding='utf-8') as f:
+                    text = f.read()
+            pairs.append((path, text))
+        return pairs
+
+    generator = CorpusGenerator(seed=args.seed)
+    pairs = []
+    for index in range(args.images):
+        image, lines = generator.page(args.image_width, args.image_height)
+        path = os.path.join(temp_dir, f"page_{index}.png")
+        image.save(path)
+        pairs.append((path, '\n'.join(lines)))
+    return pairs
+
+
+def word_accuracy(reference, recognized):
+    """Доля слов эталона, которые есть среди распознанных (с учетом повторов)"""
+    expected = Counter(reference.split())
+    if not expected:
+        return None
+    found = Counter(recognized.split())
+    return sum((expected & found).values()) / sum(expected.values())
+
+
+def run_configuration(anonymizer, pairs, quantize, threads, batch_size, repeat):
+    import torch
+    from anonymizer import ImageAnonymizer
+    from PIL import Image
+
+    # Модель OCR каждой конфигурации выгружается после замера (close)
+    image_anonymizer = ImageAnonymizer(anonymizer, cpu_mode=True, ocr_threads=threads)
+    image_anonymizer.ocr_quantize = quantize
+    image_anonymizer.ocr_batch_size = batch_size
+    try:
+        load_start = time.perf_counter()
+        image_anonymizer.load_models()
+        load_time = time.perf_counter() - load_start
+        # Потоки задаются при создании модели, но действуют на весь процесс
+        torch.set_num_threads(threads)
+
+        outputs = []
+        times = []
+        for path, _ in pairs:
+            with Image.open(path) as image:
+                image.load()
+                best = float('inf')
+                for _ in range(repeat):
+                    start = time.perf_counter()
+                    results = image_anonymizer.read_text(path, image)
+                    best = min(best, time.perf_counter() - start)
+            times.append(best)
+            flags = anonymizer.find_personal_data([text for _, text, _ in results])
+            outputs.append([(text, flag) for (_, text, _), flag in zip(results, flags)])
+        return {'load': load_time, 'times': times, 'outputs': outputs}
+    finally:
+        image_anonymizer.close()
+
+
+def summarize(pairs, result, baseline):
+    times = result['times']
+    summary = {
+        'load_seconds': result['load'],
+        'seconds_per_image': sum(times) / len(times),
+    }
+    accuracies = [word_accuracy(reference, ' '.join(text for text, _ in output))
+                  for (_, reference), output in zip(pairs, result['outputs']) if reference]
+    accuracies = [value for value in accuracies if value is not None]
+    if accuracies:
+        summary['word_accuracy'] = sum(accuracies) / len(accuracies)
+
+    if baseline is not None:
+        # Рамки ищет один и тот же детектор, поэтому блоки сравниваются по порядку
+        same_text = same_flag = total = 0
+        for output, expected in zip(result['outputs'], baseline['outputs']):
+            for (text, flag), (expected_text, expected_flag) in zip(output, expected):
+                same_text += text == expected_text
+                same_flag += flag == expected_flag
+            total += max(len(output), len(expected))
+        if total:
+            summary['same_text_as_fp32'] = same_text / total
+            summary['same_redaction_as_fp32'] = same_flag / total
+        summary['speedup_vs_fp32'] = (sum(baseline['times']) / sum(times)) if sum(times) else None
+    return summary
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Точность и скорость OCR в режиме CPU")
+    parser.add_argument('--images-dir', default=None,
+                        help="Каталог эталонных изображений (рядом - .txt с текстом)")
+    parser.add_argument('--images', type=int, default=3, help="Число синтетических страниц")
+    parser.add_argument('--image-width', type=int, default=1240)
+    parser.add_argument('--image-height', type=int, default=1754)
+    parser.add_argument('--threads', type=int, nargs='+', default=[os.cpu_count() or 1],
+                        help="Числа потоков torch для сравнения")
+    parser.add_argument('--batch-sizes', type=int, nargs='+', default=[1], help="Значения batch_size EasyOCR")
+    parser.add_argument('--repeat', type=int, default=1, help="Повторов замера (берется лучший)")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', default=None, help="Сохранить отчет в JSON")
+    args = parser.parse_args(argv)
+
+    from anonymizer import Anonymizer
+    anonymizer = Anonymizer()
+    anonymizer.load_models()
+
+    report = []
+    with tempfile.TemporaryDirectory() as temp_dir:
+        pairs = reference_set(args, temp_dir)
+        if not pairs:
+            parser.error("Эталонные изображения не найдены")
+
+        for threads in args.threads:
+            for batch_size in args.batch_sizes:
+                try:
+                    baseline = run_configuration(anonymizer, pairs, False, threads, batch_size, args.repeat)
+                    quantized = run_configuration(anonymizer, pairs, True, threads, batch_size, args.repeat)
+                except Exception as e:
+                    # Без весов EasyOCR (например, без доступа к сети) сравнить нечего
+                    print(f"Не удалось загрузить модель OCR: {e}")
+                    return 1
+                for name, result, reference in (('fp32', baseline, None), ('int8', quantized, baseline)):
+                    entry = {'weights': name, 'threads': threads, 'batch_size': batch_size}
+                    entry.update(summarize(pairs, result, reference))
+                    report.append(entry)
+
+    for entry in report:
+        line = (f"{entry['weights']:5} потоков {entry['threads']:2}  batch_size {entry['batch_size']:3}  "
+                f"{entry['seconds_per_image']:7.3f} с/изобр.")
+        if 'word_accuracy' in entry:
+            line += f"  слов верно {entry['word_accuracy']:.1%}"
+        if entry.get('speedup_vs_fp32'):
+            line += f"  ускорение x{entry['speedup_vs_fp32']:.2f}"
+        if 'same_text_as_fp32' in entry:
+            line += (f"  текст как fp32 {entry['same_text_as_fp32']:.1%}"
+                     f"  закрашивание как fp32 {entry['same_redaction_as_fp32']:.1%}")
+        print(line)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,275 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+
+class ParagraphCache:
+    """Кэш результатов анонимизации абзацев по хэшу их содержимого.
+
+    Хранит до max_size записей в памяти с вытеснением по политике 'lru'
+    (давно не использованные) или 'fifo' (давно добавленные). Если указан
+    path, записи дополнительно сохраняются в SQLite и переживают перезапуск.
+    """
+    EVICTION_POLICIES = ('lru', 'fifo')
+    FILE_NAME = 'paragraph_cache.sqlite'
+
+    def __init__(self, max_size=10000, eviction='lru', path=None, max_disk_size=None):
+        if eviction not in self.EVICTION_POLICIES:
+            raise ValueError(f"Неизвестная политика вытеснения: {eviction}")
+        self.max_size = max_size
+        self.eviction = eviction
+        self.max_disk_size = max_disk_size or max_size * 10
+        self.hits = 0
+        self.misses = 0
+
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._db = None
+        self._dirty = False
+        if path:
+            self._open_db(path)
+
+    @classmethod
+    def in_data_dir(cls, data_dir, **kwargs):
+        """Кэш с сохранением на диск в каталоге данных приложения (~/.anonymizer)"""
+        os.makedirs(data_dir, exist_ok=True)
+        return cls(path=os.path.join(data_dir, cls.FILE_NAME), **kwargs)
+
+    def _open_db(self, path):
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute(
+            'CREATE TABLE IF NOT EXISTS paragraphs ('
+            'key TEXT PRIMARY KEY, result TEXT NOT NULL, used REAL NOT NULL)'
+        )
+        self._db.execute('CREATE INDEX IF NOT EXISTS paragraphs_used ON paragraphs (used)')
+        self._db.commit()
+
+    @staticmethod
+    def key(paragraph, salt=''):
+        digest = hashlib.blake2b(digest_size=16)
+        digest.update(salt.encode('utf-8'))
+        digest.update(b'\0')
+        digest.update(paragraph.encode('utf-8'))
+        return digest.hexdigest()
+
+    def get(self, paragraph, salt=''):
+        """Результат для абзаца или None; salt отделяет результаты разных настроек"""
+        key = self.key(paragraph, salt)
+        with self._lock:
+            result = self._entries.get(key)
+            if result is not None:
+                if self.eviction == 'lru':
+                    self._entries.move_to_end(key)
+                self.hits += 1
+                return result
+
+            if self._db is not None:
+                row = self._db.execute('SELECT result FROM paragraphs WHERE key = ?', (key,)).fetchone()
+                if row is not None:
+                    result = row[0]
+                    if self.eviction == 'lru':
+                        self._db.execute('UPDATE paragraphs SET used = ? WHERE key = ?', (time.time(), key))
+                        self._dirty = True
+                    self._remember(key, result)
+                    self.hits += 1
+                    return result
+
+            self.misses += 1
+            return None
+
+    def put(self, paragraph, result, salt=''):
+        key = self.key(paragraph, salt)
+        with self._lock:
+            self._remember(key, result)
+            if self._db is not None:
+                self._db.execute(
+                    'INSERT OR REPLACE INTO paragraphs (key, result, used) VALUES (?, ?, ?)',
+                    (key, result, time.time())
+                )
+                self._dirty = True
+
+    def _remember(self, key, result):
+        self._entries[key] = result
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def flush(self):
+        """Запись изменений на диск с вытеснением лишних записей"""
+        with self._lock:
+            if self._db is None or not self._dirty:
+                return
+            count = self._db.execute('SELECT COUNT(*) FROM paragraphs').fetchone()[0]
+            if count > self.max_disk_size:
+                self._db.execute(
+                    'DELETE FROM paragraphs WHERE key IN '
+                    '(SELECT key FROM paragraphs ORDER BY used LIMIT ?)',
+                    (count - self.max_disk_size,)
+                )
+            self._db.commit()
+            self._dirty = False
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+            if self._db is not None:
+                self._db.execute('DELETE FROM paragraphs')
+                self._db.commit()
+                self._dirty = False
+
+    def close(self):
+        self.flush()
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+    def stats(self):
+        """Счетчики попаданий и промахов"""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / total if total else 0.0,
+                'size': len(self._entries),
+                'max_size': self.max_size,
+                'eviction': self.eviction,
+            }
+
+
+class OcrCache:
+    """Дисковый кэш результатов OCR (рамки, текст, уверенность).
+
+    Записи хранятся в отдельных JSON-файлах, имя файла - хэш содержимого
+    изображения и настроек OCR. При превышении max_size байт удаляются
+    записи, которые дольше всего не читались.
+    """
+    DIR_NAME = 'ocr_cache'
+
+    def __init__(self, directory, max_size=256 * 1024 * 1024):
+        self.directory = directory
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+
+        os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._last_file = None
+        self._last_digest = None
+        self._size = sum(entry.stat().st_size for entry in self._entries())
+
+    @classmethod
+    def in_temp_dir(cls, temp_dir, **kwargs):
+        """Кэш во временном каталоге приложения (~/.anonymizer/temp)"""
+        return cls(os.path.join(temp_dir, cls.DIR_NAME), **kwargs)
+
+    def key(self, image_path, config=''):
+        """Ключ по содержимому файла изображения и описанию настроек OCR"""
+        digest = hashlib.blake2b(digest_size=20)
+        digest.update(config.encode('utf-8'))
+        digest.update(b'\0')
+        digest.update(self._file_digest(image_path))
+        return digest.hexdigest()
+
+    def _file_digest(self, image_path):
+        # Хэш файла запоминается, пока файл не изменился: для многостраничных
+        # изображений ключ строится для каждой страницы
+        stat = os.stat(image_path)
+        file_id = (os.path.abspath(image_path), stat.st_size, stat.st_mtime_ns)
+        with self._lock:
+            if self._last_file == file_id:
+                return self._last_digest
+
+        digest = hashlib.blake2b(digest_size=20)
+        with open(image_path, 'rb') as f:
+            for block in iter(lambda: f.read(1024 * 1024), b''):
+                digest.update(block)
+
+        with self._lock:
+            self._last_file, self._last_digest = file_id, digest.digest()
+        return digest.digest()
+
+    def _entries(self):
+        return [entry for entry in os.scandir(self.directory)
+                if entry.is_file() and entry.name.endswith('.json')]
+
+    def _path(self, key):
+        return os.path.join(self.directory, key + '.json')
+
+    def get(self, key):
+        """Результаты OCR в формате reader.readtext или None"""
+        path = self._path(key)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            # Время доступа обновляем явно: atime часто отключен в файловой системе
+            os.utime(path)
+        except (OSError, ValueError):
+            with self._lock:
+                self.misses += 1
+            return None
+
+        with self._lock:
+            self.hits += 1
+        return [(bbox, text, confidence) for bbox, text, confidence in data]
+
+    def put(self, key, results):
+        data = [
+            ([[float(x), float(y)] for x, y in bbox], str(text), float(confidence))
+            for bbox, text, confidence in results
+        ]
+        path = self._path(key)
+        temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False)
+        size = os.path.getsize(temp_path)
+
+        with self._lock:
+            if os.path.exists(path):
+                self._size -= os.path.getsize(path)
+            os.replace(temp_path, path)
+            self._size += size
+            if self._size > self.max_size:
+                self._evict()
+
+    def _evict(self):
+        entries = sorted(self._entries(), key=lambda entry: entry.stat().st_mtime)
+        for entry in entries:
+            if self._size <= self.max_size:
+                break
+            try:
+                size = entry.stat().st_size
+                os.remove(entry.path)
+            except OSError:
+                continue
+            self._size -= size
+
+    def clear(self):
+        with self._lock:
+            for entry in self._entries():
+                try:
+                    os.remove(entry.path)
+                except OSError:
+                    pass
+            self._size = 0
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self):
+        """Счетчики попаданий и промахов, занятое место"""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / total if total else 0.0,
+                'size_bytes': self._size,
+                'max_size': self.max_size,
+            }
@@ -10,6 +10,9 @@ packages = [
     "PIL",
     "easyocr",
     "natasha",
+    "pymorphy2",
+    "pymorphy2_dicts_ru",
+    "dawg_python",
     "torch",
     # Если 'resources.styles.embedded_styles' импортируется как модуль,
     # cx_Freeze обычно находит его сам. Если нет, можно попробовать добавить:
@@ -0,0 +1,230 @@
+"""Локальный демон анонимизации: модели загружаются один раз и обслуживают всех клиентов.
+
+    python daemon.py [--socket ~/.anonymizer/anonymizer.sock] [--no-ocr] [--cpu] [--stats]
+    python daemon_client.py text < input.txt > output.txt
+
+Запросы принимаются через Unix-сокет (протокол и клиент - daemon_client.py),
+каждое соединение обслуживается в своем потоке, тяжелых операций
+одновременно не больше --concurrency. Сокет доступен только владельцу (0600):
+демон читает и записывает файлы по путям из запросов.
+"""
+import argparse
+import io
+import json
+import logging
+import os
+import signal
+import socket
+import socketserver
+import sys
+import threading
+
+from daemon_client import ProtocolError, recv_message, send_message, socket_path_from_env
+
+
+class AnonymizerService:
+    """Операции демона над общими моделями: (заголовок, тело) запроса -> ответа"""
+
+    def __init__(self, anonymizer, image_anonymizer=None, concurrency=None):
+        self.anonymizer = anonymizer
+        self.image_anonymizer = image_anonymizer
+        self._slots = threading.BoundedSemaphore(concurrency or os.cpu_count() or 1)
+        self._operations = {
+            'text': self._text,
+            'texts': self._texts,
+            'find': self._find,
+            'file': self._file,
+            'image': self._image,
+            'image_file': self._image_file,
+        }
+
+    def handle(self, header, body):
+        op = header.get('op')
+        if op == 'ping':
+            return {'ok': True, 'pid': os.getpid(), 'models': self.anonymizer.registry.stats(),
+                    'ocr': self.image_anonymizer is not None}, b''
+        if op == 'stats':
+            return {'ok': True}, json.dumps(self.anonymizer.stats.snapshot(), ensure_ascii=False).encode('utf-8')
+
+        operation = self._operations.get(op)
+        if operation is None:
+            raise ValueError(f"Неизвестная операция: {op}")
+        with self._slots:
+            return operation(header, body)
+
+    def _text(self, header, body):
+        return {'ok': True}, self.anonymizer.anonymize_text(body.decode('utf-8')).encode('utf-8')
+
+    def _texts(self, header, body):
+        results = self.anonymizer.anonymize_texts(json.loads(body), self.anonymizer.cache)
+        return {'ok': True}, json.dumps(results, ensure_ascii=False).encode('utf-8')
+
+    def _find(self, header, body):
+        return {'ok': True}, json.dumps(self.anonymizer.find_personal_data(json.loads(body))).encode('utf-8')
+
+    def _file(self, header, body):
+        self.anonymizer.anonymize_file(header['input_path'], header['output_path'],
+                                       header.get('encoding', 'utf-8'), regex_only=header.get('regex_only', False))
+        return {'ok': True}, b''
+
+    def _require_ocr(self):
+        if self.image_anonymizer is None:
+            raise RuntimeError("OCR в демоне не загружен")
+        return self.image_anonymizer
+
+    def _image(self, header, body):
+        image = self._require_ocr().redact_image(io.BytesIO(body))
+        if image is None:
+            return {'ok': True, 'found': False}, b''
+        output = io.BytesIO()
+        image.save(output, format=header.get('format', 'PNG'))
+        return {'ok': True, 'found': True}, output.getvalue()
+
+    def _image_file(self, header, body):
+        output_path = self._require_ocr().anonymize_image(header['input_path'], header['output_path'])
+        return {'ok': True, 'output_path': output_path}, b''
+
+
+class _Handler(socketserver.BaseRequestHandler):
+    def handle(self):
+        service = self.server.service
+        while True:
+            try:
+                message = recv_message(self.request)
+            except (ConnectionError, ProtocolError) as e:
+                self.server.logger.warning(f"Разрыв соединения: {e}")
+                return
+            if message is None:
+                return
+
+            header, body = message
+            try:
+                response = service.handle(header, body)
+            except Exception as e:
+                self.server.logger.error(f"Ошибка операции {header.get('op')}: {e}")
+                response = {'ok': False, 'error': str(e)}, b''
+            try:
+                send_message(self.request, *response)
+            except OSError:
+                return
+
+
+class DaemonServer(socketserver.ThreadingUnixStreamServer):
+    """Сервер на Unix-сокете; сокет удаляется при остановке"""
+    daemon_threads = True
+
+    def __init__(self, socket_path, service, logger=None):
+        self.service = service
+        self.socket_path = socket_path
+        self.logger = logger or logging.getLogger('anonymizer')
+        self.remove_stale_socket(socket_path)
+        os.makedirs(os.path.dirname(socket_path) or '.', exist_ok=True)
+        # Сокет создается сразу с правами только для владельца
+        umask = os.umask(0o177)
+        try:
+            super().__init__(socket_path, _Handler)
+        finally:
+            os.umask(umask)
+
+    @staticmethod
+    def remove_stale_socket(socket_path):
+        if not os.path.exists(socket_path):
+            return
+        probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            probe.connect(socket_path)
+        except (ConnectionRefusedError, FileNotFoundError):
+            # Сокет остался от завершившегося демона
+            os.remove(socket_path)
+        else:
+            raise RuntimeError(f"Демон уже запущен: {socket_path}")
+        finally:
+            probe.close()
+
+    def server_close(self):
+        super().server_close()
+        if os.path.exists(self.socket_path):
+            os.remove(self.socket_path)
+
+
+def create_service(load_ocr=True, collect_stats=False, cache_size=10000, ocr_settings=None,
+                   concurrency=None, logger=None):
+    """Анонимизаторы с загруженными моделями (OCR - если доступен)"""
+    from anonymizer import Anonymizer, ImageAnonymizer
+    from cache import ParagraphCache
+    from stats import Stats
+
+    logger = logger or logging.getLogger('anonymizer')
+    anonymizer = Anonymizer(cache=ParagraphCache(cache_size) if cache_size else None,
+                            stats=Stats() if collect_stats else None)
+    anonymizer.load_models()
+
+    image_anonymizer = None
+    if load_ocr:
+        image_anonymizer = ImageAnonymizer(anonymizer)
+        for name, value in (ocr_settings or {}).items():
+            setattr(image_anonymizer, name, value)
+        try:
+            image_anonymizer.load_models()
+        except Exception as e:
+            # Без весов EasyOCR демон обслуживает только тексты
+            logger.error(f"Модель OCR не загружена, изображения недоступны: {e}")
+            image_anonymizer.close()
+            image_anonymizer = None
+    return AnonymizerService(anonymizer, image_anonymizer, concurrency)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Локальный демон анонимизации")
+    parser.add_argument('--socket', default=None,
+                        help="Путь к сокету (по умолчанию ANONYMIZER_SOCKET или ~/.anonymizer/anonymizer.sock)")
+    parser.add_argument('--no-ocr', action='store_true', help="Не загружать OCR (только тексты)")
+    parser.add_argument('--cpu', action='store_true',
+                        help="Режим OCR для CPU: квантованный распознаватель и заданное число потоков")
+    parser.add_argument('--ocr-threads', type=int, default=None, help="Потоков torch в режиме CPU")
+    parser.add_argument('--ocr-batch-size', type=int, default=None, help="Параметр batch_size EasyOCR")
+    parser.add_argument('--ocr-workers', type=int, default=None, help="Параметр workers EasyOCR")
+    parser.add_argument('--concurrency', type=int, default=None,
+                        help="Операций одновременно (по умолчанию - число ядер)")
+    parser.add_argument('--cache-size', type=int, default=10000, help="Размер кэша абзацев (0 - без кэша)")
+    parser.add_argument('--stats', action='store_true', help="Собирать время по этапам обработки")
+    args = parser.parse_args(argv)
+
+    from batch import ocr_settings
+    from main import setup_logging
+    logger = setup_logging()
+
+    socket_path = socket_path_from_env(args.socket)
+    try:
+        # Проверка до загрузки моделей: второй демон на том же сокете не нужен
+        DaemonServer.remove_stale_socket(socket_path)
+    except RuntimeError as e:
+        logger.error(str(e))
+        print(f"Ошибка: {e}", file=sys.stderr)
+        return 1
+
+    service = create_service(load_ocr=not args.no_ocr, collect_stats=args.stats, cache_size=args.cache_size,
+                             ocr_settings=ocr_settings(args),
+                             concurrency=args.concurrency, logger=logger)
+    server = DaemonServer(socket_path, service, logger)
+
+    def stop(signum, frame):
+        # shutdown ждет выхода из serve_forever, поэтому вызывается из другого потока
+        threading.Thread(target=server.shutdown).start()
+
+    signal.signal(signal.SIGTERM, stop)
+    logger.info(f"Демон анонимизации слушает {socket_path}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        if service.anonymizer.stats.enabled:
+            service.anonymizer.stats.log(logger)
+        logger.info("Демон анонимизации остановлен")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,211 @@
+"""Клиент локального демона анонимизации (daemon.py).
+
+    python daemon_client.py ping
+    python daemon_client.py text < input.txt > output.txt
+    python daemon_client.py file input.txt output.txt [--encoding cp1251] [--regex-only]
+    python daemon_client.py image scan.png anon_scan.png
+
+Модели загружены в демоне, поэтому клиент импортирует только стандартную
+библиотеку и отвечает сразу. Путь к сокету - аргумент --socket, переменная
+окружения ANONYMIZER_SOCKET или ~/.anonymizer/anonymizer.sock.
+
+Протокол: запрос и ответ - по два кадра, каждый из длины (4 байта, big-endian)
+и данных. Первый кадр - заголовок в JSON ({"op": ...} в запросе, {"ok": ...}
+в ответе), второй - тело (текст в UTF-8, JSON или байты изображения), может
+быть пустым. По одному соединению можно отправить несколько запросов подряд.
+"""
+import argparse
+import json
+import os
+import socket
+import struct
+import sys
+
+DEFAULT_SOCKET_PATH = os.path.join(os.path.expanduser('~'), '.anonymizer', 'anonymizer.sock')
+MAX_FRAME_SIZE = 1024 * 1024 * 1024
+
+_LENGTH = struct.Struct('!I')
+
+
+class ProtocolError(Exception):
+    """Нарушение формата кадров"""
+
+
+class DaemonError(Exception):
+    """Ошибка, возвращенная демоном"""
+
+
+def socket_path_from_env(socket_path=None):
+    return socket_path or os.environ.get('ANONYMIZER_SOCKET') or DEFAULT_SOCKET_PATH
+
+
+def send_message(sock, header, body=b''):
+    """Отправка заголовка (dict) и тела (bytes) двумя кадрами"""
+    header = json.dumps(header, ensure_ascii=False).encode('utf-8')
+    sock.sendall(b''.join((_LENGTH.pack(len(header)), header, _LENGTH.pack(len(body)))))
+    if body:
+        sock.sendall(body)
+
+
+def _recv_exactly(sock, size, eof_ok=False):
+    buffer = bytearray(size)
+    view = memoryview(buffer)
+    received = 0
+    while received < size:
+        count = sock.recv_into(view[received:])
+        if not count:
+            if eof_ok and received == 0:
+                return None
+            raise ConnectionError("Соединение закрыто посреди сообщения")
+        received += count
+    return buffer
+
+
+def _recv_frame(sock, eof_ok=False):
+    prefix = _recv_exactly(sock, _LENGTH.size, eof_ok)
+    if prefix is None:
+        return None
+    (length,) = _LENGTH.unpack(prefix)
+    if length > MAX_FRAME_SIZE:
+        raise ProtocolError(f"Слишком большой кадр: {length} байт")
+    return _recv_exactly(sock, length)
+
+
+def recv_message(sock):
+    """Прием (заголовок, тело); None, если соединение закрыто между сообщениями"""
+    header = _recv_frame(sock, eof_ok=True)
+    if header is None:
+        return None
+    try:
+        header = json.loads(header.decode('utf-8'))
+    except ValueError as e:
+        raise ProtocolError(f"Неверный заголовок: {e}")
+    if not isinstance(header, dict):
+        raise ProtocolError("Заголовок должен быть объектом JSON")
+    return header, bytes(_recv_frame(sock))
+
+
+class AnonymizerClient:
+    """Соединение с демоном анонимизации; методы повторяют Anonymizer и ImageAnonymizer.
+
+    Пути к файлам передаются демону как есть: он читает и записывает их сам,
+    поэтому они должны быть доступны процессу демона.
+    """
+
+    def __init__(self, socket_path=None, timeout=None):
+        self.socket_path = socket_path_from_env(socket_path)
+        self.timeout = timeout
+        self._socket = None
+
+    def connect(self):
+        if self._socket is None:
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            sock.settimeout(self.timeout)
+            try:
+                sock.connect(self.socket_path)
+            except OSError:
+                sock.close()
+                raise
+            self._socket = sock
+        return self
+
+    def close(self):
+        if self._socket is not None:
+            self._socket.close()
+            self._socket = None
+
+    def __enter__(self):
+        return self.connect()
+
+    def __exit__(self, *exc_info):
+        self.close()
+        return False
+
+    def request(self, op, body=b'', **params):
+        """Запрос к демону; возвращает (заголовок, тело) ответа"""
+        self.connect()
+        try:
+            send_message(self._socket, dict(params, op=op), body)
+            response = recv_message(self._socket)
+        except BaseException:
+            # После сбоя посреди сообщения соединение непригодно
+            self.close()
+            raise
+        if response is None:
+            self.close()
+            raise ConnectionError("Демон закрыл соединение")
+        header, body = response
+        if not header.get('ok'):
+            raise DaemonError(header.get('error', "Неизвестная ошибка"))
+        return header, body
+
+    def ping(self):
+        """Состояние демона: pid и загруженные модели"""
+        return self.request('ping')[0]
+
+    def stats(self):
+        """Замеры этапов демона (если он запущен с --stats)"""
+        return json.loads(self.request('stats')[1] or b'{}')
+
+    def anonymize_text(self, text):
+        return self.request('text', text.encode('utf-8'))[1].decode('utf-8')
+
+    def anonymize_texts(self, texts):
+        body = json.dumps(list(texts), ensure_ascii=False).encode('utf-8')
+        return json.loads(self.request('texts', body)[1])
+
+    def find_personal_data(self, texts):
+        body = json.dumps(list(texts), ensure_ascii=False).encode('utf-8')
+        return json.loads(self.request('find', body)[1])
+
+    def anonymize_file(self, input_path, output_path, encoding='utf-8', regex_only=False):
+        self.request('file', input_path=os.path.abspath(input_path), output_path=os.path.abspath(output_path),
+                     encoding=encoding, regex_only=regex_only)
+
+    def anonymize_image(self, image_path, output_path):
+        """Путь результата или None, если текст на изображении не найден"""
+        header, _ = self.request('image_file', input_path=os.path.abspath(image_path),
+                                 output_path=os.path.abspath(output_path))
+        return header.get('output_path')
+
+    def redact_image_bytes(self, data, image_format='PNG'):
+        """Анонимизация изображения в памяти: закодированные байты результата или None"""
+        header, body = self.request('image', bytes(data), format=image_format)
+        return body if header.get('found') else None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Клиент демона анонимизации")
+    parser.add_argument('--socket', default=None, help="Путь к сокету демона")
+    commands = parser.add_subparsers(dest='command', required=True)
+    commands.add_parser('ping', help="Проверка, что демон запущен")
+    commands.add_parser('text', help="Анонимизация stdin в stdout")
+    file_parser = commands.add_parser('file', help="Анонимизация текстового файла")
+    file_parser.add_argument('input')
+    file_parser.add_argument('output')
+    file_parser.add_argument('--encoding', default='utf-8')
+    file_parser.add_argument('--regex-only', action='store_true')
+    image_parser = commands.add_parser('image', help="Анонимизация изображения")
+    image_parser.add_argument('input')
+    image_parser.add_argument('output')
+    args = parser.parse_args(argv)
+
+    try:
+        with AnonymizerClient(args.socket) as client:
+            if args.command == 'ping':
+                print(json.dumps(client.ping(), ensure_ascii=False))
+            elif args.command == 'text':
+                sys.stdout.write(client.anonymize_text(sys.stdin.read()))
+            elif args.command == 'file':
+                client.anonymize_file(args.input, args.output, args.encoding, args.regex_only)
+            elif args.command == 'image':
+                if client.anonymize_image(args.input, args.output) is None:
+                    print("Текст на изображении не найден", file=sys.stderr)
+    except (OSError, DaemonError, ProtocolError) as e:
+        print(f"Ошибка: {e}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
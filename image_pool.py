@@ -0,0 +1,222 @@
+import os
+import threading
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+from PIL import Image
+
+from stats import NULL_STATS, Stats
+
+# Анонимизатор рабочего процесса: создается один раз в initializer пула
+_image_anonymizer = None
+
+
+def _init_worker(ocr_settings, collect_stats):
+    global _image_anonymizer
+    from anonymizer import Anonymizer, ImageAnonymizer
+
+    anonymizer = Anonymizer(stats=Stats() if collect_stats else None)
+    anonymizer.load_models()
+    _image_anonymizer = ImageAnonymizer(anonymizer)
+    for name, value in (ocr_settings or {}).items():
+        setattr(_image_anonymizer, name, value)
+    # Параллельность обеспечивает пул процессов, страницы внутри процесса - по одной
+    _image_anonymizer.page_workers = 1
+    # Модель OCR загружается сразу, задачи получают уже готовый читатель
+    _image_anonymizer.load_models()
+
+
+def _take_profile():
+    stats = _image_anonymizer.stats
+    if not stats.enabled:
+        return None
+    profile = stats.snapshot()
+    stats.reset()
+    return profile
+
+
+def _shared_image(buffer, mode, size):
+    # Для режимов L, RGBA и RGBX PIL использует буфер без копирования
+    return Image.frombuffer(mode, size, buffer, 'raw', mode, 0, 1)
+
+
+def _shared_array(buffer, mode, size):
+    width, height = size
+    shape = (height, width) if mode == 'L' else (height, width, 4)
+    return np.ndarray(shape, dtype=np.uint8, buffer=buffer)
+
+
+def _close(memory, unlink=False):
+    try:
+        memory.close()
+    except BufferError:
+        # На буфер еще ссылается трассировка исключения; отображение
+        # закроется сборщиком мусора
+        pass
+    if unlink:
+        memory.unlink()
+
+
+def _redact_shared(name, mode, size, image_path):
+    """Задача рабочего процесса: закрашивание изображения прямо в общей памяти"""
+    memory = shared_memory.SharedMemory(name=name)
+    try:
+        image = _shared_image(memory.buf, mode, size)
+        array = _shared_array(memory.buf, mode, size)
+        found = _image_anonymizer.redact_pixels(image, array, image_path)
+        del image, array
+    finally:
+        _close(memory)
+    return found, _take_profile()
+
+
+def _anonymize_file(image_path, output_path):
+    """Задача рабочего процесса для многостраничных файлов: чтение и запись по пути"""
+    return _image_anonymizer.anonymize_image(image_path, output_path), _take_profile()
+
+
+class ImagePool:
+    """Пул процессов для анонимизации изображений с передачей пикселей через общую память.
+
+    Изображение декодируется в родительском процессе в блок
+    multiprocessing.shared_memory; рабочий процесс закрашивает персональные
+    данные прямо в этом блоке, а родитель сохраняет результат из него же.
+    Пиксели между процессами не сериализуются, обе стороны работают с
+    представлениями одного буфера. В каждом процессе один заранее
+    загруженный читатель EasyOCR.
+
+    В обработке одновременно не больше max_pending изображений (вместе с
+    сохранением результатов): submit ждет, пока освободится место, поэтому
+    память не зависит от длины очереди. Многостраничные файлы рабочий
+    процесс читает и записывает сам.
+    """
+
+    def __init__(self, workers=None, max_pending=None, ocr_settings=None, collect_stats=False):
+        self.workers = workers or os.cpu_count() or 1
+        self.max_pending = max_pending or 2 * self.workers
+        # Замеры этапов всех рабочих процессов
+        self.stats = Stats() if collect_stats else NULL_STATS
+
+        self._slots = threading.BoundedSemaphore(self.max_pending)
+        self._executor = ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker,
+                                             initargs=(ocr_settings, collect_stats))
+        # Результаты сохраняются в отдельном потоке, чтобы не задерживать
+        # выдачу задач рабочим процессам
+        self._encoder = ThreadPoolExecutor(max_workers=1)
+
+    def submit(self, image, output_path=None):
+        """Анонимизация изображения (путь или PIL.Image) в рабочем процессе.
+
+        Возвращает Future: с output_path - путь сохраненного результата, без
+        него - новый PIL.Image; None, если текст на изображении не найден.
+        """
+        image_path = image if isinstance(image, str) else None
+        if image_path and output_path is None:
+            raise ValueError("Для изображения из файла нужен путь результата")
+
+        result = Future()
+        self._slots.acquire()
+        memory = None
+        try:
+            if image_path:
+                with Image.open(image_path) as source:
+                    if getattr(source, 'n_frames', 1) > 1:
+                        task = self._executor.submit(_anonymize_file, image_path, output_path)
+                        task.add_done_callback(lambda task: self._encoder.submit(self._finish_file, task, result))
+                        return result
+                    source.load()
+                    memory, mode, size, save_mode = self._share(source)
+            else:
+                memory, mode, size, save_mode = self._share(image)
+            task = self._executor.submit(_redact_shared, memory.name, mode, size, image_path)
+        except BaseException:
+            if memory is not None:
+                _close(memory, unlink=True)
+            self._slots.release()
+            raise
+
+        task.add_done_callback(lambda task: self._encoder.submit(
+            self._finish, task, memory, mode, size, save_mode, output_path, result))
+        return result
+
+    def map(self, jobs):
+        """Futures для пар (изображение, путь результата) в исходном порядке.
+
+        Задачи подаются по мере освобождения мест в пуле; уже выполненные
+        futures выдаются сразу, не дожидаясь подачи остальных задач.
+        """
+        pending = deque()
+        for image, output_path in jobs:
+            pending.append(self.submit(image, output_path))
+            while pending and pending[0].done():
+                yield pending.popleft()
+        while pending:
+            yield pending.popleft()
+
+    def _share(self, image):
+        """Копирование пикселей в новый блок общей памяти"""
+        save_mode = image.mode if image.mode in ('L', 'RGB', 'RGBA') else 'RGB'
+        mode = save_mode if save_mode != 'RGB' else 'RGBX'
+        width, height = image.size
+        memory = shared_memory.SharedMemory(create=True, size=max(1, width * height * (1 if mode == 'L' else 4)))
+        try:
+            array = _shared_array(memory.buf, mode, image.size)
+            np.copyto(array, np.asarray(image if image.mode == mode else image.convert(mode)))
+            del array
+        except BaseException:
+            _close(memory, unlink=True)
+            raise
+        return memory, mode, image.size, save_mode
+
+    def _finish(self, task, memory, mode, size, save_mode, output_path, result):
+        try:
+            found, profile = task.result()
+            self._merge(profile)
+            if not found:
+                result.set_result(None)
+                return
+            image = _shared_image(memory.buf, mode, size)
+            if output_path is None:
+                # Копия: блок общей памяти сейчас будет удален
+                output = image.convert(save_mode)
+                del image
+                result.set_result(output)
+                return
+            with self.stats.stage('image.encode'):
+                # RGBX сохраняется как RGB
+                (image if mode == save_mode else image.convert(save_mode)).save(output_path)
+            del image
+            result.set_result(output_path)
+        except BaseException as e:
+            result.set_exception(e)
+        finally:
+            _close(memory, unlink=True)
+            self._slots.release()
+
+    def _finish_file(self, task, result):
+        try:
+            output_path, profile = task.result()
+            self._merge(profile)
+            result.set_result(output_path)
+        except BaseException as e:
+            result.set_exception(e)
+        finally:
+            self._slots.release()
+
+    def _merge(self, profile):
+        if profile:
+            self.stats.merge(profile)
+
+    def close(self):
+        """Завершение рабочих процессов после выполнения поданных задач"""
+        self._executor.shutdown(wait=True)
+        self._encoder.shutdown(wait=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+        return False
@@ -112,9 +112,13 @@ if __name__ == "__main__":
         from modern_ui import ModernAnonymizerApp
 
         # Создаем и отображаем окно
-        window = ModernAnonymizerApp(app_paths)
+        window = ModernAnonymizerApp(app_paths, collect_stats='--stats' in sys.argv)
         window.show()
 
+        # Модели загружаются в фоне, окно доступно сразу
+        if '--no-warmup' not in sys.argv:
+            window.start_warm_up()
+
         sys.exit(app.exec_())
 
     except Exception as e:
@@ -0,0 +1,333 @@
+import re
+from bisect import bisect_left, bisect_right
+
+_WORD_CHAR = re.compile(r'\w')
+_BOUNDARY = re.compile(r'\b')
+
+
+def _is_word(text, index):
+    return index >= 0 and _WORD_CHAR.match(text, index) is not None
+
+
+class LineContext:
+    """Строка text[pos:endpos] и данные о ней, общие для всех сопоставителей.
+
+    Серии символов и границы слов строятся один раз при первом обращении.
+    Результат поиска каждого сопоставителя запоминается: повторный поиск с
+    позиции, не дальше найденного совпадения, строку заново не сканирует.
+    Совпадения - тройки (start, stop, имя паттерна) с позициями в text.
+
+    boundary - позиция сразу за уже найденным совпадением: при замене перед
+    ней окажется не словесный символ (скобка замены), поэтому совпадения
+    паттернов из boundary_names, начинающиеся в ней, проверяются так, будто
+    перед ней граница слова.
+    """
+    __slots__ = ('text', 'pos', 'endpos', 'boundary', 'boundary_names', '_data', '_found')
+
+    def __init__(self, text, pos=0, endpos=None):
+        self.text = text
+        self.pos = pos
+        self.endpos = len(text) if endpos is None else endpos
+        self.boundary = None
+        self.boundary_names = ()
+        self._data = {}
+        self._found = {}
+
+    def at_boundary(self, index, name):
+        """Стоит ли перед позицией index замена для паттерна name"""
+        return index == self.boundary and name in self.boundary_names
+
+    def word_before(self, index, name):
+        """Словесный ли символ перед позицией index для паттерна name (с учетом boundary)"""
+        return not self.at_boundary(index, name) and _is_word(self.text, index - 1)
+
+    def boundaries(self):
+        """Позиции границ слов (\\b) в строке по возрастанию"""
+        boundaries = self._data.get('boundaries')
+        if boundaries is None:
+            boundaries = self._data['boundaries'] = [
+                match.start() for match in _BOUNDARY.finditer(self.text, self.pos, self.endpos)]
+        return boundaries
+
+    def runs(self, pattern):
+        """Начала и концы непрерывных серий pattern в строке"""
+        runs = self._data.get(pattern)
+        if runs is None:
+            starts, ends = [], []
+            for match in pattern.finditer(self.text, self.pos, self.endpos):
+                starts.append(match.start())
+                ends.append(match.end())
+            runs = self._data[pattern] = (starts, ends)
+        return runs
+
+    def run_at(self, pattern, index):
+        """Серия pattern, содержащая позицию index, или None"""
+        starts, ends = self.runs(pattern)
+        run = bisect_right(starts, index) - 1
+        if run >= 0 and ends[run] > index:
+            return starts[run], ends[run]
+        return None
+
+    def search(self, matcher, pos):
+        """Самое левое совпадение matcher, начинающееся не раньше pos"""
+        if pos == self.boundary:
+            # Совпадение в самой позиции boundary проверяется отдельно
+            # (match учитывает boundary), дальше границы слов те же, что в тексте
+            match = matcher.match(self, pos, self.endpos)
+            if match:
+                return match
+            pos += 1
+        found = self._found.get(matcher)
+        if found is not None:
+            origin, match = found
+            if origin <= pos and (match is None or match[0] >= pos):
+                return match
+        match = matcher.search(self, pos)
+        self._found[matcher] = (pos, match)
+        return match
+
+
+class RegexMatcher:
+    """Регулярное выражение с интерфейсом сопоставителя"""
+    # Совпадение trigger в сканере уже является совпадением паттерна
+    exact = True
+
+    def __init__(self, name, pattern):
+        self.name = name
+        self.regex = pattern
+        self.trigger = pattern.pattern
+        if pattern.flags & re.IGNORECASE:
+            self.trigger = f'(?i:{self.trigger})'
+        # Тот же паттерн без \b в начале - для позиции context.boundary
+        self._after_boundary = None
+        if pattern.pattern.startswith(r'\b'):
+            self._after_boundary = re.compile(pattern.pattern[2:], pattern.flags)
+
+    def search(self, context, pos):
+        match = self.regex.search(context.text, pos, context.endpos)
+        return match and (match.start(), match.end(), self.name)
+
+    def match(self, context, start, endpos):
+        regex = self.regex
+        if self._after_boundary is not None and context.at_boundary(start, self.name):
+            # Перед позицией не словесный символ: \b есть, только если с нее начинается слово
+            if not _is_word(context.text, start):
+                return None
+            regex = self._after_boundary
+        match = regex.match(context.text, start, endpos)
+        return match and (match.start(), match.end(), self.name)
+
+
+class CombinedMatcher:
+    """Несколько сопоставителей, собранных в одно регулярное выражение.
+
+    entries - пары (сопоставитель, класс первых символов) в порядке
+    приоритета: из совпадений в одной позиции побеждает более раннее. В
+    выражение входят trigger сопоставителей - сами паттерны или начала
+    возможных совпадений, которые затем проверяются методом match.
+    """
+
+    def __init__(self, entries):
+        self.matchers = [matcher for matcher, _ in entries]
+        self._indexes = {matcher.name: index for index, matcher in enumerate(self.matchers)}
+        groups = [f'(?P<{matcher.name}>{matcher.trigger})' for matcher in self.matchers]
+        # Опережающая проверка первого символа позволяет быстро пропускать
+        # позиции, с которых не может начаться ни один паттерн
+        first_chars = ''.join(first for _, first in entries)
+        self._first = re.compile(f'[{first_chars}]')
+        self.regex = re.compile(f'(?=[{first_chars}])(?:{"|".join(groups)})')
+
+    def search(self, context, pos):
+        text = context.text
+        while True:
+            candidate = self.regex.search(text, pos, context.endpos)
+            if candidate is None:
+                return None
+            index = self._indexes[candidate.lastgroup]
+            if self.matchers[index].exact:
+                return candidate.start(), candidate.end(), candidate.lastgroup
+            match = self.match(context, candidate.start(), context.endpos, index)
+            if match:
+                return match
+            pos = candidate.start() + 1
+
+    def match(self, context, start, endpos, first=0):
+        if not self._first.match(context.text, start, endpos):
+            return None
+        for matcher in self.matchers[first:]:
+            match = matcher.match(context, start, endpos)
+            if match:
+                return match
+        return None
+
+
+class CapitalizedWordsMatcher:
+    """Несколько подряд идущих слов с заглавной буквы (ФИО), по словам.
+
+    Каждое слово просматривается не более max_words раз, поэтому время
+    линейно по длине строки. Совпадения те же, что у выражения в pattern.
+    """
+    flags = 0
+    exact = False
+
+    def __init__(self, name, upper, lower, min_words=2, max_words=3):
+        self.name = name
+        self.min_words = min_words
+        self.max_words = max_words
+        self.pattern = rf'\b[{upper}][{lower}]+(\s+[{upper}][{lower}]+){{{min_words - 1},{max_words - 1}}}\b'
+        # Кандидаты - начала min_words слов подряд: одиночные слова с заглавной
+        # буквы (начала предложений) отсеиваются без вызова match
+        self.trigger = rf'\b[{upper}][{lower}]+(?:\s+[{upper}][{lower}]+){{{min_words - 1}}}'
+        self._start = re.compile(self.trigger)
+        self._word = re.compile(rf'[{upper}][{lower}]+')
+        self._space = re.compile(r'\s+')
+
+    def match(self, context, start, endpos):
+        text = context.text
+        if context.word_before(start, self.name):
+            return None
+        word = self._word.match(text, start, endpos)
+        if word is None:
+            return None
+
+        ends = [word.end()]
+        while len(ends) < self.max_words:
+            space = self._space.match(text, ends[-1], endpos)
+            word = space and self._word.match(text, space.end(), endpos)
+            if not word:
+                break
+            ends.append(word.end())
+
+        # Самая длинная последовательность слов, за которой идет граница слова
+        for stop in reversed(ends[self.min_words - 1:]):
+            if stop == endpos or not _is_word(text, stop):
+                return start, stop, self.name
+        return None
+
+    def search(self, context, pos):
+        while True:
+            candidate = self._start.search(context.text, pos, context.endpos)
+            if candidate is None:
+                return None
+            match = self.match(context, candidate.start(), context.endpos)
+            if match:
+                return match
+            pos = candidate.start() + 1
+
+
+class AddressMatcher:
+    """Адрес: ключевое слово (ул, д, кв...), пробел и серия допустимых символов.
+
+    Серии символов и границы слов строки вычисляются один раз, поэтому конец
+    адреса находится без возвратов по тексту. Совпадения те же, что у
+    выражения в pattern.
+    """
+    flags = re.IGNORECASE
+    exact = False
+
+    def __init__(self, name, keywords, body):
+        self.name = name
+        alternatives = '|'.join(keywords)
+        self.pattern = rf'\b({alternatives})\.?\s+{body}+\b'
+        self.trigger = rf'(?i:\b(?:{alternatives})\.?(?=\s))'
+        self._keyword = re.compile(self.trigger)
+        # Ключевые слова состоят из букв: в позиции context.boundary граница слова есть всегда
+        self._keyword_after_boundary = re.compile(rf'(?i:(?:{alternatives})\.?(?=\s))')
+        self._body = re.compile(f'{body}+', re.IGNORECASE)
+
+    def match(self, context, start, endpos):
+        keyword = (self._keyword_after_boundary if context.at_boundary(start, self.name)
+                   else self._keyword).match(context.text, start, endpos)
+        if keyword is None:
+            return None
+
+        # Адрес продолжается до конца серии допустимых символов (пробелы в нее
+        # входят) и заканчивается на последней границе слова в ней
+        body = keyword.end()
+        stop = min(context.run_at(self._body, body)[1], endpos)
+        if stop < body + 2:
+            return None
+        if stop == endpos:
+            if _is_word(context.text, stop - 1):
+                return start, stop, self.name
+            stop -= 1
+
+        boundaries = context.boundaries()
+        index = bisect_right(boundaries, stop) - 1
+        if index >= 0 and boundaries[index] >= body + 2:
+            return start, boundaries[index], self.name
+        return None
+
+    def search(self, context, pos):
+        while True:
+            keyword = self._keyword.search(context.text, pos, context.endpos)
+            if keyword is None:
+                return None
+            match = self.match(context, keyword.start(), context.endpos)
+            if match:
+                return match
+            pos = keyword.start() + 1
+
+
+class EmailMatcher:
+    """Email: поиск от символа '@' к началу имени и к концу домена.
+
+    Имя пользователя - серия допустимых символов перед '@', совпадение
+    начинается с первой границы слова в ней. Каждый '@' проверяется один
+    раз. Совпадения те же, что у выражения в pattern.
+    """
+    flags = 0
+    # Начало email без просмотра до '@' не определить: в общий сканер не входит
+    trigger = None
+
+    def __init__(self, name, local, domain):
+        self.name = name
+        self.pattern = rf'\b{local}+@{domain}'
+        self._local = re.compile(f'{local}+')
+        self._domain = re.compile(f'@{domain}')
+
+    def match(self, context, start, endpos):
+        text = context.text
+        if not self._local.match(text, start, start + 1):
+            return None
+        if context.word_before(start, self.name) == _is_word(text, start):
+            return None
+        local = context.run_at(self._local, start)
+        if local is None or local[1] >= endpos or text[local[1]] != '@':
+            return None
+        domain = self._domain.match(text, local[1], endpos)
+        return domain and (start, domain.end(), self.name)
+
+    def search(self, context, pos):
+        text = context.text
+        at = text.find('@', pos, context.endpos)
+        while at != -1:
+            local = context.run_at(self._local, at - 1) if at > pos else None
+            if local is not None:
+                boundaries = context.boundaries()
+                index = bisect_left(boundaries, max(pos, local[0]))
+                if index < len(boundaries) and boundaries[index] < at:
+                    domain = self._domain.match(text, at, context.endpos)
+                    if domain:
+                        return boundaries[index], domain.end(), self.name
+            at = text.find('@', at + 1, context.endpos)
+        return None
+
+
+class PatternSet:
+    """Несколько сопоставителей как один: самое левое совпадение, а из
+    начинающихся в одной позиции - паттерна с меньшим рангом"""
+
+    def __init__(self, members, ranks):
+        self.members = members
+        self.ranks = ranks
+
+    def search(self, context, pos):
+        ranks = self.ranks
+        best = None
+        for member in self.members:
+            match = context.search(member, pos)
+            if match and (best is None or match[0] < best[0]
+                          or (match[0] == best[0] and ranks[match[2]] < ranks[best[2]])):
+                best = match
+        return best
@@ -0,0 +1,217 @@
+import threading
+
+
+class _Entry:
+    """Запись реестра: экземпляр модели и счетчик ссылок на него"""
+
+    def __init__(self):
+        self.model = None
+        self.refcount = 0
+        self.dependencies = []
+        # Отдельная блокировка на загрузку, чтобы долгая загрузка одной модели
+        # не блокировала выдачу других
+        self.load_lock = threading.Lock()
+
+
+class ModelRegistry:
+    """Общий для процесса реестр тяжелых моделей (Natasha, EasyOCR).
+
+    Каждая модель создается один раз и выдается всем потребителям
+    с подсчетом ссылок; после последнего release() она освобождается.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._factories = {}
+        self._entries = {}
+
+    def register(self, name, factory, dependencies=()):
+        """Регистрация фабрики модели.
+
+        Фабрика получает экземпляры зависимостей позиционно и параметры
+        модели (например, языки OCR) именованными аргументами.
+        """
+        with self._lock:
+            self._factories[name] = (factory, tuple(dependencies))
+
+    @staticmethod
+    def _key(name, options):
+        return name, tuple(sorted(options.items()))
+
+    def acquire(self, name, **options):
+        """Получение общего экземпляра модели (загружается при первом запросе)"""
+        key = self._key(name, options)
+        with self._lock:
+            if name not in self._factories:
+                raise KeyError(f"Модель '{name}' не зарегистрирована")
+            factory, dependencies = self._factories[name]
+            entry = self._entries.get(key)
+            if entry is None:
+                entry = _Entry()
+                self._entries[key] = entry
+            entry.refcount += 1
+
+        try:
+            with entry.load_lock:
+                if entry.model is None:
+                    acquired = []
+                    try:
+                        for dependency in dependencies:
+                            acquired.append(self.acquire(dependency))
+                        entry.model = factory(*acquired, **options)
+                    except BaseException:
+                        for dependency in dependencies[:len(acquired)]:
+                            self.release(dependency)
+                        raise
+                    entry.dependencies = list(dependencies)
+                return entry.model
+        except BaseException:
+            self._release_key(key)
+            raise
+
+    def release(self, name, **options):
+        """Возврат модели в реестр; после последнего возврата модель выгружается"""
+        self._release_key(self._key(name, options))
+
+    def _release_key(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return
+            entry.refcount -= 1
+            if entry.refcount > 0:
+                return
+            del self._entries[key]
+            dependencies = entry.dependencies
+            entry.model = None
+
+        for dependency in dependencies:
+            self.release(dependency)
+
+    def is_loaded(self, name, **options):
+        """Загружена ли модель в данный момент"""
+        with self._lock:
+            entry = self._entries.get(self._key(name, options))
+            return entry is not None and entry.model is not None
+
+    def stats(self):
+        """Загруженные модели и число ссылок на них"""
+        result = {}
+        with self._lock:
+            for (name, _), entry in self._entries.items():
+                if entry.model is not None:
+                    result[name] = result.get(name, 0) + entry.refcount
+        return result
+
+
+class ModelSet:
+    """Модели одного потребителя (анонимизатора): загружаются при первом обращении"""
+
+    def __init__(self, registry):
+        self.registry = registry
+        self._lock = threading.Lock()
+        self._models = {}
+
+    def get(self, name, **options):
+        key = ModelRegistry._key(name, options)
+        model = self._models.get(key)
+        if model is None:
+            with self._lock:
+                model = self._models.get(key)
+                if model is None:
+                    model = self.registry.acquire(name, **options)
+                    self._models[key] = model
+        return model
+
+    def is_loaded(self, name, **options):
+        return ModelRegistry._key(name, options) in self._models
+
+    def close(self):
+        """Возврат всех полученных моделей в реестр"""
+        with self._lock:
+            keys = list(self._models)
+            self._models.clear()
+        for name, options in keys:
+            self.registry.release(name, **dict(options))
+
+
+def _create_segmenter():
+    from natasha import Segmenter
+    return Segmenter()
+
+
+def _create_morph_vocab():
+    from natasha import MorphVocab
+    return MorphVocab()
+
+
+def _create_embedding():
+    from natasha import NewsEmbedding
+    return NewsEmbedding()
+
+
+def _create_ner_tagger(embedding):
+    from natasha import NewsNERTagger
+    return NewsNERTagger(embedding)
+
+
+def _create_names_extractor(morph_vocab):
+    from natasha import NamesExtractor
+    return NamesExtractor(morph_vocab)
+
+
+def _create_name_dictionary():
+    from names import NameDictionary
+    return NameDictionary()
+
+
+def _set_torch_threads(threads=None, interop_threads=None):
+    """Число потоков torch внутри операций и между операциями (на весь процесс)"""
+    import torch
+    if threads:
+        torch.set_num_threads(threads)
+    if interop_threads and torch.get_num_interop_threads() != interop_threads:
+        try:
+            torch.set_num_interop_threads(interop_threads)
+        except RuntimeError:
+            # Задается только до первой параллельной операции torch в процессе
+            pass
+
+
+def quantize_recognizer(model):
+    """Динамическое квантование распознавателя EasyOCR в int8 (слои LSTM и Linear)"""
+    import torch
+    backends = torch.backends.quantized
+    if backends.engine not in backends.supported_engines or backends.engine == 'none':
+        engines = [engine for engine in ('x86', 'fbgemm', 'qnnpack') if engine in backends.supported_engines]
+        if not engines:
+            raise RuntimeError("torch собран без поддержки квантования")
+        backends.engine = engines[0]
+    return torch.quantization.quantize_dynamic(model, {torch.nn.LSTM, torch.nn.Linear}, dtype=torch.qint8)
+
+
+def _create_ocr_reader(languages=('ru', 'en'), cpu_mode=False, quantize=True, threads=None, interop_threads=None):
+    import easyocr
+    if not cpu_mode:
+        return easyocr.Reader(list(languages))
+
+    # Режим CPU: потоки torch задаются явно, чтобы несколько процессов не
+    # делили ядра между лишними потоками. EasyOCR квантует модели сам, но
+    # ошибки квантования молча пропускает, поэтому распознаватель
+    # загружается в fp32 и квантуется здесь
+    _set_torch_threads(threads, interop_threads)
+    reader = easyocr.Reader(list(languages), gpu=False, quantize=False, verbose=False)
+    if quantize:
+        reader.recognizer = quantize_recognizer(reader.recognizer)
+    return reader
+
+
+# Реестр по умолчанию, общий для всех анонимизаторов процесса
+registry = ModelRegistry()
+registry.register('segmenter', _create_segmenter)
+registry.register('morph_vocab', _create_morph_vocab)
+registry.register('embedding', _create_embedding)
+registry.register('ner_tagger', _create_ner_tagger, dependencies=('embedding',))
+registry.register('names_extractor', _create_names_extractor, dependencies=('morph_vocab',))
+registry.register('name_dictionary', _create_name_dictionary)
+registry.register('ocr_reader', _create_ocr_reader)
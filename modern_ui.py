@@ -1,27 +1,184 @@
 import sys
 import os
+import logging
 import traceback
 from PyQt5.QtWidgets import (QApplication, QMainWindow, QLineEdit, QPushButton,
                              QVBoxLayout, QHBoxLayout, QLabel, QFileDialog,
                              QWidget, QPlainTextEdit, QMessageBox, QStatusBar,
-                             QGroupBox, QSplitter, QFrame)
-from PyQt5.QtGui import QPixmap, QImage, QIcon, QFont
-from PyQt5.QtCore import Qt, QSize, QBuffer, QIODevice, QByteArray
+                             QGroupBox, QSplitter, QFrame, QProgressBar, QCheckBox)
+from PyQt5.QtGui import QPixmap, QImage, QIcon, QFont, QTextCursor
+from PyQt5.QtCore import Qt, QSize, QBuffer, QIODevice, QByteArray, QThread, QTimer, pyqtSignal
 
 from anonymizer import Anonymizer, ImageAnonymizer
+from cache import OcrCache, ParagraphCache
+from stats import NULL_STATS, Stats
+from workers import JobQueue
+
+
+# Названия моделей для строки состояния
+MODEL_TITLES = {
+    'segmenter': 'сегментатор',
+    'name_dictionary': 'словарь имен',
+    'embedding': 'эмбеддинги Natasha',
+    'ner_tagger': 'NER Natasha',
+    'ocr_reader': 'модель OCR',
+}
+
+
+# Режимы PIL, которые QImage читает напрямую: формат и байт на пиксель
+QIMAGE_FORMATS = {
+    'L': (QImage.Format_Grayscale8, 1),
+    'RGB': (QImage.Format_RGB888, 3),
+    'RGBA': (QImage.Format_RGBA8888, 4),
+}
+
+
+def pil_to_qimage(image):
+    """QImage поверх пикселей изображения PIL, без кодирования в файл.
+
+    QImage не копирует переданный буфер, поэтому он хранится в атрибуте
+    самого QImage до его удаления.
+    """
+    if image.mode not in QIMAGE_FORMATS:
+        has_alpha = 'A' in image.mode or 'transparency' in image.info
+        image = image.convert('RGBA' if has_alpha else 'RGB')
+    image_format, channels = QIMAGE_FORMATS[image.mode]
+    data = image.tobytes()
+    qimage = QImage(data, image.width, image.height, image.width * channels, image_format)
+    qimage.pixel_buffer = data
+    return qimage
+
+
+def changed_range(old_blocks, new_blocks):
+    """Границы измененного участка по общему началу и концу списков строк.
+
+    Возвращает (start, old_end, new_end): строки old_blocks[start:old_end]
+    заменены на new_blocks[start:new_end].
+    """
+    limit = min(len(old_blocks), len(new_blocks))
+    start = 0
+    while start < limit and old_blocks[start] == new_blocks[start]:
+        start += 1
+    end = 0
+    while end < limit - start and old_blocks[-1 - end] == new_blocks[-1 - end]:
+        end += 1
+    return start, len(old_blocks) - end, len(new_blocks) - end
+
+
+class ModelWarmUpThread(QThread):
+    """Фоновая загрузка моделей: сначала текстовые, затем OCR"""
+    progress = pyqtSignal(str, int, int)
+    failed = pyqtSignal(str)
+
+    def __init__(self, anonymizer, image_anonymizer, parent=None):
+        super().__init__(parent)
+        self.anonymizer = anonymizer
+        self.image_anonymizer = image_anonymizer
+
+    def run(self):
+        text_steps = len(self.anonymizer.WARM_UP_MODELS)
+        total = text_steps + 1
+        try:
+            self.anonymizer.load_models(
+                lambda name, index, _: self.progress.emit(name, index, total))
+            # Окно закрывается: модель OCR уже не понадобится
+            if self.isInterruptionRequested():
+                return
+            self.image_anonymizer.load_models(
+                lambda name, index, _: self.progress.emit(name, text_steps + index, total))
+        except Exception as e:
+            traceback.print_exc()
+            self.failed.emit(str(e))
 
 
 class ModernAnonymizerApp(QMainWindow):
-    def __init__(self, app_paths=None):
+    # Задержка перед обновлением результата в режиме анонимизации при вводе
+    LIVE_DELAY_MS = 300
+
+    def __init__(self, app_paths=None, collect_stats=False):
         super().__init__()
 
         self.app_paths = app_paths or {}
-        self.anonymizer = Anonymizer()
-        self.image_anonymizer = ImageAnonymizer()
+        # Замеры этапов обработки: пишутся в лог и в строку состояния после каждой задачи
+        self.stats = Stats() if collect_stats else NULL_STATS
+        # Модели загружаются при первом использовании или фоновым прогревом,
+        # поэтому окно показывается сразу
+        self.anonymizer = Anonymizer(cache=self.create_paragraph_cache(), stats=self.stats)
+        self.image_anonymizer = ImageAnonymizer(self.anonymizer, ocr_cache=self.create_ocr_cache())
+        self.warm_up_thread = None
+
+        # NER и OCR выполняются в пуле потоков, чтобы не блокировать интерфейс
+        self.jobs = JobQueue(parent=self)
+        self.jobs.started.connect(self.on_job_started)
+        self.jobs.progress.connect(self.on_job_progress)
+        self.jobs.finished.connect(self.on_job_finished)
+        self.jobs.failed.connect(self.on_job_failed)
+        self.jobs.cancelled.connect(self.on_job_cancelled)
+        self.text_job_id = None
+        self.image_jobs = {}
+        self.save_jobs = {}
+
+        # Последний результат хранится только в памяти до явного сохранения
+        self.redacted_image = None
+        self.redacted_source = None
+
+        # Анонимизация при вводе: строки, по которым построен текущий результат,
+        # и результаты отдельных строк
+        self.live_blocks = None
+        self.live_job = None
+        self.live_dirty = False
+        # Поколение живых обновлений: результаты задач прошлых поколений отбрасываются
+        self.live_generation = 0
+        self.live_cache = ParagraphCache(max_size=50000)
+        self.live_timer = QTimer(self)
+        self.live_timer.setSingleShot(True)
+        self.live_timer.setInterval(self.LIVE_DELAY_MS)
+        self.live_timer.timeout.connect(self.run_live_update)
 
         self.initUI()
         self.loadStyleSheet()
 
+    def create_paragraph_cache(self):
+        """Кэш абзацев: на диске в каталоге данных приложения, если он известен"""
+        data_dir = self.app_paths.get('data_dir')
+        try:
+            if data_dir:
+                return ParagraphCache.in_data_dir(data_dir)
+        except Exception:
+            traceback.print_exc()
+        return ParagraphCache()
+
+    def create_ocr_cache(self):
+        """Кэш результатов OCR во временном каталоге приложения"""
+        temp_dir = self.app_paths.get('temp_dir')
+        if not temp_dir:
+            return None
+        try:
+            return OcrCache.in_temp_dir(temp_dir)
+        except Exception:
+            traceback.print_exc()
+            return None
+
+    def start_warm_up(self):
+        """Запуск фоновой загрузки моделей с отображением прогресса в строке состояния"""
+        if self.warm_up_thread is not None:
+            return
+        self.warm_up_thread = ModelWarmUpThread(self.anonymizer, self.image_anonymizer, self)
+        self.warm_up_thread.progress.connect(self.on_warm_up_progress)
+        self.warm_up_thread.failed.connect(self.on_warm_up_failed)
+        self.warm_up_thread.start()
+        self.status_bar.showMessage("Загрузка моделей...")
+
+    def on_warm_up_progress(self, name, index, total):
+        if index < total:
+            title = MODEL_TITLES.get(name, name)
+            self.status_bar.showMessage(f"Загрузка моделей: {index}/{total} ({title})")
+        else:
+            self.status_bar.showMessage("Модели загружены, приложение готово к работе")
+
+    def on_warm_up_failed(self, message):
+        self.status_bar.showMessage(f"Ошибка при загрузке моделей: {message}")
+
     def loadStyleSheet(self):
         """Загрузка таблицы стилей QSS"""
         style_path = os.path.join(self.app_paths.get('app_path', ''), 'resources', 'styles', 'modern_style.qss')
@@ -100,6 +257,8 @@ class ModernAnonymizerApp(QMainWindow):
         self.output_text = QPlainTextEdit()
         self.output_text.setPlaceholderText("Здесь появится обработанный текст...")
         self.output_text.setReadOnly(True)
+        self.output_text.setUndoRedoEnabled(False)
+        self.input_text.textChanged.connect(self.on_input_changed)
 
         output_layout.addWidget(output_label)
         output_layout.addWidget(self.output_text)
@@ -124,8 +283,12 @@ class ModernAnonymizerApp(QMainWindow):
         copy_button.setIcon(QIcon("resources/icons/copy.png"))
         copy_button.clicked.connect(self.copy_result)
 
+        self.live_checkbox = QCheckBox("Анонимизировать при вводе")
+        self.live_checkbox.toggled.connect(self.set_live_mode)
+
         text_actions.addWidget(anonymize_button)
         text_actions.addWidget(clear_button)
+        text_actions.addWidget(self.live_checkbox)
         text_actions.addStretch()
         text_actions.addWidget(copy_button)
 
@@ -153,9 +316,14 @@ class ModernAnonymizerApp(QMainWindow):
         self.select_image_button.setIcon(QIcon("resources/icons/image.png"))
         self.select_image_button.clicked.connect(self.select_image)
 
+        self.save_image_button = QPushButton("Сохранить результат")
+        self.save_image_button.setEnabled(False)
+        self.save_image_button.clicked.connect(self.save_image)
+
         image_header.addWidget(image_instructions)
         image_header.addStretch()
         image_header.addWidget(self.select_image_button)
+        image_header.addWidget(self.save_image_button)
 
         # Контейнер для изображений
         image_view_layout = QHBoxLayout()
@@ -220,24 +388,125 @@ class ModernAnonymizerApp(QMainWindow):
         self.setStatusBar(self.status_bar)
         self.status_bar.showMessage("Приложение готово к работе")
 
+        # Прогресс и отмена фоновых задач
+        self.job_progress = QProgressBar()
+        self.job_progress.setMaximumWidth(200)
+        self.job_progress.setTextVisible(False)
+        self.cancel_button = QPushButton("Отменить")
+        self.cancel_button.clicked.connect(self.cancel_jobs)
+        self.status_bar.addPermanentWidget(self.job_progress)
+        self.status_bar.addPermanentWidget(self.cancel_button)
+        self.update_job_controls()
+
         # Финальная установка виджета
         self.setCentralWidget(main_widget)
 
     def anonymize_text(self):
-        """Обработка текста для анонимизации"""
+        """Обработка текста для анонимизации в фоновом потоке"""
         input_text = self.input_text.toPlainText()
         if not input_text:
             self.status_bar.showMessage("Введите текст для анонимизации")
             return
 
-        try:
-            self.status_bar.showMessage("Обработка текста...")
-            anonymized_text = self.anonymizer.anonymize_text(input_text)
-            self.output_text.setPlainText(anonymized_text)
-            self.status_bar.showMessage("Текст успешно анонимизирован")
-        except Exception as e:
-            self.status_bar.showMessage(f"Ошибка при анонимизации: {str(e)}")
-            traceback.print_exc()
+        # Результат устаревшей задачи больше не нужен
+        if self.text_job_id is not None:
+            self.jobs.cancel(self.text_job_id)
+
+        def job(progress):
+            progress(0, 1, "Обработка текста")
+            return self.anonymizer.anonymize_text(input_text)
+
+        # Текст обрабатывается быстро, поэтому не ждет в очереди за изображениями
+        self.text_job_id = self.jobs.submit(job, priority=1)
+        self.status_bar.showMessage("Обработка текста...")
+        self.update_job_controls()
+
+    def set_live_mode(self, enabled):
+        """Включение режима анонимизации при вводе; результат строится заново"""
+        self.live_blocks = None
+        self.live_generation += 1
+        if enabled:
+            self.run_live_update()
+        else:
+            self.live_timer.stop()
+
+    def on_input_changed(self):
+        if self.live_checkbox.isChecked():
+            # Обновление откладывается, пока пользователь продолжает печатать
+            self.live_timer.start()
+
+    def run_live_update(self):
+        """Анонимизация только строк, изменившихся с прошлого обновления"""
+        if not self.live_checkbox.isChecked():
+            return
+        if self.live_job is not None:
+            # Повторим после завершения текущего обновления
+            self.live_dirty = True
+            return
+
+        blocks = self.input_text.toPlainText().split('\n')
+        if self.live_blocks is None:
+            start, old_end, new_end = 0, None, len(blocks)
+        else:
+            start, old_end, new_end = changed_range(self.live_blocks, blocks)
+            if start == old_end and start == new_end:
+                return
+
+        changed = blocks[start:new_end]
+        job_id = self.jobs.submit(
+            lambda progress: self.anonymizer.anonymize_texts(changed, self.live_cache), priority=2)
+        self.live_job = (job_id, self.live_generation, blocks, start, old_end)
+
+    def apply_live_update(self, results):
+        job_id, generation, blocks, start, old_end = self.live_job
+        self.live_job = None
+
+        if generation != self.live_generation:
+            # Режим переключали или текст анонимизирован целиком, пока шла задача:
+            # ее результат относится к другому состоянию поля
+            return
+        if old_end is not None and self.live_blocks is None:
+            # Изменить только часть строк не к чему - результат строится заново целиком
+            self.live_dirty = True
+            return
+
+        if old_end is None:
+            self.output_text.setPlainText('\n'.join(results))
+        else:
+            # Заменяем в результате только строки start..old_end, остальные не трогаем
+            document = self.output_text.document()
+            cursor = QTextCursor(document)
+            old_count = len(self.live_blocks)
+            text = '\n'.join(results)
+
+            def block_start(number):
+                return document.findBlockByNumber(number).position()
+
+            def block_end(number):
+                block = document.findBlockByNumber(number)
+                return block.position() + block.length() - 1
+
+            if start < old_end and results:
+                cursor.setPosition(block_start(start))
+                cursor.setPosition(block_end(old_end - 1), QTextCursor.KeepAnchor)
+            elif start < old_end:
+                # Строки удалены: убираем их вместе с соседним переводом строки
+                if old_end < old_count:
+                    cursor.setPosition(block_start(start))
+                    cursor.setPosition(block_start(old_end), QTextCursor.KeepAnchor)
+                else:
+                    cursor.setPosition(block_end(start - 1))
+                    cursor.setPosition(block_end(old_count - 1), QTextCursor.KeepAnchor)
+            elif start < old_count:
+                # Строки вставлены перед существующей строкой
+                cursor.setPosition(block_start(start))
+                text += '\n'
+            else:
+                cursor.setPosition(block_end(old_count - 1))
+                text = '\n' + text
+            cursor.insertText(text)
+
+        self.live_blocks = blocks
 
     def clear_text(self):
         """Очистка текстовых полей"""
@@ -256,45 +525,176 @@ class ModernAnonymizerApp(QMainWindow):
             self.status_bar.showMessage("Нет текста для копирования")
 
     def select_image(self):
-        """Выбор изображения для анонимизации"""
+        """Выбор изображений для анонимизации; каждое ставится в очередь обработки"""
         file_dialog = QFileDialog()
         file_dialog.setStyleSheet(self.styleSheet())  # Применяем тот же стиль к диалогу
 
-        image_path, _ = file_dialog.getOpenFileName(
+        image_paths, _ = file_dialog.getOpenFileNames(
             self, "Выберите изображение", "",
-            "Изображения (*.png *.jpg *.jpeg *.bmp *.gif)"
+            "Изображения (*.png *.jpg *.jpeg *.bmp *.gif *.tif *.tiff)"
         )
 
-        if image_path:
-            try:
-                # Показываем оригинальное изображение
-                pixmap = QPixmap(image_path)
-                scaled_pixmap = pixmap.scaled(400, 300, Qt.KeepAspectRatio, Qt.SmoothTransformation)
-                self.original_image_label.setPixmap(scaled_pixmap)
-                self.original_image_label.setAlignment(Qt.AlignCenter)
-
-                # Запускаем обработку
-                self.status_bar.showMessage("Обработка изображения... Это может занять несколько секунд")
-                QApplication.processEvents()  # Обновляем интерфейс
-
-                # Анонимизируем изображение
-                anon_path = self.image_anonymizer.process_image(image_path)
-
-                if anon_path:
-                    # Показываем обработанное изображение
-                    anon_pixmap = QPixmap(anon_path)
-                    scaled_anon_pixmap = anon_pixmap.scaled(400, 300, Qt.KeepAspectRatio, Qt.SmoothTransformation)
-                    self.processed_image_label.setPixmap(scaled_anon_pixmap)
-                    self.processed_image_label.setAlignment(Qt.AlignCenter)
-                    self.status_bar.showMessage(f"Изображение успешно анонимизировано: {anon_path}")
-                else:
-                    self.processed_image_label.setText("Персональные данные не обнаружены или произошла ошибка")
-                    self.status_bar.showMessage("Не удалось анонимизировать изображение")
+        for image_path in image_paths:
+            job_id = self.jobs.submit(
+                lambda progress, path=image_path: self.redact_image(path, progress))
+            self.image_jobs[job_id] = image_path
+
+        if image_paths:
+            if self.image_anonymizer.is_ready:
+                self.status_bar.showMessage("Изображение поставлено в очередь обработки")
+            else:
+                self.status_bar.showMessage("Изображение поставлено в очередь, загружается модель OCR...")
+            self.update_job_controls()
+
+    def redact_image(self, image_path, progress):
+        """Задача пула: анонимизация в памяти и подготовка QImage для показа"""
+        image = self.image_anonymizer.redact_image(image_path, progress_callback=progress)
+        if image is None:
+            return None
+        return image, pil_to_qimage(image)
+
+    def save_image(self):
+        """Сохранение последнего анонимизированного изображения в выбранный файл"""
+        if self.redacted_image is None:
+            self.status_bar.showMessage("Нет изображения для сохранения")
+            return
+
+        base_name = os.path.basename(self.redacted_source)
+        default_path = os.path.join(os.path.dirname(self.redacted_source), f"anon_{base_name}")
+        output_path, _ = QFileDialog.getSaveFileName(
+            self, "Сохранить изображение", default_path,
+            "Изображения (*.png *.jpg *.jpeg *.bmp *.gif *.tif *.tiff)"
+        )
+        if not output_path:
+            return
 
-            except Exception as e:
-                self.processed_image_label.setText("Ошибка при обработке изображения")
-                self.status_bar.showMessage(f"Ошибка: {str(e)}")
-                traceback.print_exc()
+        image = self.redacted_image
+        source_path = self.redacted_source
+
+        def job(progress):
+            # В окне показана только первая страница, многостраничный файл
+            # обрабатывается целиком (результаты OCR берутся из кэша)
+            if self.image_anonymizer.page_count(source_path) > 1:
+                self.image_anonymizer.anonymize_pages(source_path, output_path, progress)
+                return output_path
+            progress(0, 1, "Сохранение изображения")
+            image.save(output_path)
+            return output_path
+
+        self.save_jobs[self.jobs.submit(job)] = output_path
+        self.update_job_controls()
+
+    def cancel_jobs(self):
+        """Отмена всех выполняющихся и ожидающих задач"""
+        self.jobs.cancel_all()
+        self.status_bar.showMessage("Отмена обработки...")
+
+    def update_job_controls(self):
+        busy = self.jobs.pending_count() > 0
+        self.job_progress.setVisible(busy)
+        self.cancel_button.setVisible(busy)
+        if not busy:
+            self.job_progress.reset()
+
+    def on_job_started(self, job_id):
+        image_path = self.image_jobs.get(job_id)
+        if image_path:
+            # Показываем оригинальное изображение
+            pixmap = QPixmap(image_path)
+            scaled_pixmap = pixmap.scaled(400, 300, Qt.KeepAspectRatio, Qt.SmoothTransformation)
+            self.original_image_label.setPixmap(scaled_pixmap)
+            self.original_image_label.setAlignment(Qt.AlignCenter)
+            self.processed_image_label.setText("Обработка...")
+
+    def on_job_progress(self, job_id, done, total, message):
+        self.job_progress.setMaximum(total)
+        self.job_progress.setValue(done)
+        queued = self.jobs.pending_count() - 1
+        suffix = f" (в очереди: {queued})" if queued > 0 else ""
+        self.status_bar.showMessage(f"{message}...{suffix}")
+
+    def on_job_finished(self, job_id, result):
+        if job_id in self.image_jobs:
+            image_path = self.image_jobs.pop(job_id)
+            if result:
+                # Показываем обработанное изображение прямо из памяти
+                self.redacted_image, qimage = result
+                self.redacted_source = image_path
+                anon_pixmap = QPixmap.fromImage(qimage)
+                scaled_anon_pixmap = anon_pixmap.scaled(400, 300, Qt.KeepAspectRatio, Qt.SmoothTransformation)
+                self.processed_image_label.setPixmap(scaled_anon_pixmap)
+                self.processed_image_label.setAlignment(Qt.AlignCenter)
+                self.save_image_button.setEnabled(True)
+                self.status_bar.showMessage(
+                    f"Изображение успешно анонимизировано: {os.path.basename(image_path)}")
+            else:
+                self.processed_image_label.setText("Текст на изображении не обнаружен")
+                self.status_bar.showMessage("Не удалось анонимизировать изображение")
+        elif job_id in self.save_jobs:
+            del self.save_jobs[job_id]
+            self.status_bar.showMessage(f"Изображение сохранено: {result}")
+        elif job_id == self.text_job_id:
+            self.text_job_id = None
+            self.output_text.setPlainText(result)
+            # Результат построен по всему тексту, строки при вводе пересчитываются заново
+            self.live_blocks = None
+            self.live_generation += 1
+            self.status_bar.showMessage("Текст успешно анонимизирован")
+        elif self.live_job is not None and job_id == self.live_job[0]:
+            self.apply_live_update(result)
+            if self.live_dirty:
+                self.live_dirty = False
+                self.run_live_update()
+        self.report_stats()
+        self.update_job_controls()
+
+    def report_stats(self):
+        """Запись замеров завершенной задачи в лог и строку состояния"""
+        if not self.stats.enabled:
+            return
+        summary = self.stats.summary()
+        if summary:
+            self.stats.log(logging.getLogger('anonymizer'))
+            self.status_bar.showMessage(f"{self.status_bar.currentMessage()} ({summary})")
+        self.stats.reset()
+
+    def on_job_failed(self, job_id, message):
+        if self.image_jobs.pop(job_id, None):
+            self.processed_image_label.setText("Ошибка при обработке изображения")
+            self.status_bar.showMessage(f"Ошибка: {message}")
+        elif self.save_jobs.pop(job_id, None):
+            self.status_bar.showMessage(f"Ошибка при сохранении изображения: {message}")
+        elif job_id == self.text_job_id:
+            self.text_job_id = None
+            self.status_bar.showMessage(f"Ошибка при анонимизации: {message}")
+        elif self.live_job is not None and job_id == self.live_job[0]:
+            self.live_job = None
+            self.status_bar.showMessage(f"Ошибка при анонимизации: {message}")
+        self.update_job_controls()
+
+    def on_job_cancelled(self, job_id):
+        self.image_jobs.pop(job_id, None)
+        self.save_jobs.pop(job_id, None)
+        if job_id == self.text_job_id:
+            self.text_job_id = None
+        if self.live_job is not None and job_id == self.live_job[0]:
+            self.live_job = None
+        if self.jobs.pending_count() == 0:
+            self.status_bar.showMessage("Обработка отменена")
+        self.update_job_controls()
+
+    def closeEvent(self, event):
+        # Не оставляем фоновые задачи работать после закрытия окна
+        self.live_timer.stop()
+        self.jobs.cancel_all()
+        self.jobs.wait()
+        if self.warm_up_thread is not None and self.warm_up_thread.isRunning():
+            # Загрузку модели не прервать; поток, удаленный во время работы,
+            # аварийно завершает приложение
+            self.warm_up_thread.requestInterruption()
+            self.warm_up_thread.wait()
+        self.anonymizer.cache.close()
+        super().closeEvent(event)
 
 
 # Создаем ресурсы для встроенных стилей
@@ -0,0 +1,212 @@
+import os
+import re
+import sys
+from bisect import bisect_right
+
+
+def _resources_dir():
+    if getattr(sys, 'frozen', False):
+        return os.path.join(os.path.dirname(sys.executable), 'resources')
+    return os.path.join(os.path.dirname(os.path.abspath(__file__)), 'resources')
+
+
+KAZAKH_NAMES_PATH = os.path.join(_resources_dir(), 'names', 'kazakh.txt')
+
+# Виды слов с заглавной буквы
+NAME = 'name'                    # только имя, фамилия или отчество
+MAYBE_NAME = 'maybe_name'        # имя или обычное слово (Вера, Роза, Лев)
+NAME_OR_PLACE = 'name_or_place'  # имя или топоним/организация (Алматы, Абая)
+PROPER = 'proper'                # топоним, организация или неизвестное слово
+COMMON = 'common'                # обычное слово, известное словарю
+
+_UPPER = 'А-ЯЁӘҒҚҢӨҰҮҺІ'
+_LOWER = 'а-яёәғқңөұүһі'
+
+
+class NameDictionary:
+    """Словарь имен, фамилий и отчеств для поиска ФИО без NER.
+
+    Основа - упакованный DAWG словаря OpenCorpora из pymorphy2 со всеми
+    падежными формами; имена, фамилии и отчества в нем помечены граммемами
+    Name, Surn и Patr. Казахские имена, которых нет в словаре, берутся из
+    resources/names/kazakh.txt, фамилии и отчества от них распознаются по
+    суффиксам. Словарь также подсказывает, нужен ли NER: строки, где все
+    слова с заглавной буквы объяснены словарем, в NER можно не передавать.
+    """
+    # Меняется при изменении правил: результаты в кэшах становятся недействительными
+    VERSION = 2
+
+    NAME_GRAMMEMES = frozenset({'Name', 'Surn', 'Patr'})
+    PROPER_GRAMMEMES = frozenset({'Geox', 'Orgn', 'Trad'})
+    CACHE_SIZE = 100000
+
+    # Слово с заглавной буквы (возможна двойная фамилия через дефис)
+    TOKEN = re.compile(rf'(?<![\w-])[{_UPPER}][{_LOWER}]+(?:-[{_UPPER}][{_LOWER}]+)?(?![\w-])')
+    CAPITALIZED = re.compile(rf'(?<!\w)[A-Z{_UPPER}]\w*')
+    SEPARATOR = re.compile(r'[ \t]+')
+    INITIALS_AFTER = re.compile(rf'[ \t]+[{_UPPER}]\.(?:[ \t]?[{_UPPER}]\.)?')
+    INITIALS_BEFORE = re.compile(rf'(?<![\w.])[{_UPPER}]\.(?:[ \t]?[{_UPPER}]\.)?[ \t]+$')
+
+    SURNAME = re.compile(r'^(?P<stem>.+?)(?:ов|ев|ёв|ин)(?:а|у|ым|ом|е|ой|ою|ы|ых|ыми)?$')
+    PATRONYMIC = re.compile(r'^(?P<stem>.+?)(?:ович|евич|овна|евна|улы|ұлы|кызы|қызы)(?:а|у|ем|е|ы|ой|ою)?$')
+    NAME_CASE = re.compile(r'^(?P<stem>.+?)(?:а|у|ом|ем|е|ым|ой|ы)$')
+
+    def __init__(self, dictionary_path=None, kazakh_names_path=KAZAKH_NAMES_PATH):
+        from pymorphy2.opencorpora_dict.wrapper import Dictionary
+
+        if dictionary_path is None:
+            import pymorphy2_dicts_ru
+            dictionary_path = pymorphy2_dicts_ru.get_path()
+
+        dictionary = Dictionary(dictionary_path)
+        self._words = dictionary.words
+        self._paradigms = dictionary.paradigms
+        self._replaces = self._words.compile_replaces({'е': 'ё'})
+
+        # Вид каждого тега словаря вычисляется один раз
+        self._tag_kinds = []
+        for tag in dictionary.gramtab:
+            grammemes = tag.grammemes
+            if grammemes & self.NAME_GRAMMEMES:
+                self._tag_kinds.append(NAME)
+            elif grammemes & self.PROPER_GRAMMEMES:
+                self._tag_kinds.append(PROPER)
+            elif 'Poss' in grammemes:
+                # Притяжательные прилагательные (Иванов, мамин) вид слова не определяют
+                self._tag_kinds.append(None)
+            else:
+                self._tag_kinds.append(COMMON)
+
+        self.kazakh_names = set()
+        if kazakh_names_path and os.path.exists(kazakh_names_path):
+            with open(kazakh_names_path, 'r', encoding='utf-8') as f:
+                self.kazakh_names = {line.strip() for line in f if line.strip() and not line.startswith('#')}
+
+        self._cache = {}
+
+    def _dictionary_kinds(self, word):
+        kinds = set()
+        for _, parses in self._words.similar_items(word, self._replaces):
+            for paradigm_id, index in parses:
+                paradigm = self._paradigms[paradigm_id]
+                kinds.add(self._tag_kinds[paradigm[len(paradigm) // 3 + index]])
+        return kinds
+
+    def _is_name_stem(self, stem):
+        variants = [stem, stem + 'й']
+        if stem.endswith('и'):
+            variants.append(stem[:-1] + 'ы')
+        return any(variant in self.kazakh_names or NAME in self._dictionary_kinds(variant)
+                   for variant in variants)
+
+    def _classify(self, word):
+        if '-' in word:
+            kinds = {self.classify(part) for part in word.split('-')}
+            if kinds <= {NAME, MAYBE_NAME}:
+                return NAME if kinds == {NAME} else MAYBE_NAME
+            return PROPER if kinds - {COMMON} else COMMON
+
+        kinds = self._dictionary_kinds(word)
+        if NAME in kinds:
+            if PROPER in kinds:
+                return NAME_OR_PLACE
+            return MAYBE_NAME if COMMON in kinds else NAME
+        if PROPER in kinds:
+            return PROPER
+        if COMMON in kinds or None in kinds:
+            return COMMON
+
+        # Слова, которых нет в словаре: казахские имена и производные от имен
+        # фамилии и отчества
+        if word in self.kazakh_names:
+            return NAME
+        for pattern in (self.PATRONYMIC, self.SURNAME, self.NAME_CASE):
+            match = pattern.match(word)
+            if match and self._is_name_stem(match.group('stem')):
+                return NAME
+        if self.SURNAME.match(word):
+            return MAYBE_NAME
+        return PROPER
+
+    def classify(self, word):
+        """Вид слова (NAME, MAYBE_NAME, NAME_OR_PLACE, PROPER или COMMON) в нижнем регистре"""
+        kind = self._cache.get(word)
+        if kind is None:
+            if len(self._cache) >= self.CACHE_SIZE:
+                self._cache.clear()
+            kind = self._cache[word] = self._classify(word)
+        return kind
+
+    def _sentence_start(self, text, pos, start):
+        index = start - 1
+        while index >= pos and text[index] in ' \t':
+            index -= 1
+        return index < pos or text[index] in '.!?…\n'
+
+    def find_names(self, text, pos=0, endpos=None):
+        """Позиции (start, stop) ФИО в text[pos:endpos].
+
+        ФИО - подряд идущие слова с заглавной буквы, известные как имена,
+        фамилии или отчества, вместе с инициалами рядом. Одиночное слово,
+        которое может быть и обычным словом, считается именем только не в
+        начале предложения.
+        """
+        if endpos is None:
+            endpos = len(text)
+        spans = []
+        run = []
+
+        def flush():
+            start, stop = run[0][0], run[-1][1]
+            kinds = [kind for _, _, kind in run]
+            after = self.INITIALS_AFTER.match(text, stop, endpos)
+            before = self.INITIALS_BEFORE.search(text, max(pos, start - 8), start)
+            if after or before:
+                accepted = True
+            elif len(run) > 1:
+                accepted = NAME in kinds or MAYBE_NAME in kinds
+            else:
+                accepted = kinds[0] == NAME or (
+                    kinds[0] == MAYBE_NAME and not self._sentence_start(text, pos, start))
+            if accepted:
+                spans.append((before.start() if before else start, after.end() if after else stop))
+
+        for token in self.TOKEN.finditer(text, pos, endpos):
+            kind = self.classify(token.group().lower())
+            if kind in (NAME, MAYBE_NAME, NAME_OR_PLACE):
+                if run and not self.SEPARATOR.fullmatch(text, run[-1][1], token.start()):
+                    flush()
+                    run = []
+                run.append((token.start(), token.end(), kind))
+            elif run:
+                flush()
+                run = []
+        if run:
+            flush()
+        return spans
+
+    def needs_ner(self, text, pos=0, endpos=None, covered=()):
+        """Есть ли в text[pos:endpos] слова с заглавной буквы, которые словарь не
+        объясняет: топонимы, организации, неизвестные слова, имена вне covered.
+
+        Обычное слово с заглавной буквы объяснено, только если оно в начале
+        предложения: в середине предложения оно может быть названием
+        (Сбербанк) или частью имени (Ким Ен Су). Аббревиатуры (НДС) пишутся
+        заглавными везде.
+
+        covered - отсортированные непересекающиеся участки (start, stop), где
+        персональные данные уже найдены.
+        """
+        if endpos is None:
+            endpos = len(text)
+        for token in self.CAPITALIZED.finditer(text, pos, endpos):
+            start = token.start()
+            index = bisect_right(covered, (start, float('inf'))) - 1
+            if index >= 0 and covered[index][1] > start:
+                continue
+            word = token.group()
+            if self.classify(word.lower()) != COMMON:
+                return True
+            if not word.isupper() and not self._sentence_start(text, pos, start):
+                return True
+        return False
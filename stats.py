@@ -0,0 +1,144 @@
+import json
+import logging
+import threading
+import time
+
+
+class _Stage:
+    """Контекстный менеджер замера одного этапа"""
+    __slots__ = ('stats', 'name', 'start')
+
+    def __init__(self, stats, name):
+        self.stats = stats
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stats.add_time(self.name, time.perf_counter() - self.start)
+        return False
+
+
+class Stats:
+    """Время по этапам обработки и счетчики (совпадения, сущности, рамки OCR).
+
+    Этапы замеряются конструкцией `with stats.stage('ner'): ...`, счетчики
+    увеличиваются через count(). Данные доступны в виде словаря и JSON,
+    могут быть записаны в лог 'anonymizer'. Потокобезопасен.
+    """
+    enabled = True
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.stages = {}  # этап -> [вызовов, суммарное время, максимум]
+        self.counters = {}
+
+    def stage(self, name):
+        return _Stage(self, name)
+
+    def add_time(self, name, seconds, calls=1):
+        with self._lock:
+            stage = self.stages.get(name)
+            if stage is None:
+                self.stages[name] = [calls, seconds, seconds]
+            else:
+                stage[0] += calls
+                stage[1] += seconds
+                if seconds > stage[2]:
+                    stage[2] = seconds
+
+    def count(self, name, value=1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def snapshot(self):
+        """Копия накопленных данных: время в миллисекундах и счетчики"""
+        with self._lock:
+            return {
+                'stages': {
+                    name: {
+                        'calls': calls,
+                        'total_ms': total * 1000,
+                        'mean_ms': total * 1000 / calls if calls else 0.0,
+                        'max_ms': maximum * 1000,
+                    }
+                    for name, (calls, total, maximum) in self.stages.items()
+                },
+                'counters': dict(self.counters),
+            }
+
+    def to_json(self, **kwargs):
+        return json.dumps(self.snapshot(), ensure_ascii=False, **kwargs)
+
+    def merge(self, snapshot):
+        """Добавление данных из snapshot() другого объекта (например, рабочего процесса)"""
+        with self._lock:
+            for name, stage in snapshot.get('stages', {}).items():
+                current = self.stages.setdefault(name, [0, 0.0, 0.0])
+                current[0] += stage['calls']
+                current[1] += stage['total_ms'] / 1000
+                current[2] = max(current[2], stage['max_ms'] / 1000)
+            for name, value in snapshot.get('counters', {}).items():
+                self.counters[name] = self.counters.get(name, 0) + value
+
+    def reset(self):
+        with self._lock:
+            self.stages.clear()
+            self.counters.clear()
+
+    def summary(self, limit=5):
+        """Краткая строка для строки состояния: самые долгие этапы"""
+        with self._lock:
+            stages = sorted(self.stages.items(), key=lambda item: item[1][1], reverse=True)[:limit]
+        return ', '.join(f"{name} {total * 1000:.0f} мс" for name, (_, total, _) in stages)
+
+    def log(self, logger=None, level=logging.INFO):
+        (logger or logging.getLogger('anonymizer')).log(level, "Статистика обработки: %s", self.to_json())
+
+
+class _NullStage:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+class NullStats:
+    """Заглушка Stats для работы без замеров: все методы ничего не делают"""
+    enabled = False
+    _stage = _NullStage()
+
+    def stage(self, name):
+        return self._stage
+
+    def add_time(self, name, seconds, calls=1):
+        pass
+
+    def count(self, name, value=1):
+        pass
+
+    def snapshot(self):
+        return {'stages': {}, 'counters': {}}
+
+    def to_json(self, **kwargs):
+        return json.dumps(self.snapshot(), **kwargs)
+
+    def merge(self, snapshot):
+        pass
+
+    def reset(self):
+        pass
+
+    def summary(self, limit=5):
+        return ''
+
+    def log(self, logger=None, level=logging.INFO):
+        pass
+
+
+NULL_STATS = NullStats()
@@ -0,0 +1,77 @@
+"""Строки длиннее Anonymizer.MAX_LINE_LENGTH: совпадения на разрезе не теряются."""
+import os
+import random
+import sys
+import time
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from anonymizer import Anonymizer  # noqa: E402
+from benchmarks.fuzz_latency import FRAGMENTS, periodic  # noqa: E402
+
+# Длина строк для проверки времени: больше двух MAX_LINE_LENGTH, с разрезами
+PATHOLOGICAL_LINE_LENGTH = 150_000
+# Допустимое время сканирования на символ: при линейном времени с большим
+# запасом, при квадратичном на такой длине - превышается во много раз
+SCAN_TIME_PER_CHAR = 10e-6
+
+
+@pytest.fixture(scope='module')
+def anonymizer():
+    return Anonymizer()
+
+
+def line_with_value_at_cut(value, offset=10):
+    """Длинная строка без пробелов, где value начинается за offset символов до MAX_LINE_LENGTH.
+
+    Строка режется по последнему пробелу перед MAX_LINE_LENGTH - внутри value, если в нем есть пробелы.
+    """
+    prefix = 'x' * (Anonymizer.MAX_LINE_LENGTH - offset - 1) + ' '
+    return prefix + value + ' ' + 'y' * 100, len(prefix)
+
+
+@pytest.mark.parametrize('value, replacement', [
+    ('4400 4301 2345 6789', '[НОМЕР СЧЕТА/КАРТЫ]'),
+    ('900101300123', '[ИИН]'),
+    ('+7 701 123 45 67', '[ТЕЛЕФОН]'),
+])
+@pytest.mark.parametrize('offset', [6, 10, 19])
+def test_match_across_cut_is_replaced(anonymizer, value, replacement, offset):
+    line, start = line_with_value_at_cut(value, offset)
+    result = anonymizer.anonymize_text(line)
+    assert value not in result
+    assert result[start:start + len(replacement)] == replacement
+
+
+@pytest.mark.parametrize('value', [
+    '4400 4301 2345 6789',
+    '900101300123',
+    '+7 701 123 45 67',
+    'Иванов Иван Иванович',
+])
+@pytest.mark.parametrize('offset', [1, 6, 10, 19, 40])
+def test_chunked_scan_matches_whole_line_scan(anonymizer, value, offset):
+    line, _ = line_with_value_at_cut(value, offset)
+    whole = Anonymizer()
+    whole.MAX_LINE_LENGTH = len(line) + 1
+    assert list(anonymizer._scan_line(line)) == list(whole._scan_line(line))
+
+
+def pathological_lines():
+    # Повторы начал совпадений - худший случай для возвратов и повторных
+    # проверок, случайные смеси фрагментов - для логики приоритетов
+    for unit in ['ул. 1 ', 'Абай ', 'Иванов Ан ', 'a@', '@a.', 'a.b@', '1234 ', '+7', 'x.kz/', 'д.', '@']:
+        yield periodic(unit, PATHOLOGICAL_LINE_LENGTH)
+    for seed in range(2):
+        rng = random.Random(seed)
+        yield ''.join(rng.choice(FRAGMENTS) for _ in range(PATHOLOGICAL_LINE_LENGTH))[:PATHOLOGICAL_LINE_LENGTH]
+
+
+@pytest.mark.parametrize('line', list(pathological_lines()), ids=lambda line: repr(line[:12]))
+def test_pathological_line_scan_time_is_bounded(anonymizer, line):
+    start = time.perf_counter()
+    list(anonymizer._scan_line(line))
+    elapsed = time.perf_counter() - start
+    assert elapsed < SCAN_TIME_PER_CHAR * len(line)
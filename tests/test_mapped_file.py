@@ -0,0 +1,59 @@
+"""Анонимизация больших файлов через mmap (anonymize_mapped_file)."""
+import codecs
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from anonymizer import Anonymizer  # noqa: E402
+
+
+@pytest.mark.parametrize('encoding', Anonymizer.MMAP_ENCODINGS)
+def test_mmap_encodings_are_canonical(encoding):
+    assert codecs.lookup(encoding).name == encoding
+
+
+@pytest.mark.parametrize('encoding', ['latin-1', 'latin1', 'ISO-8859-1', 'cp1251', 'UTF8', 'koi8_r'])
+def test_supported_encoding_aliases(encoding):
+    assert Anonymizer().supports_mapped_file(encoding)
+
+
+@pytest.mark.parametrize('encoding', ['utf-16', 'cp037', 'no-such-encoding'])
+def test_unsupported_encodings(encoding):
+    assert not Anonymizer().supports_mapped_file(encoding)
+
+
+@pytest.mark.parametrize('encoding, text', [
+    ('latin-1', 'Café crème, tel +7 701 123 45 67, mail test@example.com\nnothing here\n'),
+    ('cp1251', 'ИИН 900101300123, карта 4400 4301 2345 6789\nпросто строка\n'),
+])
+def test_anonymize_file_uses_mmap(monkeypatch, tmp_path, encoding, text):
+    anonymizer = Anonymizer()
+    anonymizer.MMAP_MIN_SIZE = 1
+    calls = []
+    mapped = anonymizer.anonymize_mapped_file
+
+    def spy(*args, **kwargs):
+        calls.append(args)
+        return mapped(*args, **kwargs)
+
+    monkeypatch.setattr(anonymizer, 'anonymize_mapped_file', spy)
+    source = tmp_path / 'input.txt'
+    target = tmp_path / 'output.txt'
+    source.write_bytes(text.encode(encoding))
+
+    anonymizer.anonymize_file(str(source), str(target), encoding, regex_only=True)
+
+    assert len(calls) == 1
+    expected = '\n'.join(anonymizer.anonymize_line(line) for line in text.split('\n'))
+    # Замены на кириллице в latin-1 не представимы
+    assert target.read_bytes() == expected.encode(encoding, 'replace')
+
+    # Без mmap результат тот же
+    anonymizer.MMAP_MIN_SIZE = len(text) * 4
+    streamed = tmp_path / 'streamed.txt'
+    anonymizer.anonymize_file(str(source), str(streamed), encoding, regex_only=True)
+    assert len(calls) == 1
+    assert streamed.read_bytes() == target.read_bytes()
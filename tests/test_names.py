@@ -0,0 +1,42 @@
+"""Отбор строк для NER словарем имен."""
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+pytest.importorskip('pymorphy2_dicts_ru')
+
+from names import NameDictionary  # noqa: E402
+
+
+@pytest.fixture(scope='module')
+def names():
+    return NameDictionary()
+
+
+def needs_ner(names, text):
+    return names.needs_ner(text, covered=names.find_names(text))
+
+
+@pytest.mark.parametrize('text', [
+    'Деньги перевели через Сбербанк вчера.',
+    'Менеджер Лев Толстой позвонил в Сбербанк.',
+    'Перевод выполнен через Каспи вечером.',
+    'Гражданин Ким Ен Су получил паспорт.',
+    'Посылку доставил Пак Ен Хо.',
+    'Договор подписан. Оплату принял Ли Су.',
+])
+def test_capitalized_common_word_mid_sentence_needs_ner(names, text):
+    assert needs_ner(names, text)
+
+
+@pytest.mark.parametrize('text', [
+    'Деньги перевели вчера.',
+    'Договор подписан. Оплата произведена вовремя.',
+    'Итого к оплате: 125 000 тенге, включая НДС 12%.',
+    'Договор подписал Иванов Иван Иванович.',
+])
+def test_explained_lines_skip_ner(names, text):
+    assert not needs_ner(names, text)
@@ -0,0 +1,57 @@
+"""Многостраничные изображения: данные страниц и кадров сохраняются при записи."""
+import os
+import sys
+
+import pytest
+from PIL import Image, ImageDraw, ImageSequence
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from anonymizer import Anonymizer, ImageAnonymizer  # noqa: E402
+
+BOX = (0, 0, 3, 3)
+
+
+@pytest.fixture
+def image_anonymizer(monkeypatch):
+    image_anonymizer = ImageAnonymizer(Anonymizer())
+    # Без OCR: на каждой странице "найден" один блок с персональными данными
+    monkeypatch.setattr(image_anonymizer, 'read_text', lambda *args, **kwargs: [(None, 'x', 1.0)])
+    monkeypatch.setattr(image_anonymizer, '_redaction_boxes', lambda results: [BOX])
+    return image_anonymizer
+
+
+def test_gif_frame_duration_and_disposal_survive(image_anonymizer, tmp_path):
+    frames = []
+    for index in range(3):
+        frame = Image.new('RGB', (16, 16), 'white')
+        ImageDraw.Draw(frame).rectangle([4 + index * 4, 4, 7 + index * 4, 15], fill=(200, 40 * index, 0))
+        frames.append(frame)
+    source = tmp_path / 'source.gif'
+    frames[0].save(source, save_all=True, append_images=frames[1:],
+                   duration=[100, 200, 300], disposal=[1, 2, 1], loop=0)
+
+    output = tmp_path / 'output.gif'
+    assert image_anonymizer.anonymize_pages(str(source), str(output)) == str(output)
+
+    with Image.open(output) as result:
+        saved = [(frame.info['duration'], frame.disposal_method) for frame in ImageSequence.Iterator(result)]
+    assert saved == [(100, 1), (200, 2), (300, 1)]
+
+
+def test_bilevel_tiff_pages_stay_group4(image_anonymizer, tmp_path):
+    pages = [Image.new('1', (64, 32), 1) for _ in range(2)]
+    source = tmp_path / 'source.tif'
+    pages[0].save(source, save_all=True, append_images=pages[1:], compression='group4', dpi=(300, 300))
+
+    output = tmp_path / 'output.tif'
+    assert image_anonymizer.anonymize_pages(str(source), str(output)) == str(output)
+
+    with Image.open(output) as result:
+        assert result.n_frames == 2
+        for page in ImageSequence.Iterator(result):
+            assert page.mode == '1'
+            assert page.info['compression'] == 'group4'
+            assert tuple(round(value) for value in page.info['dpi']) == (300, 300)
+            assert page.getpixel((1, 1)) == 0
+            assert page.getpixel((10, 10)) == 255
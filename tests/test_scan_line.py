@@ -0,0 +1,83 @@
+"""Однопроходный _scan_line против прежней последовательной замены паттернов."""
+import os
+import random
+import re
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from anonymizer import Anonymizer  # noqa: E402
+
+# Паттерны и порядок замен прежнего anonymize_line
+LEGACY_CHAIN = [
+    (re.compile(r'\b\d{12}\b'), '[ИИН]'),
+    (re.compile(r'\b[А-ЯЁ][а-яё]+(\s+[А-ЯЁ][а-яё]+){1,2}\b'), '[ФИО]'),
+    (re.compile(r'\b[A-Z][a-z]+(\s+[A-Z][a-z]+){1,2}\b'), '[ФИО]'),
+    (re.compile(r'\bKZ[A-Z0-9]{18}\b', re.IGNORECASE), '[НОМЕР СЧЕТА/КАРТЫ]'),
+    (re.compile(r'\b\d{4}[-\s]?\d{4}[-\s]?\d{4}[-\s]?\d{4}\b'), '[НОМЕР СЧЕТА/КАРТЫ]'),
+    (re.compile(r'\+?7[\s\-]?\(?\d{3}\)?[\s\-]?\d{3}[\s\-]?\d{2}[\s\-]?\d{2}'), '[ТЕЛЕФОН]'),
+    (re.compile(r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b'), '[EMAIL]'),
+    (re.compile(r'\b(ул|улица|пр|проспект|д|дом|кв|квартира)\.?\s+[А-Яа-яЁё0-9\s\.\,\-\/]+\b', re.IGNORECASE),
+     '[АДРЕС]'),
+]
+
+TOKENS = [
+    '+7 701 123 45 67', '+77011234567', '8 701 123 45 67', '87011234567', '900101300123', '4400 4301 2345 6789',
+    'KZ123456789012345678', 'test@x.com', 'ivanov@mail.ru', 'a.b@mail.ru', '.a@x.com', 'ул. Абая 10', 'д 5', 'кв. 12',
+    'Иванов Иван', 'Иванов Иван Иванович', 'John Smith', 'тел', 'тел:', 'звонить', 'email', 'Алматы', 'и', 'test',
+    '12', 'abc', '-', '.', ',',
+]
+# Пустой разделитель склеивает соседние значения
+SEPARATORS = ['', '', ' ', ' ', ', ', ':', '-', '.']
+
+
+def legacy_anonymize_line(line):
+    for pattern, replacement in LEGACY_CHAIN:
+        line = pattern.sub(replacement, line)
+    return line
+
+
+def scan_and_replace(anonymizer, line):
+    parts = []
+    pos = 0
+    for start, stop, name in anonymizer._scan_line(line):
+        parts.append(line[pos:start])
+        parts.append(anonymizer._replacements[name])
+        pos = stop
+    parts.append(line[pos:])
+    return ''.join(parts)
+
+
+def generated_lines(seed, count):
+    rng = random.Random(seed)
+    for _ in range(count):
+        yield ''.join(rng.choice(TOKENS) + rng.choice(SEPARATORS) for _ in range(rng.randint(1, 6)))
+
+
+@pytest.fixture(scope='module')
+def anonymizer():
+    return Anonymizer()
+
+
+@pytest.mark.parametrize('line', [
+    '+7 701 123 45 67test@x.com',
+    'тел +77011234567ivanov@mail.ru',
+    '+7 701 123 45 67a.b@mail.ru',
+    '+7 701 123 45 67.a@x.com',
+    'тел:+7 701 123 45 67ул. Абая 10',
+    '+77011234567кв. 12',
+    'KZ123456789012345678a.b@mail.ru',
+    'John Smith-ivanov@mail.ru',
+    'Иванов Иван.a@x.com',
+    'a.b@mail.ru-.a@x.com',
+])
+def test_glued_values(anonymizer, line):
+    assert scan_and_replace(anonymizer, line) == legacy_anonymize_line(line)
+
+
+@pytest.mark.parametrize('seed', range(4))
+def test_generated_lines(anonymizer, seed):
+    for line in generated_lines(seed, 2000):
+        assert scan_and_replace(anonymizer, line) == legacy_anonymize_line(line), line
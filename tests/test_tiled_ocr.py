@@ -0,0 +1,57 @@
+"""Режим OCR по полосам: изображения передаются EasyOCR в L или RGB."""
+import os
+import sys
+
+import pytest
+from PIL import Image
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from anonymizer import Anonymizer, ImageAnonymizer  # noqa: E402
+
+
+class FakeReader:
+    """Вместо EasyOCR: запоминает массивы, переданные в detect и recognize"""
+
+    def __init__(self):
+        self.detected = []
+        self.recognized = []
+
+    def detect(self, image, **options):
+        self.detected.append(image)
+        height, width = image.shape[:2]
+        return [[[0, width, 0, height]]], [[]]
+
+    def recognize(self, image, horizontal_list, free_list, reformat=True, **options):
+        self.recognized.append(image)
+        return []
+
+
+@pytest.fixture
+def reader(monkeypatch):
+    reader = FakeReader()
+    monkeypatch.setattr(ImageAnonymizer, 'reader', reader)
+    return reader
+
+
+def palette_image(palette):
+    image = Image.new('P', (32, 16))
+    image.putpalette(palette)
+    return image
+
+
+@pytest.mark.parametrize('image, shape', [
+    (Image.new('1', (32, 16), 1), (16, 32)),
+    (Image.new('L', (32, 16), 200), (16, 32)),
+    (Image.new('LA', (32, 16)), (16, 32)),
+    (palette_image([value for value in range(256) for _ in range(3)]), (16, 32)),
+    (palette_image([255, 0, 0] + [0, 0, 255] * 255), (16, 32, 3)),
+    (Image.new('RGBA', (32, 16), (255, 0, 0, 128)), (16, 32, 3)),
+    (Image.new('RGB', (32, 16), 'white'), (16, 32, 3)),
+])
+def test_tiled_ocr_input_mode(reader, image, shape):
+    image_anonymizer = ImageAnonymizer(Anonymizer(), tiled_ocr=True)
+    assert image_anonymizer._read_text(image, tiled=True) == []
+    assert reader.detected[0].shape == shape
+    assert reader.detected[0].dtype.name == 'uint8'
+    assert reader.recognized[0].shape == (16, 32)
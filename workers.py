@@ -0,0 +1,127 @@
+import threading
+import traceback
+from itertools import count
+
+from PyQt5.QtCore import QObject, QRunnable, QThreadPool, pyqtSignal
+
+from anonymizer import OperationCancelled
+
+
+class JobSignals(QObject):
+    """Сигналы задачи; доставляются в поток интерфейса через очередь событий Qt"""
+    started = pyqtSignal(int)
+    progress = pyqtSignal(int, int, int, str)  # id задачи, выполнено, всего, этап
+    finished = pyqtSignal(int, object)
+    failed = pyqtSignal(int, str)
+    cancelled = pyqtSignal(int)
+
+
+class Job(QRunnable):
+    """Задача для пула потоков.
+
+    Функция задачи получает callback прогресса progress(done, total, message);
+    при отмене задачи очередной вызов callback прерывает ее исключением
+    OperationCancelled.
+    """
+
+    def __init__(self, job_id, fn, signals):
+        super().__init__()
+        self.job_id = job_id
+        self.fn = fn
+        self.signals = signals
+        self._cancel_event = threading.Event()
+
+    def cancel(self):
+        self._cancel_event.set()
+
+    @property
+    def is_cancelled(self):
+        return self._cancel_event.is_set()
+
+    def report(self, done, total, message=''):
+        if self._cancel_event.is_set():
+            raise OperationCancelled()
+        self.signals.progress.emit(self.job_id, done, total, message)
+
+    def run(self):
+        if self._cancel_event.is_set():
+            self.signals.cancelled.emit(self.job_id)
+            return
+
+        self.signals.started.emit(self.job_id)
+        try:
+            result = self.fn(self.report)
+        except OperationCancelled:
+            self.signals.cancelled.emit(self.job_id)
+            return
+        except Exception as e:
+            traceback.print_exc()
+            self.signals.failed.emit(self.job_id, str(e))
+            return
+
+        if self._cancel_event.is_set():
+            self.signals.cancelled.emit(self.job_id)
+        else:
+            self.signals.finished.emit(self.job_id, result)
+
+
+class JobQueue(QObject):
+    """Очередь фоновых задач анонимизации поверх QThreadPool"""
+    started = pyqtSignal(int)
+    progress = pyqtSignal(int, int, int, str)
+    finished = pyqtSignal(int, object)
+    failed = pyqtSignal(int, str)
+    cancelled = pyqtSignal(int)
+
+    def __init__(self, max_workers=2, parent=None):
+        super().__init__(parent)
+        self.pool = QThreadPool(self)
+        self.pool.setMaxThreadCount(max_workers)
+        self.signals = JobSignals()
+        self.signals.started.connect(self.started)
+        self.signals.progress.connect(self.progress)
+        self.signals.finished.connect(self._on_finished)
+        self.signals.failed.connect(self._on_failed)
+        self.signals.cancelled.connect(self._on_cancelled)
+        self._ids = count(1)
+        self._jobs = {}
+
+    def submit(self, fn, priority=0):
+        """Постановка задачи в очередь; возвращает ее идентификатор.
+
+        Задачи с большим priority запускаются раньше ожидающих в очереди.
+        """
+        job = Job(next(self._ids), fn, self.signals)
+        # Qt не должен удалять задачу сам: ссылка хранится до получения результата
+        job.setAutoDelete(False)
+        self._jobs[job.job_id] = job
+        self.pool.start(job, priority)
+        return job.job_id
+
+    def cancel(self, job_id):
+        job = self._jobs.get(job_id)
+        if job is not None:
+            job.cancel()
+
+    def cancel_all(self):
+        for job in self._jobs.values():
+            job.cancel()
+
+    def pending_count(self):
+        """Число задач, которые еще выполняются или ждут в очереди"""
+        return len(self._jobs)
+
+    def wait(self, msecs=-1):
+        return self.pool.waitForDone(msecs)
+
+    def _on_finished(self, job_id, result):
+        self._jobs.pop(job_id, None)
+        self.finished.emit(job_id, result)
+
+    def _on_failed(self, job_id, message):
+        self._jobs.pop(job_id, None)
+        self.failed.emit(job_id, message)
+
+    def _on_cancelled(self, job_id):
+        self._jobs.pop(job_id, None)
+        self.cancelled.emit(job_id)